@@ -0,0 +1,415 @@
+# Indexed Params stored in numpy arrays instead of a python dict.
+#
+# bho.py declares  m.r = pyo.Param(m.I, m.I, default=0)  and sets three entries, and the S1 matrix of Pyomo_notes.py
+# is the same kind of square table with default=0. A Param keeps every given entry in a dict {index tuple: value}:
+# with the tuple, the boxed value and the dict slot that is more than 150 bytes per entry, gigabytes for a few
+# million entries. ArrayParam is a Param (same ctype, same writers, same p[i, j], same default handling) whose
+# entries live in arrays:
+#
+#   sparse (default)   sorted int64 codes of the index positions + one array of values: 16 bytes per entry,
+#                      a lookup is a binary search (np.searchsorted) on the codes instead of a tuple hash
+#   dense=True         one array with a value for every index (+ 1 byte "given" flag): 9 bytes per index,
+#                      a lookup is a direct position
+#
+# The code of an index is its position in the index set (mixed radix over the sets of the product), so the arrays
+# need the index sets to be ordered (RangeSet, Set with insertion order, ...). Only immutable Params are supported
+# (a mutable Param needs one ParamData object per entry anyway).
+#
+#   m.r = ArrayParam(m.I, m.I, default=0, initialize={(1, 2): 3, ...})     same as pyo.Param
+#   m.r = ArrayParam(m.I, m.I, default=0, values=(rows, cols, data))      columns of index members + values
+#   m.a = ArrayParam(m.I, m.J, default=0, values=A)                       numpy 2D array or scipy sparse matrix,
+#                                                                         by position in I and J
+#   m.r.sparse_arrays()      (index columns..., values) of the given entries, no python objects
+#
+# Entries given one at a time (initialize=, DataPortal, .dat files) are appended to a buffer and sorted into the
+# arrays at the first lookup. The values come back as they were given: bool, int64 or float64 arrays when all the
+# values are of one of these kinds, an object array otherwise (strings, ints mixed with floats, ints beyond int64),
+# unless dtype= asks for a conversion.
+
+import operator
+from collections.abc import MutableMapping
+
+import numpy as np
+
+import pyomo.environ as pyo
+from pyomo.core.base.param import IndexedParam
+
+
+def _integer(member):
+    # int for ints, numpy integers and integral floats (1, np.int64(1), 1.0), else None
+    try:
+        return operator.index(member)
+    except TypeError:
+        if isinstance(member, (float, np.floating)) and float(member).is_integer():
+            return int(member)
+    return None
+
+
+def _typed(values):
+    # array of a list of values that gives back the same python values: bool, int64 or float64 when all values are
+    # of that one kind (and the ints fit in int64), else an object array (strings, big ints, ints mixed with floats)
+    kinds = set(map(type, values))
+    if kinds and all(issubclass(k, (bool, np.bool_)) for k in kinds):
+        return np.array(values, dtype=bool)
+    if kinds and all(issubclass(k, (int, np.integer)) and not issubclass(k, (bool, np.bool_)) for k in kinds):
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            pass
+    elif kinds and all(issubclass(k, (float, np.float32, np.float16)) for k in kinds):
+        return np.array(values, dtype=np.float64)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _common(a, b):
+    # dtype that holds the values of two arrays unchanged
+    return a if a == b else np.dtype(object)
+
+
+def _python(value):
+    # python value of an array element (object arrays already hold python values)
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class _Factor(object):
+    # one set of the index product: member <-> position
+    def __init__(self, s):
+        self.set = s
+        self.size = len(s)
+        self.dimen = s.dimen if isinstance(s.dimen, int) else 1
+        members = None
+        self.first = None
+        if self.dimen == 1 and self.size:
+            first, last = s.first(), s.last()
+            if type(first) is int and type(last) is int and last - first + 1 == self.size:
+                members = list(s)
+                if members == list(range(first, last + 1)):
+                    # contiguous integers (RangeSet(n), RangeSet(1, m.n), ...): position = member - first
+                    self.first = first
+        self._members = members if self.first is None else None
+        self._lookup = None
+
+    def members(self):
+        if self._members is None:
+            self._members = list(self.set)
+        return self._members
+
+    def position(self, member):
+        if self.first is not None:
+            k = _integer(member)
+            if k is not None and 0 <= k - self.first < self.size:
+                return k - self.first
+            # anything else goes through the members, like a dict Param would
+        if self._lookup is None:
+            self._lookup = {m: k for k, m in enumerate(self.members())}
+        return self._lookup[member]
+
+    def positions(self, column):
+        # vectorized position() for a column of members
+        if self.first is not None:
+            pos = np.asarray(column, dtype=np.int64) - self.first
+            if len(pos) and (pos.min() < 0 or pos.max() >= self.size):
+                raise KeyError("values for indices that are not in %s" % self.set.name)
+            return pos
+        return np.fromiter(map(self.position, column), dtype=np.int64, count=len(column))
+
+    def member(self, positions):
+        # members at an array of positions (python objects)
+        if self.first is not None:
+            return (positions + self.first).tolist()
+        members = self.members()
+        return [members[k] for k in positions.tolist()]
+
+
+class _ArrayStore(MutableMapping):
+    # the _data of an ArrayParam: index -> value, with the values in numpy arrays
+
+    def __init__(self, param, dense, dtype):
+        self._param = param
+        self._dense = dense
+        self._dtype = dtype
+        self._factors = None
+        self._pending_codes, self._pending_values = [], []
+        self._codes = np.zeros(0, dtype=np.int64)       # sparse: sorted codes
+        self._values = np.zeros(0, dtype=dtype or float)
+        self._given = None                               # dense: the entries that were set
+
+    # --- layout -------------------------------------------------------------------------------------------------
+
+    def _layout(self):
+        index_set = self._param.index_set()
+        if not index_set.isordered():
+            raise TypeError("ArrayParam %s needs ordered index sets" % self._param.name)
+        factors = index_set.subsets() if index_set.dimen != 1 and hasattr(index_set, 'subsets') else [index_set]
+        self._factors = [_Factor(s) for s in factors]
+        self._shape = tuple(f.size for f in self._factors)
+        total = 1
+        for size in self._shape:
+            total *= size
+        if total >= 2 ** 63:
+            raise OverflowError("index of ArrayParam %s too large for int64 codes" % self._param.name)
+        self._size = total
+        if self._dense:
+            self._values = np.zeros(total, dtype=self._dtype or float)
+            self._given = np.zeros(total, dtype=bool)
+
+    def _encode(self, index):
+        if self._factors is None:
+            self._layout()
+        if len(self._factors) == 1:
+            return self._factors[0].position(index)
+        if index.__class__ is not tuple:
+            raise KeyError(index)
+        code, k = 0, 0
+        for f, size in zip(self._factors, self._shape):
+            if f.dimen == 1:
+                part = index[k]
+            else:
+                part = index[k:k + f.dimen]
+            k += f.dimen
+            code = code * size + f.position(part)
+        if k != len(index):
+            raise KeyError(index)
+        return code
+
+    def _decode(self, codes):
+        # index tuples (or members) of an array of codes
+        if self._factors is None:
+            self._layout()
+        positions = np.unravel_index(codes, self._shape) if len(self._factors) > 1 else (codes,)
+        columns = [f.member(p) for f, p in zip(self._factors, positions)]
+        if len(columns) == 1:
+            return columns[0]
+        # flatten the factors with dimen > 1
+        rows = zip(*columns)
+        if all(f.dimen == 1 for f in self._factors):
+            return list(rows)
+        return [sum((m if isinstance(m, tuple) else (m,) for m in row), ()) for row in rows]
+
+    def _flush(self):
+        # sort the buffered entries into the arrays (the last value given for an index wins)
+        if not self._pending_codes:
+            return
+        codes = np.array(self._pending_codes, dtype=np.int64)
+        values = self._pending_values if self._dtype is None else np.array(self._pending_values, dtype=self._dtype)
+        self._pending_codes, self._pending_values = [], []
+        self.bulk(codes, values)
+
+    def bulk(self, codes, values):
+        if self._factors is None:
+            self._layout()
+        if self._dtype is not None or isinstance(values, np.ndarray):
+            values = np.asarray(values, dtype=self._dtype)
+        else:
+            values = _typed(values)
+        if self._dense:
+            if values.dtype != self._values.dtype and self._dtype is None:
+                # nothing given yet: the type of the values, else one that keeps both (never int -> float)
+                self._values = self._values.astype(_common(self._values.dtype, values.dtype)
+                                                   if self._given.any() else values.dtype)
+            self._values[codes] = values
+            self._given[codes] = True
+            return
+        codes = np.concatenate([self._codes, codes])
+        dtype = _common(self._values.dtype, values.dtype) if len(self._values) else values.dtype
+        values = np.concatenate([self._values.astype(dtype), values.astype(dtype)])
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        last = np.append(codes[1:] != codes[:-1], True) if len(codes) else np.zeros(0, dtype=bool)
+        self._codes, self._values = codes[last], values[order[last]]
+
+    # --- mapping --------------------------------------------------------------------------------------------------
+
+    def __getitem__(self, index):
+        if self._pending_codes:
+            self._flush()
+        try:
+            code = self._encode(index)
+        except (KeyError, IndexError, TypeError):
+            raise KeyError(index)
+        if self._dense:
+            if self._given[code]:
+                return _python(self._values[code])
+            raise KeyError(index)
+        k = np.searchsorted(self._codes, code)
+        if k < len(self._codes) and self._codes[k] == code:
+            return _python(self._values[k])
+        raise KeyError(index)
+
+    def __contains__(self, index):
+        try:
+            self[index]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, index, default=None):
+        try:
+            return self[index]
+        except KeyError:
+            return default
+
+    def __setitem__(self, index, value):
+        self._pending_codes.append(self._encode(index))
+        self._pending_values.append(value)
+
+    def __delitem__(self, index):
+        self._flush()
+        code = self._encode(index)
+        if self._dense:
+            self._given[code] = False
+            return
+        k = np.searchsorted(self._codes, code)
+        if k == len(self._codes) or self._codes[k] != code:
+            raise KeyError(index)
+        self._codes, self._values = np.delete(self._codes, k), np.delete(self._values, k)
+
+    def given_codes(self):
+        self._flush()
+        if self._factors is None:
+            self._layout()
+        return np.flatnonzero(self._given) if self._dense else self._codes
+
+    def given_values(self):
+        self._flush()
+        return self._values[self._given] if self._dense else self._values
+
+    def __iter__(self):
+        codes = self.given_codes()
+        for start in range(0, len(codes), 65536):
+            yield from self._decode(codes[start:start + 65536])
+
+    def __len__(self):
+        self._flush()
+        if self._dense:
+            return int(self._given.sum()) if self._given is not None else 0
+        return len(self._codes)
+
+    def nbytes(self):
+        self._flush()
+        return self._codes.nbytes + self._values.nbytes + (self._given.nbytes if self._given is not None else 0)
+
+
+class ArrayParam(IndexedParam):
+    """An immutable indexed Param whose entries are stored in numpy arrays (see the top of ArrayParam.py)."""
+
+    def __init__(self, *args, **kwds):
+        self._array_dense = kwds.pop('dense', False)
+        self._array_dtype = kwds.pop('dtype', None)
+        self._array_values = kwds.pop('values', None)
+        if kwds.get('mutable', False):
+            raise ValueError("ArrayParam stores plain numbers: it cannot be mutable")
+        IndexedParam.__init__(self, *args, **kwds)
+        self._data = _ArrayStore(self, self._array_dense, self._array_dtype)
+
+    def construct(self, data=None):
+        if self._constructed:
+            return
+        if self._anonymous_sets is not None:
+            for s in self._anonymous_sets:
+                s.construct()
+        values, self._array_values = self._array_values, None
+        if values is not None:
+            self._load_values(values)
+        IndexedParam.construct(self, data)
+
+    def _load_values(self, values):
+        store = self._data
+        store._layout()
+        if isinstance(values, tuple):
+            # index columns + values
+            *columns, data = values
+            factors = store._factors
+            if len(columns) != sum(f.dimen for f in factors):
+                raise ValueError("ArrayParam %s: %d index columns for an index of dimension %d"
+                                 % (self.name, len(columns), sum(f.dimen for f in factors)))
+            if any(f.dimen != 1 for f in factors):
+                raise ValueError("ArrayParam %s: values=(columns..., data) needs index sets of dimension 1"
+                                 % self.name)
+            positions = [f.positions(c) for f, c in zip(factors, columns)]
+            codes = np.ravel_multi_index(positions, store._shape) if len(positions) > 1 else positions[0]
+            store.bulk(codes, data)
+            return
+        try:
+            import scipy.sparse as sp
+            if sp.issparse(values):
+                coo = values.tocoo()
+                store.bulk(np.ravel_multi_index((coo.row, coo.col), store._shape), coo.data)
+                return
+        except ImportError:
+            pass
+        values = np.asarray(values)
+        if values.shape != store._shape and values.size == store._size:
+            values = values.reshape(store._shape)
+        if values.shape != store._shape:
+            raise ValueError("ArrayParam %s: array of shape %s for an index of shape %s"
+                             % (self.name, values.shape, store._shape))
+        # every position of the array is given (entries equal to the default are kept sparse)
+        flat = values.ravel()
+        if self._default_val is not self.NoValue and not self._array_dense:
+            codes = np.flatnonzero(flat != self._default_val)
+        else:
+            codes = np.arange(flat.size)
+        store.bulk(codes, flat[codes])
+
+    def is_reference(self):
+        # _data is not a dict, but this is not a Reference to other components
+        return False
+
+    # Param.sparse_* iterate over the whole index set when _data is not a dict: use the arrays instead
+
+    def sparse_keys(self, sort=None):
+        return iter(self._data)
+
+    def sparse_values(self, sort=None):
+        return iter(self._data.given_values().tolist())
+
+    def sparse_items(self, sort=None):
+        return zip(self._data, self._data.given_values().tolist())
+
+    def sparse_arrays(self):
+        # (index columns..., values) of the given entries as numpy arrays
+        store = self._data
+        codes = store.given_codes()
+        positions = np.unravel_index(codes, store._shape) if len(store._factors) > 1 else (codes,)
+        columns = [np.asarray(f.member(p)) for f, p in zip(store._factors, positions)]
+        return tuple(columns) + (store.given_values(),)
+
+    def nbytes(self):
+        # memory of the arrays
+        return self._data.nbytes()
+
+
+if __name__ == '__main__':
+    # bho.py's r(I, I, default=0) with n x n indices and `nnz` given entries: dict Param vs ArrayParam
+    import sys
+    import time
+    import tracemalloc
+
+    n = int(float(sys.argv[1])) if len(sys.argv) > 1 else 100000
+    nnz = int(float(sys.argv[2])) if len(sys.argv) > 2 else 10 ** 6
+    rng = np.random.default_rng(0)
+    rows, cols = rng.integers(1, n + 1, nnz), rng.integers(1, n + 1, nnz)
+    data = rng.random(nnz)
+    probe = list(zip(rows[:100000].tolist(), cols[:100000].tolist()))
+
+    for label in ('Param', 'ArrayParam'):
+        m = pyo.ConcreteModel()
+        m.I = pyo.RangeSet(n)
+        tracemalloc.start()
+        start = time.perf_counter()
+        if label == 'Param':
+            m.r = pyo.Param(m.I, m.I, default=0, initialize=dict(zip(zip(rows.tolist(), cols.tolist()), data.tolist())))
+        else:
+            m.r = ArrayParam(m.I, m.I, default=0, values=(rows, cols, data))
+        build = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        start = time.perf_counter()
+        total = sum(m.r[i, j] for i, j in probe) + m.r[1, 1]
+        lookup = (time.perf_counter() - start) / (len(probe) + 1)
+        entries = len(list(m.r.sparse_keys())) if label == 'ArrayParam' else len(m.r._data)
+        print("%-10s %9d entries: %7.1f MB (%5.1f bytes/entry), built in %.2f s, %.2f us per lookup, check %.3f"
+              % (label, entries, memory / 2 ** 20, memory / entries, build, lookup * 1e6, total))
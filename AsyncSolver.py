@@ -0,0 +1,235 @@
+# asyncio front end for the shell solvers (glpk, cbc, cplex, ...): many solves in flight in one python process.
+#
+# opt.solve(instance) blocks until the solver process ends, so a service that receives many independent requests
+# needs one thread per running glpk. Here a solve is split in the three phases of OptSolver.solve:
+#
+#   write     problem file + command line (opt._presolve)                      worker thread
+#   solve     the solver executable, as an asyncio subprocess                  event loop (no thread is waiting)
+#   read      solution file -> SolverResults, loaded into the instance         worker thread
+#
+# The python phases run on ONE worker thread shared by all the solvers of the process: they hold the GIL anyway,
+# and Pyomo keeps its temporary files in a global stack of contexts (TempfileManager) that two writes must not
+# interleave. The event loop only waits on the processes, so hundreds of solves can be in flight.
+#
+#   solver = AsyncSolver('glpk', limit=8, timeout=60)      at most 8 solver processes at once, 60 s each
+#   results = await solver.solve_async(instance)           like opt.solve(instance), same keywords
+#   results = await solver.solve_async(instance, timeout=5, options={'mipgap': 0.01})
+#   all_results = await solver.solve_many(instances)       results (or exceptions) in the order of instances
+#
+# A job that reaches its timeout, or whose task is cancelled (task.cancel(), asyncio.wait_for, a client that went
+# away), kills its solver process (and the processes it started) and removes its files: solve_async raises
+# TimeoutError / CancelledError. Solvers that are not shell commands (appsi, persistent, direct interfaces) are
+# solved with opt.solve on the worker thread: they are not killed on a timeout.
+# Every job needs its own instance: a job loads its solution into the instance it was given.
+
+import asyncio
+import functools
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pyomo.environ as pyo
+from pyomo.common.collections import Bunch
+from pyomo.common.errors import ApplicationError
+from pyomo.common.tempfiles import TempfileManager
+from pyomo.core.base.suffix import active_import_suffix_generator
+from pyomo.opt.solver import SystemCallSolver
+
+_executor = None
+
+
+def _worker():
+    # the thread of the write / read phases (one per process, see the top of the file)
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pyomo-io')
+    return _executor
+
+
+def _release(context):
+    # remove the files of a job whose context is not on the TempfileManager stack anymore
+    if context is not None:
+        context.release(remove=True)
+
+
+def _write(opt, instance, kwds):
+    # first half of OptSolver.solve: suffixes, options, problem file, command line
+    opt.available(exception_flag=True)
+    if not instance.is_constructed():
+        raise RuntimeError("Attempting to solve model=%s with unconstructed component(s)" % instance.name)
+    suffixes = [name for name, _ in active_import_suffix_generator(instance)]
+    if suffixes:
+        requested = kwds.setdefault('suffixes', [])
+        requested.extend(name for name in suffixes if name not in requested)
+    options = Bunch()
+    options.update(opt.options)
+    options.update(kwds.pop('options', {}))
+    options.update(opt._options_string_to_dict(kwds.pop('options_string', '')))
+    opt.options = options
+    depth = len(TempfileManager._context_stack)
+    try:
+        opt._presolve(instance, **kwds)
+    except BaseException:
+        while len(TempfileManager._context_stack) > depth:
+            TempfileManager.pop(remove=True)
+        raise
+    # _presolve pushed the context that owns the files of this solve: take it off the global stack so that the
+    # next job can push its own, _read puts it back for _postsolve
+    return TempfileManager._context_stack.pop()
+
+
+def _read(opt, instance, context, rc, log):
+    # second half of OptSolver.solve: solution file -> results -> instance
+    TempfileManager._context_stack.append(context)
+    opt._rc, opt._log = rc, log
+    try:
+        if opt._tee:
+            print(log)
+        if rc:
+            raise ApplicationError("Solver (%s) did not exit normally (return code %s)\n%s"
+                                   % (opt.name, rc, log[-2000:]))
+        results = opt._postsolve()
+    except BaseException:
+        if TempfileManager._context_stack and TempfileManager._context_stack[-1] is context:
+            TempfileManager.pop(remove=True)
+        raise
+    results._smap_id = opt._smap_id
+    results._smap = None
+    if opt._load_solutions:
+        instance.solutions.load_from(results, select=opt._select_index,
+                                     default_variable_value=opt._default_variable_value)
+        results._smap_id = None
+        results.solution.clear()
+    else:
+        results._smap = instance.solutions.symbol_map[opt._smap_id]
+        instance.solutions.delete_symbol_map(opt._smap_id)
+    return results
+
+
+def _kill(proc):
+    # the solver and everything it started (it runs in its own session)
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+class AsyncSolver(object):
+
+    def __init__(self, solver='glpk', limit=8, timeout=None, **factory_kwds):
+        self.solver = solver
+        self.timeout = timeout
+        self.factory_kwds = factory_kwds
+        self._limit = asyncio.Semaphore(limit) if limit else None
+        self.running = 0                    # solver processes alive now
+        self.stats = {'solved': 0, 'failed': 0, 'timeouts': 0, 'cancelled': 0}
+
+    def _solver(self):
+        # a new solver object per job: the solver plugins keep the state of a solve in the object
+        return pyo.SolverFactory(self.solver, **self.factory_kwds)
+
+    async def solve_async(self, instance, timeout=None, **kwds):
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            if self._limit is None:
+                results = await self._solve(instance, timeout, kwds)
+            else:
+                async with self._limit:
+                    results = await self._solve(instance, timeout, kwds)
+        except asyncio.CancelledError:
+            self.stats['cancelled'] += 1
+            raise
+        except TimeoutError:
+            self.stats['timeouts'] += 1
+            raise
+        except BaseException:
+            self.stats['failed'] += 1
+            raise
+        self.stats['solved'] += 1
+        return results
+
+    async def solve_many(self, instances, timeout=None, **kwds):
+        # results in the order of instances, the exception of a job in place of its results
+        return await asyncio.gather(*[self.solve_async(instance, timeout, **kwds) for instance in instances],
+                                    return_exceptions=True)
+
+    async def _solve(self, instance, timeout, kwds):
+        loop = asyncio.get_running_loop()
+        opt = self._solver()
+        if not isinstance(opt, SystemCallSolver):
+            # no process to run and kill: the whole solve on the worker thread
+            return await loop.run_in_executor(_worker(), functools.partial(opt.solve, instance, **kwds))
+        write = loop.run_in_executor(_worker(), _write, opt, instance, dict(kwds))
+        try:
+            context = await asyncio.shield(write)
+        except asyncio.CancelledError:
+            # the write goes on in the worker thread: its files are removed when it is done
+            write.add_done_callback(lambda f: f.cancelled() or f.exception() or _release(f.result()))
+            raise
+        try:
+            rc, log = await self._run(opt._command, timeout)
+        except BaseException:
+            _release(context)
+            raise
+        return await loop.run_in_executor(_worker(), _read, opt, instance, context, rc, log)
+
+    async def _run(self, command, timeout):
+        # the solver process: (return code, output)
+        script = command.script if 'script' in command else None
+        proc = await asyncio.create_subprocess_exec(
+            *command.cmd, stdin=asyncio.subprocess.PIPE if script is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, env=command.env,
+            cwd=command.cwd if 'cwd' in command else None, start_new_session=True)
+        self.running += 1
+        start = time.perf_counter()
+        try:
+            output, _ = await asyncio.wait_for(proc.communicate(script.encode() if script is not None else None),
+                                               timeout)
+        except asyncio.TimeoutError:
+            _kill(proc)
+            await proc.wait()
+            raise TimeoutError("%s killed after %.1f s (timeout=%s)"
+                               % (command.cmd[0], time.perf_counter() - start, timeout)) from None
+        except BaseException:
+            # cancelled: the process must not outlive its job
+            _kill(proc)
+            await asyncio.shield(proc.wait())
+            raise
+        finally:
+            self.running -= 1
+        return proc.returncode, output.decode(errors='replace')
+
+
+if __name__ == '__main__':
+    # n instances of abstract1.py (abstract1.dat) solved concurrently, then one job cancelled while it runs
+    import sys
+    import runpy
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    solver_name = sys.argv[2] if len(sys.argv) > 2 else 'glpk'
+    model = runpy.run_path('abstract1.py')['model']
+
+    async def main():
+        solver = AsyncSolver(solver_name, limit=16, timeout=60)
+        instances = [model.create_instance('abstract1.dat') for _ in range(n)]
+        start = time.perf_counter()
+        results = await solver.solve_many(instances)
+        elapsed = time.perf_counter() - start
+        ok = sum(1 for r in results if not isinstance(r, BaseException)
+                 and r.solver.termination_condition == pyo.TerminationCondition.optimal)
+        print("%d solves (%d optimal) in %.2f s, %.1f solves/s, x = %s" % (
+            n, ok, elapsed, n / elapsed, [pyo.value(v) for v in instances[-1].x.values()]))
+        job = asyncio.ensure_future(solver.solve_async(model.create_instance('abstract1.dat')))
+        await asyncio.sleep(0.01)
+        job.cancel()
+        try:
+            await job
+        except asyncio.CancelledError:
+            pass
+        print(solver.stats, "running:", solver.running)
+
+    asyncio.run(main())
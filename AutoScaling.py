@@ -0,0 +1,233 @@
+# Automatic scaling factors for TransformationFactory('core.scale_model').
+#
+# The scaling example of Pyomo_notes.py sets model.scaling_factor[...] by hand for the objective, the constraint and
+# the variable. With thousands (or millions) of rows that is not possible, and badly scaled models (like the
+# 1e8*x + 1e6*y objective of the example) make the solvers slow or inaccurate. Here the factors are computed from
+# the coefficient matrix itself:
+#
+#   1. the whole matrix A (and the objective c) is extracted at once with the standard form compiler (scipy sparse)
+#   2. row factors r and column factors s are computed with numpy so that the nonzeros of  diag(r) A diag(s)  are
+#      close to 1:
+#        'geometric'      a few passes of  r_i = 1/sqrt(max_j |a_ij| * min_j |a_ij|)  over the rows and then the
+#                         same over the columns (the usual geometric-mean scaling)
+#        'equilibration'  r_i = 1/max_j |a_ij|, then s_j = 1/max_i |r_i a_ij|  (largest entry of each row/column = 1)
+#      the factors are rounded to powers of 2 (pow2=True), so the scaling itself adds no rounding error
+#   3. model.scaling_factor is filled with one update() call: constraint i -> r_i, variable j -> 1/s_j
+#      (core.scale_model uses  x_scaled = factor * x), objective -> factor that brings its coefficients near 1
+#
+#   scaling = auto_scale(model)                                       fills model.scaling_factor
+#   scaled = pyo.TransformationFactory('core.scale_model').create_using(model)
+#   pyo.SolverFactory('glpk').solve(scaled)
+#   unscale(scaled, model, scaling)           values (and 'dual' / 'rc' suffixes) back into model, as numpy arrays
+#
+# For the matrix builders of MatrixModel.py there is no need for the transformation: scale_arrays() scales the
+# arrays returned by normalize() and unscale_arrays() maps the solution back.
+
+import numpy as np
+import scipy.sparse as sp
+
+import pyomo.environ as pyo
+from pyomo.repn.plugins.standard_form import LinearStandardFormCompiler
+
+
+class Scaling(object):
+    # the factors of auto_scale(), aligned with the rows / columns of the extracted matrix
+
+    def __init__(self, constraints, variables, objective, con_factor, var_factor, obj_factor, before, after):
+        self.constraints = constraints      # ConstraintData, one per row
+        self.variables = variables          # VarData, one per column
+        self.objective = objective          # the active objective (or None)
+        self.con_factor = con_factor        # r      (scaled row = r * row)
+        self.var_factor = var_factor        # 1 / s  (scaled var = var / s)
+        self.obj_factor = obj_factor
+        self.before = before                # max |a| / min |a| of the nonzeros, before and after scaling
+        self.after = after
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# factors from the matrix (numpy only)
+
+def _extremes(data, indptr, n):
+    # max and min of every row of a CSR (or column of a CSC) with positive data; 1 for the empty ones
+    mx, mn = np.ones(n), np.ones(n)
+    nonempty = np.diff(indptr) > 0
+    starts = indptr[:-1][nonempty]
+    if len(starts):
+        mx[nonempty] = np.maximum.reduceat(data, starts)
+        mn[nonempty] = np.minimum.reduceat(data, starts)
+    return mx, mn
+
+
+def _pow2(v):
+    return np.exp2(np.round(np.log2(v)))
+
+
+def ratio(A):
+    # max |a| / min |a| over the nonzeros (1 is perfectly scaled)
+    data = np.abs(sp.csr_matrix(A).data)
+    data = data[data > 0]
+    return float(data.max() / data.min()) if len(data) else 1.0
+
+
+def scaling_factors(A, method='geometric', passes=4, pow2=True):
+    # r, s such that the nonzeros of diag(r) A diag(s) are close to 1
+    A = sp.csr_matrix(A)
+    A.eliminate_zeros()
+    m, n = A.shape
+    rows = np.repeat(np.arange(m), np.diff(A.indptr))
+    cols = A.indices
+    data = np.abs(A.data)
+    # the same nonzeros in column order, to reduce over the columns
+    order = np.lexsort((rows, cols))
+    col_ptr = np.concatenate([[0], np.cumsum(np.bincount(cols, minlength=n))])
+
+    r, s = np.ones(m), np.ones(n)
+    if method == 'geometric':
+        spread = np.inf
+        for _ in range(passes):
+            mx, mn = _extremes(data * r[rows] * s[cols], A.indptr, m)
+            r /= np.sqrt(mx * mn)
+            mx, mn = _extremes((data * r[rows] * s[cols])[order], col_ptr, n)
+            s /= np.sqrt(mx * mn)
+            # stop when a pass does not reduce the spread of the entries any more
+            scaled = data * r[rows] * s[cols]
+            new = scaled.max() / scaled.min() if len(scaled) else 1.0
+            if new > 0.9 * spread:
+                break
+            spread = new
+    elif method == 'equilibration':
+        r /= _extremes(data, A.indptr, m)[0]
+        s /= _extremes((data * r[rows])[order], col_ptr, n)[0]
+    else:
+        raise ValueError("unknown scaling method %r (use 'geometric' or 'equilibration')" % method)
+    if pow2:
+        r, s = _pow2(r), _pow2(s)
+    return r, s
+
+
+def objective_factor(c, s, method='geometric', pow2=True):
+    # factor for the objective  c'x  once the columns are scaled by s
+    c = np.abs(np.asarray(c, dtype=float) * s)
+    c = c[c > 0]
+    if not len(c):
+        return 1.0
+    f = 1.0 / np.sqrt(c.max() * c.min()) if method == 'geometric' else 1.0 / c.max()
+    return float(_pow2(f)) if pow2 else float(f)
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# Pyomo models: core.scale_model
+
+def auto_scale(model, method='geometric', passes=4, pow2=True, objective=True):
+    # compute the factors of every active linear constraint / variable / objective and store them in
+    # model.scaling_factor (created if needed); returns the Scaling for unscale()
+    repn = LinearStandardFormCompiler().write(model, mixed_form=True, set_sense=None)
+    # ranged constraints are two identical rows in mixed form: they get the same factor, keep one
+    constraints, first = [], {}
+    for k, row in enumerate(repn.rows):
+        if id(row.constraint) not in first:
+            first[id(row.constraint)] = k
+            constraints.append(row.constraint)
+    keep = np.fromiter(first.values(), dtype=np.int64, count=len(first))
+
+    A = repn.A.tocsr()
+    r, s = scaling_factors(A, method, passes, pow2)
+    con_factor, var_factor = r[keep], 1.0 / s
+
+    obj, obj_factor = None, 1.0
+    if objective and len(repn.objectives):
+        obj = repn.objectives[0]
+        obj_factor = objective_factor(repn.c.toarray()[0], s, method, pow2)
+
+    suffix = model.component('scaling_factor')
+    if suffix is None:
+        model.scaling_factor = suffix = pyo.Suffix(direction=pyo.Suffix.EXPORT)
+    suffix.update(zip(constraints, con_factor.tolist()))
+    suffix.update(zip(repn.columns, var_factor.tolist()))
+    if obj is not None:
+        suffix[obj] = obj_factor
+    return Scaling(constraints, list(repn.columns), obj, con_factor, var_factor, obj_factor,
+                   ratio(A), ratio(sp.diags(r) @ A @ sp.diags(s)))
+
+
+def _counterparts(scaled_model, model, components, ctype):
+    # the components of scaled_model that correspond to `components` of model (create_using() clones the model,
+    # so the component data come in the same order)
+    position = {id(c): k for k, c in enumerate(model.component_data_objects(ctype, descend_into=True))}
+    scaled = list(scaled_model.component_data_objects(ctype, descend_into=True))
+    return [scaled[position[id(c)]] for c in components]
+
+
+def _suffix_values(suffix, components):
+    return np.array([suffix.get(c, np.nan) for c in components], dtype=float)
+
+
+def unscale(scaled_model, model, scaling):
+    # solution of scaled_model -> model:  x = x_scaled / var_factor,  dual = dual_scaled * con_factor / obj_factor,
+    # rc = rc_scaled * var_factor / obj_factor ; the arithmetic is done on whole arrays
+    scaled_vars = _counterparts(scaled_model, model, scaling.variables, pyo.Var)
+    x = np.array([np.nan if v.value is None else v.value for v in scaled_vars], dtype=float)
+    x /= scaling.var_factor
+    for v, value in zip(scaling.variables, x.tolist()):
+        if value == value:                  # not nan
+            v.set_value(value, skip_validation=True)
+
+    for name, components, ctype, factor in (
+            ('dual', scaling.constraints, pyo.Constraint, scaling.con_factor),
+            ('rc', scaling.variables, pyo.Var, scaling.var_factor)):
+        source, target = scaled_model.component(name), model.component(name)
+        if not isinstance(source, pyo.Suffix) or not isinstance(target, pyo.Suffix):
+            continue
+        values = _suffix_values(source, _counterparts(scaled_model, model, components, ctype))
+        values *= factor / scaling.obj_factor
+        target.update((c, v) for c, v in zip(components, values.tolist()) if v == v)
+    return x
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# arrays (MatrixModel.normalize): no transformation needed
+
+def scale_arrays(A, row_lb, row_ub, c, lb, ub, method='geometric', passes=4, pow2=True):
+    # the same problem with  A' = diag(r) A diag(s),  x = diag(s) x' ; returns the scaled arrays and (r, s, obj)
+    A = sp.csr_matrix(A)
+    r, s = scaling_factors(A, method, passes, pow2)
+    f = objective_factor(c, s, method, pow2)
+    with np.errstate(invalid='ignore'):         # inf bounds stay inf
+        scaled = (sp.diags(r) @ A @ sp.diags(s), row_lb * r, row_ub * r, np.asarray(c) * s * f, lb / s, ub / s)
+    return scaled, (r, s, f)
+
+
+def unscale_arrays(factors, x, duals=None):
+    # solution of the scaled arrays -> solution of the original ones
+    r, s, f = factors
+    x = np.asarray(x, dtype=float) * s
+    return x if duals is None else (x, np.asarray(duals, dtype=float) * r / f)
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+
+    # the example of Pyomo_notes.py, without writing the factors by hand
+    model = pyo.ConcreteModel()
+    model.x = pyo.Var(bounds=(-5, 5), initialize=1.0)
+    model.y = pyo.Var(bounds=(0, 1), initialize=1.0)
+    model.obj = pyo.Objective(expr=1e8 * model.x + 1e6 * model.y)
+    model.con = pyo.Constraint(expr=model.x + model.y == 1.0)
+    scaling = auto_scale(model)
+    for component, factor in model.scaling_factor.items():
+        print("%-5s %g" % (component.name, factor))
+
+    # a badly scaled random matrix model: coefficients between 1e-4 and 1e4 with row and column magnitudes
+    from MatrixModel import build_matrix_model
+
+    m = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    rng = np.random.default_rng(0)
+    rows, cols = np.repeat(np.arange(m), 5), rng.integers(0, m, 5 * m)
+    A = sp.csr_matrix((1 + rng.random(5 * m), (rows, cols)), shape=(m, m))
+    A = sp.diags(10.0 ** rng.uniform(-4, 4, m)) @ A @ sp.diags(10.0 ** rng.uniform(-4, 4, m))
+    model = build_matrix_model(A, np.ones(m), np.ones(m), '>=', bounds=(0, None))
+    start = time.perf_counter()
+    scaling = auto_scale(model)
+    print("\n%d rows, %d nonzeros: factors in %.2f s, max/min |a| from %.1e to %.1e"
+          % (m, A.nnz, time.perf_counter() - start, scaling.before, scaling.after))
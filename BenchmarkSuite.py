@@ -0,0 +1,274 @@
+# Benchmark suite built from the example models of this repository, generated at any size.
+#
+#   axb       abstract1.py           min c'x  s.t.  Ax >= b, x >= 0, a read from a .dat file (sparse, default=0)
+#   mixed     Exercise1.py           max c'x  s.t.  mixed <= / >= rows through the sign vector d, 0 <= x <= 10
+#   cutloop   ExampleIterativeModels.py   binary x, `iterations` no-good cuts, one re-solve per cut
+#   sparse0   bho.py                 Param r(I, I, default=0) with only `density` of the entries given (data dict),
+#                                    used as the rows of  sum_j r[i,j] x[j] >= q[i]
+#
+# For every model and size (m rows, n columns, density of the matrix) the phases are timed separately:
+#   generate     creating the random data (and writing the .dat file), not part of the model itself
+#   data_load    reading the data (DataPortal for the .dat files)
+#   create_instance   create_instance() WITHOUT the constraints
+#   expressions  building the constraints (the rule of the Constraint component)
+#   write        the solver writing its input file (the _presolve phase of the SolverFactory solvers)
+#   solve        the solver itself (_apply_solver)
+#   read         reading the solver output back (_postsolve)
+#   load         loading the solution into the instance (instance.solutions.load_from)
+# Solvers without these phases (in-process ones) report the whole call as "solve".
+#
+# The output is one JSON object per line (model, size, phase times, problem size, versions), e.g.
+#   python BenchmarkSuite.py --models axb,mixed --sizes 1000x1000x0.01,100000x100000x0.0001 --out bench.jsonl
+# and the files of different releases can be compared line by line.
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+import pyomo
+import pyomo.environ as pyo
+
+from SparseRows import row_index, sparse_sum
+
+# ----------------------------------------------------------------------------------------------------------------
+# timing helpers
+
+
+@contextmanager
+def phase(times, name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        times[name] = times.get(name, 0.0) + time.perf_counter() - start
+
+
+def timed_solver(name, times):
+    # SolverFactory(name) with its write / solve / read phases timed into `times`
+    if name == 'numpy':
+        import NumpySolver  # noqa: F401 (registers the in-process 'numpy' solver of NumpySolver.py)
+    opt = pyo.SolverFactory(name)
+    for attr, label in (('_presolve', 'write'), ('_apply_solver', 'solve'), ('_postsolve', 'read')):
+        method = getattr(opt, attr, None)
+        if method is None:
+            continue
+
+        def wrapper(*args, _method=method, _label=label, **kwds):
+            with phase(times, _label):
+                return _method(*args, **kwds)
+
+        setattr(opt, attr, wrapper)
+    return opt
+
+
+def solve(opt, instance, times):
+    has_phases = hasattr(opt, '_apply_solver')
+    with phase(times, 'solve_call'):
+        results = opt.solve(instance, load_solutions=False)
+    if not has_phases:
+        times['solve'] = times.get('solve', 0.0) + times['solve_call']
+    times.pop('solve_call')
+    status = results.solver.termination_condition
+    if status == pyo.TerminationCondition.optimal:
+        with phase(times, 'load'):
+            instance.solutions.load_from(results)
+    return str(status)
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# data generation (vectorized, so it also works for millions of rows)
+
+def sparse_matrix(m, n, density, rng):
+    # at least one nonzero per row, (row, col, value) with 1-based indices and no duplicates
+    nnz = max(int(m * n * density), m)
+    rows = np.concatenate([np.arange(m), rng.integers(0, m, nnz - m)])
+    cols = rng.integers(0, n, nnz)
+    key = np.unique(rows.astype(np.int64) * n + cols)
+    return key // n + 1, key % n + 1, rng.integers(1, 10, len(key))
+
+
+def write_param(f, name, *columns):
+    f.write("param %s :=\n" % name)
+    np.savetxt(f, np.column_stack(columns), fmt='%d')
+    f.write(";\n")
+
+
+def write_dat(filename, m, n, i, j, a, b, c, d=None):
+    with open(filename, 'w') as f:
+        f.write("param m := %d ;\nparam n := %d ;\n" % (m, n))
+        write_param(f, 'a', i, j, a)
+        write_param(f, 'b', np.arange(1, m + 1), b)
+        write_param(f, 'c', np.arange(1, n + 1), c)
+        if d is not None:
+            write_param(f, 'd', np.arange(1, m + 1), d)
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# the models (constraints are added after create_instance so that they can be timed on their own)
+
+def matrix_model(mixed):
+    model = pyo.AbstractModel()
+    model.m = pyo.Param(within=pyo.NonNegativeIntegers)
+    model.n = pyo.Param(within=pyo.NonNegativeIntegers)
+    model.I = pyo.RangeSet(1, model.m)
+    model.J = pyo.RangeSet(1, model.n)
+    model.a = pyo.Param(model.I, model.J, default=0)
+    model.b = pyo.Param(model.I)
+    model.c = pyo.Param(model.J)
+    if mixed:
+        model.d = pyo.Param(model.I)
+        model.x = pyo.Var(model.J, bounds=(0, 10))
+        model.OBJ = pyo.Objective(rule=lambda m: pyo.summation(m.c, m.x), sense=pyo.maximize)
+    else:
+        model.x = pyo.Var(model.J, domain=pyo.NonNegativeReals)
+        model.OBJ = pyo.Objective(rule=lambda m: pyo.summation(m.c, m.x))
+    return model
+
+
+def add_rows(instance, mixed):
+    row_index(instance.a)
+    if mixed:
+        def rule(m, i):
+            return m.d[i] * sparse_sum(m.a, m.x, i) <= m.d[i] * m.b[i]
+    else:
+        def rule(m, i):
+            return sparse_sum(m.a, m.x, i) >= m.b[i]
+    instance.AxbConstraint = pyo.Constraint(instance.I, rule=rule)
+
+
+def run_matrix(kind, m, n, density, solver, rng, workdir):
+    times = {}
+    mixed = kind == 'mixed'
+    with phase(times, 'generate'):
+        i, j, a = sparse_matrix(m, n, density, rng)
+        c = rng.integers(1, 10, n)
+        if mixed:
+            # rows built around a feasible point x0 so that every instance has a solution
+            x0 = rng.random(n) * 10
+            ax0 = np.bincount(i - 1, weights=a * x0[j - 1], minlength=m)
+            d = rng.choice([1, -1], m)
+            b = np.where(d > 0, np.ceil(ax0 + rng.random(m) * 5), np.floor(ax0 - rng.random(m) * 5))
+        else:
+            b, d = rng.integers(1, 10, m), None
+        dat = os.path.join(workdir, '%s_%d_%d.dat' % (kind, m, n))
+        write_dat(dat, m, n, i, j, a, b, c, d)
+
+    model = matrix_model(mixed)
+    with phase(times, 'data_load'):
+        data = pyo.DataPortal(model=model, filename=dat)
+    with phase(times, 'create_instance'):
+        instance = model.create_instance(data)
+    with phase(times, 'expressions'):
+        add_rows(instance, mixed)
+    status = solve(timed_solver(solver, times), instance, times) if solver != 'none' else None
+    return times, status, len(a)
+
+
+def run_sparse0(kind, m, n, density, solver, rng, workdir):
+    # bho.py: square Param r(I, I, default=0) from a data dict
+    times = {}
+    with phase(times, 'generate'):
+        i, j, r = sparse_matrix(m, m, density, rng)
+        q = rng.integers(1, 10, m)
+    model = pyo.AbstractModel()
+    model.I = pyo.Set()
+    model.p = pyo.Param()
+    model.q = pyo.Param(model.I)
+    model.r = pyo.Param(model.I, model.I, default=0)
+    model.x = pyo.Var(model.I, domain=pyo.NonNegativeReals)
+    model.OBJ = pyo.Objective(rule=lambda mdl: pyo.summation(mdl.x))
+    with phase(times, 'data_load'):
+        data = {None: {
+            'I': {None: list(range(1, m + 1))},
+            'p': {None: 100},
+            'q': dict(zip(range(1, m + 1), q.tolist())),
+            'r': dict(zip(zip(i.tolist(), j.tolist()), r.tolist())),
+        }}
+    with phase(times, 'create_instance'):
+        instance = model.create_instance(data)
+    with phase(times, 'expressions'):
+        instance.rows = pyo.Constraint(instance.I, rule=lambda mdl, k: sparse_sum(mdl.r, mdl.x, k) >= mdl.q[k])
+    status = solve(timed_solver(solver, times), instance, times) if solver != 'none' else None
+    return times, status, len(r)
+
+
+def run_cutloop(kind, m, n, density, solver, rng, workdir):
+    # ExampleIterativeModels.py with n binaries and random costs; m is the number of cut iterations
+    times = {}
+    iterations = m
+    with phase(times, 'generate'):
+        c = rng.integers(1, 10, n)
+    model = pyo.AbstractModel()
+    model.J = pyo.RangeSet(n)
+    model.c = pyo.Param(model.J, initialize=dict(zip(range(1, n + 1), c.tolist())))
+    model.x = pyo.Var(model.J, within=pyo.Binary)
+    model.o = pyo.Objective(rule=lambda mdl: pyo.summation(mdl.c, mdl.x))
+    model.cuts = pyo.ConstraintList()
+    times['data_load'] = 0.0
+    with phase(times, 'create_instance'):
+        instance = model.create_instance()
+    if solver == 'none':
+        return times, None, 0
+    opt = timed_solver(solver, times)
+    status = solve(opt, instance, times)
+    for _ in range(iterations):
+        if status != 'optimal':
+            break
+        with phase(times, 'expressions'):
+            expr = 0
+            for j in instance.x:
+                if pyo.value(instance.x[j]) < 0.5:
+                    expr += instance.x[j]
+                else:
+                    expr += 1 - instance.x[j]
+            instance.cuts.add(expr >= 1)
+        status = solve(opt, instance, times)
+    return times, status, iterations * n
+
+
+MODELS = {'axb': run_matrix, 'mixed': run_matrix, 'sparse0': run_sparse0, 'cutloop': run_cutloop}
+
+
+def parse_size(text):
+    # "m x n x density" (density optional, default 0.01)
+    parts = text.lower().split('x')
+    density = float(parts[2]) if len(parts) > 2 else 0.01
+    return int(float(parts[0])), int(float(parts[1])), density
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Phase timings of the example models at configurable sizes")
+    parser.add_argument('--models', default='axb,mixed,cutloop,sparse0')
+    parser.add_argument('--sizes', default='100x100x0.05,1000x1000x0.01',
+                        help="comma separated m x n x density (for cutloop m is the number of cuts)")
+    parser.add_argument('--solver', default='glpk', help="SolverFactory name, 'none' to skip the solve phases")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='-', help="JSON lines output file (default stdout)")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.out == '-' else open(args.out, 'a')
+    meta = {'pyomo': pyomo.version.version, 'python': platform.python_version(), 'numpy': np.__version__,
+            'platform': platform.platform(), 'solver': args.solver, 'timestamp': time.time()}
+    with tempfile.TemporaryDirectory() as workdir:
+        for kind in args.models.split(','):
+            for size in args.sizes.split(','):
+                m, n, density = parse_size(size)
+                rng = np.random.default_rng(args.seed)
+                times, status, nnz = MODELS[kind](kind, m, n, density, args.solver, rng, workdir)
+                record = dict(meta, model=kind, m=m, n=n, density=density, nnz=int(nnz), status=status,
+                              phases={k: round(v, 6) for k, v in times.items()})
+                out.write(json.dumps(record) + '\n')
+                out.flush()
+    if out is not sys.stdout:
+        out.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,508 @@
+# Re-solving after small edits without sending the whole model again.
+#
+# Pyomo_notes.py: "the models we define can be changed and re-solved without having to re-instantiate the model":
+# instance.x[2].fix(1), instance.x[2].unfix(), model.obj.expr += 10 * model.y, model.obj.deactivate(), ...
+# but every opt.solve(instance) writes the whole LP file again, and an appsi persistent solver with its default
+# update_config looks at every constraint and variable of the model to find what changed (PersistentIterativeModels.py
+# switches that off and says explicitly what changed). Here the model keeps a log of the changes, and two solver
+# interfaces apply only those:
+#
+#   ChangeLog(instance)       while it is open, records the variables that were fixed / unfixed / got new bounds or
+#                             a new domain (or a new value while fixed), the constraints and objectives that were
+#                             activated / deactivated / given a new expression / deleted, and new values of mutable
+#                             Params (it patches the Pyomo classes while open, like Instrumentation.py)
+#   PersistentSync(instance)  an appsi persistent solver (HiGHS by default) that receives only the logged changes:
+#                             update_variables for the variables, add / remove for the constraints, set_objective
+#   PatchedLP(instance)       an LP file kept as one cached text per row, objective and bound: a change rewrites only
+#                             its own rows / bound lines, and the file is the join of the cached pieces; it is solved
+#                             by any shell solver (glpk, cbc, ...) and the solution is loaded back by label
+#
+#   sync = PersistentSync(instance)                or   lp = PatchedLP(instance)
+#   results = sync.solve()                              results = lp.solve(pyo.SolverFactory('glpk'))
+#   instance.x[2].fix(1); instance.obj.expr += 10 * instance.y; instance.c[3].deactivate()
+#   results = sync.solve()                              (only x[2], obj and c[3] are sent / rewritten)
+#   sync.close()                                        stops recording
+#
+# In both, fixed variables stay in the rows as columns with lb = ub = value, so fixing and unfixing is a bound
+# change and never rewrites the rows that contain the variable. Only linear models are supported.
+# python ChangeTracker.py [n] [solver] runs the benchmark: time to re-solve against the number of changes.
+
+import time
+from contextlib import contextmanager
+
+import pyomo.environ as pyo
+from pyomo.common.collections import ComponentMap, ComponentSet
+from pyomo.core.base.block import BlockData
+from pyomo.core.base.component import ActiveComponentData
+from pyomo.core.base.constraint import ConstraintData, ScalarConstraint
+from pyomo.core.base.label import AlphaNumericTextLabeler
+from pyomo.core.base.objective import ObjectiveData, ScalarObjective
+from pyomo.core.base.param import ParamData
+from pyomo.core.base.var import IndexedVar, VarData
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.repn import generate_standard_repn
+
+_logs = []          # the open ChangeLogs
+_paused = 0         # > 0 while the solver interfaces change the model themselves
+_saved = []         # (class, attribute, original) of the patches
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# recording
+
+def _record(kind, obj):
+    if _paused:
+        return
+    for log in _logs:
+        log._record(kind, obj)
+
+
+def _method(kind, original, when=None):
+    def patched(self, *args, **kwds):
+        if when is None or when(self):
+            _record(kind, self)
+        return original(self, *args, **kwds)
+    return patched
+
+
+def _setter(kind, prop):
+    def fset(self, val):
+        _record(kind, self)
+        prop.fset(self, val)
+    return property(prop.fget, fset, prop.fdel, prop.__doc__)
+
+
+def _deleting(original):
+    # del_component: the constraints / objectives are recorded while they still belong to the model
+    def del_component(self, name_or_object):
+        if _logs and not _paused:
+            comp = self.component(name_or_object) if isinstance(name_or_object, str) else name_or_object
+            if comp is not None and comp.ctype in (pyo.Constraint, pyo.Objective):
+                for data in comp.values():
+                    _record('delete', data)
+        return original(self, name_or_object)
+    return del_component
+
+
+def _install():
+    patches = [
+        (VarData, 'fixed', 'var', 'property'), (VarData, 'lower', 'var', 'property'),
+        (VarData, 'upper', 'var', 'property'), (VarData, 'domain', 'var', 'property'),
+        (VarData, 'set_value', 'var', lambda v: v._fixed),
+        (IndexedVar, 'domain', 'indexed var', 'property'),
+        (ActiveComponentData, 'activate', 'active', None), (ActiveComponentData, 'deactivate', 'active', None),
+        (ConstraintData, 'set_value', 'expr', None), (ScalarConstraint, 'set_value', 'expr', None),
+        (ObjectiveData, 'set_value', 'expr', None), (ObjectiveData, 'set_sense', 'expr', None),
+        (ScalarObjective, 'set_value', 'expr', None), (ScalarObjective, 'set_sense', 'expr', None),
+        (ParamData, 'set_value', 'param', None),
+        (BlockData, 'del_component', 'delete', 'delete'),
+    ]
+    for cls, name, kind, how in patches:
+        original = cls.__dict__[name]
+        _saved.append((cls, name, original))
+        if how == 'property':
+            setattr(cls, name, _setter(kind, original))
+        elif how == 'delete':
+            setattr(cls, name, _deleting(original))
+        else:
+            setattr(cls, name, _method(kind, original, how))
+
+
+def _uninstall():
+    while _saved:
+        cls, name, original = _saved.pop()
+        setattr(cls, name, original)
+
+
+@contextmanager
+def paused():
+    # changes made inside are not recorded (the solver interfaces use it when they change the model themselves)
+    global _paused
+    _paused += 1
+    try:
+        yield
+    finally:
+        _paused -= 1
+
+
+class ChangeLog(object):
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.vars = ComponentSet()          # fixed / unfixed / bounds / domain / value while fixed
+        self.constraints = ComponentSet()   # activated / deactivated / new expression / new / deleted
+        self.modified = ComponentSet()      # the constraints among those with a new expression
+        self.objective = False              # an objective was activated / deactivated / changed
+        self.params = False                 # a mutable Param has a new value
+        if not _logs:
+            _install()
+        _logs.append(self)
+
+    def close(self):
+        if self in _logs:
+            _logs.remove(self)
+            if not _logs:
+                _uninstall()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.vars) + len(self.constraints) + self.objective + self.params
+
+    def clear(self):
+        self.vars = ComponentSet()
+        self.constraints = ComponentSet()
+        self.modified = ComponentSet()
+        self.objective = self.params = False
+
+    def _record(self, kind, obj):
+        if kind == 'indexed var':
+            if obj.model() is self.instance:
+                self.vars.update(obj.values())
+            return
+        if kind == 'param':
+            if obj.parent_component()._mutable and obj.model() is self.instance:
+                self.params = True
+            return
+        if obj.model() is not self.instance:
+            return
+        if kind == 'var':
+            self.vars.add(obj)
+        elif obj.ctype is pyo.Constraint:
+            self.constraints.add(obj)
+            if kind == 'expr':
+                self.modified.add(obj)
+        elif obj.ctype is pyo.Objective:
+            self.objective = True
+
+
+def _active_objective(instance):
+    objectives = list(instance.component_data_objects(pyo.Objective, active=True, descend_into=True))
+    if len(objectives) > 1:
+        raise ValueError("more than one active objective in %s" % instance.name)
+    return objectives[0] if objectives else None
+
+
+def _in_model(con, instance):
+    return con.parent_block() is not None and con.model() is instance and con.active and con.body is not None
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# appsi persistent solver
+
+class PersistentSync(object):
+
+    def __init__(self, instance, opt=None, log=None):
+        from pyomo.contrib import appsi
+        self.instance = instance
+        self.opt = opt if opt is not None else appsi.solvers.Highs()
+        if not self.opt.available():
+            raise RuntimeError("the persistent solver is not available (HiGHS: pip install highspy)")
+        config = self.opt.update_config
+        # nothing is searched for at solve time: the log says what changed
+        for option in ('check_for_new_or_removed_constraints', 'check_for_new_or_removed_vars',
+                       'check_for_new_or_removed_params', 'check_for_new_objective', 'update_constraints',
+                       'update_vars', 'update_params', 'update_named_expressions', 'update_objective'):
+            setattr(config, option, False)
+        # fixed variables are columns with lb = ub = value: fixing one does not rebuild its rows
+        config.treat_fixed_vars_as_params = False
+        self.log = log if log is not None else ChangeLog(instance)
+        with paused():
+            self.opt.set_instance(instance)
+        self.loaded = ComponentSet(instance.component_data_objects(pyo.Constraint, active=True, descend_into=True))
+        self.log.clear()
+
+    def update(self):
+        # send the logged changes to the solver
+        log, opt = self.log, self.opt
+        with paused():
+            remove = [c for c in log.constraints if c in self.loaded
+                      and (c in log.modified or not _in_model(c, self.instance))]
+            if remove:
+                opt.remove_constraints(remove)
+                for c in remove:
+                    self.loaded.remove(c)
+            add = [c for c in log.constraints if c not in self.loaded and _in_model(c, self.instance)]
+            if add:
+                opt.add_constraints(add)
+                self.loaded.update(add)
+            known = opt._vars
+            changed = [v for v in log.vars if id(v) in known]
+            if changed:
+                opt.update_variables(changed)
+            if log.objective:
+                opt.set_objective(_active_objective(self.instance))
+            if log.params:
+                opt.update_params()
+        log.clear()
+
+    def solve(self):
+        start = time.perf_counter()
+        self.update()
+        self.timing = {'update': time.perf_counter() - start}
+        with paused():
+            return self.opt.solve(self.instance)
+
+    def close(self):
+        self.log.close()
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# LP file patched row by row
+
+def _num(v):
+    if v == float('inf'):
+        return '+inf'
+    if v == float('-inf'):
+        return '-inf'
+    return repr(int(v)) if v == int(v) and abs(v) < 2 ** 53 else repr(float(v))
+
+
+class PatchedLP(object):
+
+    def __init__(self, instance, log=None, filename='patched.lp'):
+        self.instance = instance
+        self.filename = filename
+        self.log = log if log is not None else ChangeLog(instance)
+        self._labeler = AlphaNumericTextLabeler()
+        self._label = ComponentMap()        # var / constraint / objective -> LP label
+        self._vars = {}                     # label -> var
+        self._rows = ComponentMap()         # constraint -> text of its row(s), in the order of the file
+        self._row_con = {}                  # row label -> constraint
+        self._bounds = ComponentMap()       # var -> (bound line, 'general' / 'binary' / None)
+        with paused():
+            self._objective = self._objective_text()
+            for con in instance.component_data_objects(pyo.Constraint, active=True, descend_into=True):
+                self._rows[con] = self._row_text(con)
+        self.log.clear()
+
+    def label(self, obj):
+        label = self._label.get(obj)
+        if label is None:
+            label = self._label[obj] = self._labeler(obj)
+            if obj.ctype is pyo.Var:
+                self._vars[label] = obj
+        return label
+
+    def _linear(self, expr):
+        # constant, 'terms' text of a linear expression; fixed variables stay variables (bounds lb = ub)
+        fixed = [v for v in identify_variables(expr, include_fixed=True) if v.fixed]
+        for v in fixed:
+            v.unfix()
+        try:
+            repn = generate_standard_repn(expr, compute_values=True, quadratic=False)
+        finally:
+            for v in fixed:
+                v.fix()
+        if not repn.is_linear():
+            raise ValueError("PatchedLP only writes linear models: %s" % (expr,))
+        terms = []
+        for coef, var in zip(repn.linear_coefs, repn.linear_vars):
+            if var not in self._bounds:
+                self._bounds[var] = self._bound(var)
+            terms.append('%s%s %s\n' % ('+' if coef >= 0 else '', _num(coef), self.label(var)))
+        return pyo.value(repn.constant), ''.join(terms) or '+0 ONE_VAR_CONSTANT\n'
+
+    def _bound(self, var):
+        if var.fixed:
+            lb = ub = pyo.value(var)
+        else:
+            lb = var.lb if var.lb is not None else float('-inf')
+            ub = var.ub if var.ub is not None else float('inf')
+        kind = 'binary' if var.is_binary() else 'general' if var.is_integer() else None
+        return '   %s <= %s <= %s\n' % (_num(lb), self.label(var), _num(ub)), kind
+
+    def _row_text(self, con):
+        constant, terms = self._linear(con.body)
+        label = self.label(con)
+        lb, ub = con.lb, con.ub
+        rows = []
+        if lb is not None and ub is not None and lb == ub:
+            rows.append(('c_e_%s_' % label, '= %s' % _num(ub - constant)))
+        else:
+            ranged = lb is not None and ub is not None
+            if lb is not None:
+                rows.append(('%s_l_%s_' % ('r' if ranged else 'c', label), '>= %s' % _num(lb - constant)))
+            if ub is not None:
+                rows.append(('%s_u_%s_' % ('r' if ranged else 'c', label), '<= %s' % _num(ub - constant)))
+        for row, _ in rows:
+            self._row_con[row] = con
+        return ''.join('\n%s:\n%s%s\n' % (row, terms, rhs) for row, rhs in rows)
+
+    def _objective_text(self):
+        obj = _active_objective(self.instance)
+        if obj is None:
+            return 'min \nno_objective:\n+0 ONE_VAR_CONSTANT\n'
+        constant, terms = self._linear(obj.expr)
+        if constant:
+            terms = '%s%s ONE_VAR_CONSTANT\n' % ('+' if constant >= 0 else '', _num(constant)) + terms
+        return '%s \n%s:\n%s' % ('max' if obj.sense == pyo.maximize else 'min', self.label(obj), terms)
+
+    def update(self):
+        # rewrite the rows, bound lines and objective of the logged changes
+        log = self.log
+        with paused():
+            for con in log.constraints:
+                if _in_model(con, self.instance):
+                    if con in log.modified or con not in self._rows:
+                        self._rows[con] = self._row_text(con)
+                else:
+                    self._rows.pop(con, None)
+            for var in log.vars:
+                if var in self._bounds:
+                    self._bounds[var] = self._bound(var)
+            if log.objective or log.params:
+                self._objective = self._objective_text()
+            if log.params:
+                # a mutable Param can be in any row
+                for con in self._rows:
+                    self._rows[con] = self._row_text(con)
+        log.clear()
+
+    def write(self, filename=None):
+        filename = filename or self.filename
+        general = [self.label(v) for v, (_, kind) in self._bounds.items() if kind == 'general']
+        binary = [self.label(v) for v, (_, kind) in self._bounds.items() if kind == 'binary']
+        with open(filename, 'w') as f:
+            f.write('\\* Source Pyomo model name=%s (PatchedLP) *\\\n\n' % self.instance.name)
+            f.write(self._objective)
+            f.write('\ns.t.\n')
+            f.writelines(self._rows.values())
+            f.write('\nc_e_ONE_VAR_CONSTANT:\n+1 ONE_VAR_CONSTANT\n= 1\n\nbounds\n')
+            f.write('   1 <= ONE_VAR_CONSTANT <= 1\n')
+            f.writelines(line for line, _ in self._bounds.values())
+            if general:
+                f.write('general\n')
+                f.writelines('  %s\n' % name for name in general)
+            if binary:
+                f.write('binary\n')
+                f.writelines('  %s\n' % name for name in binary)
+            f.write('end\n')
+        return filename
+
+    def solve(self, opt, **kwds):
+        # update + write + opt.solve(file); the solution (and the duals if there is a 'dual' Suffix) goes to the instance
+        start = time.perf_counter()
+        self.update()
+        filename = self.write()
+        self.timing = {'update': time.perf_counter() - start}     # log applied + file written
+        dual = self.instance.component('dual')
+        if isinstance(dual, pyo.Suffix) and dual.import_enabled():
+            kwds.setdefault('suffixes', ['dual'])
+        results = opt.solve(filename, **kwds)
+        if len(results.solution) == 0:
+            return results
+        soln = results.solution(0)
+        with paused():
+            for var in self._bounds:
+                if not var.fixed:
+                    var.set_value(0, skip_validation=True)      # the solution files list the nonzeros only
+            for label, info in soln.variable.items():
+                var = self._vars.get(label)
+                if var is not None and not var.fixed:
+                    var.set_value(info['Value'], skip_validation=True)
+        if 'suffixes' in kwds:
+            for label, info in soln.constraint.items():
+                con = self._row_con.get(label)
+                if con is not None and info.get('Dual'):
+                    dual[con] = info['Dual']
+        return results
+
+    def close(self):
+        self.log.close()
+
+
+if __name__ == '__main__':
+    # time to re-solve a random LP after k changes (fix / unfix / new upper bound), for growing k:
+    #   rewrite     opt.solve(instance) with a shell solver: the whole LP file every time
+    #   patched     PatchedLP with the same shell solver: only the changed bound lines are rewritten
+    #   appsi scan  appsi HiGHS with its default update_config: the whole model is checked for changes
+    #   appsi log   PersistentSync: only the logged variables are sent
+    import os
+    import sys
+    import tempfile
+
+    import numpy as np
+    from pyomo.contrib import appsi
+
+    n = int(float(sys.argv[1])) if len(sys.argv) > 1 else 2000
+    solver = sys.argv[2] if len(sys.argv) > 2 else 'glpk'
+    m = n // 2
+
+    def build(rng):
+        model = pyo.ConcreteModel()
+        model.x = pyo.Var(range(n), bounds=(0, 10))
+        cost = rng.random(n) + 0.1
+        model.obj = pyo.Objective(expr=sum(float(c) * model.x[j] for j, c in enumerate(cost)))
+        cols = [rng.choice(n, min(10, n), replace=False) for _ in range(m)]
+        model.c = pyo.Constraint(range(m), rule=lambda mod, i: sum(mod.x[int(j)] for j in cols[i]) >= 1)
+        return model
+
+    def change(model, k, step, rng):
+        # k changes: fix at the current value, unfix, tighten an upper bound
+        for j in rng.choice(n, min(k, n), replace=False).tolist():
+            v = model.x[j]
+            if v.fixed:
+                v.unfix()
+            elif (j + step) % 2:
+                v.fix(pyo.value(v))
+            else:
+                v.setub(9 + rng.random())
+
+    def measured(f):
+        start = time.perf_counter()
+        f()
+        return time.perf_counter() - start
+
+    # every method: (session to close, re-solve, time of the update part of the last re-solve)
+    shell = pyo.SolverFactory(solver)
+    methods = {}
+    if shell.available(exception_flag=False):
+        scratch = os.path.join(tempfile.mkdtemp(), 'scratch.lp')
+
+        def rewrite(model):
+            # the update part of opt.solve is writing the LP file (measured by writing it once more)
+            return None, lambda: shell.solve(model), lambda: measured(lambda: model.write(scratch))
+
+        def patched(model):
+            lp = PatchedLP(model, filename=scratch)
+            return lp, lambda: lp.solve(shell), lambda: lp.timing['update']
+
+        methods['rewrite'], methods['patched'] = rewrite, patched
+    else:
+        print("%s not found: only the persistent solvers" % solver)
+
+    def appsi_scan(model):
+        # the update part is the scan of the model for changes (measured by running it once more)
+        opt = appsi.solvers.Highs()
+        opt.set_instance(model)
+        return None, lambda: opt.solve(model), lambda: measured(opt.update)
+
+    def appsi_log(model):
+        sync = PersistentSync(model)
+        return sync, sync.solve, lambda: sync.timing['update']
+
+    methods['appsi scan'], methods['appsi log'] = appsi_scan, appsi_log
+
+    ks = sorted({min(k, n) for k in (1, 10, 100, 1000)})      # at most n changes for small models
+    print("%d variables, %d constraints: seconds to re-solve after k changes (update = sending the changes)" % (n, m))
+    print("%-12s" % 'k' + ''.join('%10d' % k for k in ks) + '    ' + ''.join('%10d' % k for k in ks))
+    print("%-12s%-44s%s" % ('', '  re-solve', '  update'))
+    for name, make in methods.items():
+        rng = np.random.default_rng(0)         # the same model and the same changes for every method
+        model = build(rng)
+        session, solve, update_time = make(model)
+        solve()
+        times, updates = [], []
+        for step, k in enumerate(ks):
+            change(model, k, step, rng)
+            times.append(measured(solve))
+            updates.append(update_time())
+        print("%-12s" % name + ''.join('%10.4f' % t for t in times) + '    ' + ''.join('%10.4f' % t for t in updates),
+              "  objective %.6f" % pyo.value(model.obj))
+        if session is not None:
+            session.close()
@@ -0,0 +1,300 @@
+# Compiled binary cache for .dat data files (abstract1.dat and friends).
+#
+# The .dat grammar (param :=, table, set of tuples, namespace, include, see Pyomo_notes.py) is parsed as text every
+# time a model is instantiated. For big data files the parsing takes longer than the solve, so here the file is
+# parsed ONCE and "compiled" to a cache directory next to it:
+#
+#   abstract1.dat.cache/
+#       manifest.json          content hash, include dependencies, namespaces and the list of components
+#       <n>.npy                one typed array per column (index columns and value column of every Set/Param),
+#                              + a bool array marking the ints of a column of ints mixed with floats
+#
+# The arrays are opened with np.load(mmap_mode='r'), so nothing is read from disk until it is used, and the
+# components are filled straight from the arrays (no intermediate python dict of the whole file).
+# The cache is rebuilt when the sha256 of the .dat file or of any file it includes changes
+# (size and modification time are checked first, the content hash only when they differ; when the hash still
+# matches, the new size and time are written to the manifest so the file is not hashed again).
+#
+# Usage (instead of  model.create_instance('abstract1.dat')):
+#   from DatCache import load_dat
+#   data = load_dat('abstract1.dat', model)          a DataPortal, compiled on the first call
+#   instance = model.create_instance(data)
+#   instance = model.create_instance(data, namespaces=['ns1'])
+#
+#   or from the terminal:   python DatCache.py abstract1.py abstract1.dat      (compiles the file)
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+import pyomo.environ as pyo
+
+CACHE_VERSION = 2
+CHUNK = 65536       # rows converted to python objects at a time when filling a component
+
+_include_re = re.compile(r'^\s*include\s+["\']?([^"\';\s]+)["\']?\s*;?', re.MULTILINE)
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# dependencies and hashing
+
+def dependencies(filename):
+    # the .dat file and every file it includes (recursively), in order of appearance
+    found = []
+    todo = [os.path.abspath(filename)]
+    while todo:
+        name = todo.pop(0)
+        if name in found:
+            continue
+        found.append(name)
+        with open(name, 'r') as f:
+            text = f.read()
+        # like the DataPortal, include paths are relative to the working directory
+        todo.extend(os.path.abspath(inc) for inc in _include_re.findall(text))
+    return found
+
+
+def content_hash(files):
+    h = hashlib.sha256()
+    for name in files:
+        h.update(name.encode())
+        with open(name, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    return h.hexdigest()
+
+
+def _stamp(name):
+    st = os.stat(name)
+    return [st.st_size, st.st_mtime_ns]
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# writing
+
+def _column(values):
+    # (typed array, is-int mask or None) for a column, or None when the values have mixed types or ints beyond
+    # int64 (they are kept inline in the manifest). Ints mixed with floats are stored as float64 + the mask, so
+    # they are read back as ints, like the DataPortal gives them.
+    types = set(map(type, values))
+    try:
+        if types <= {int}:
+            return np.array(values, dtype=np.int64), None
+        if types <= {int, float}:
+            array = np.array(values, dtype=np.float64)
+            ints = np.fromiter((type(v) is int for v in values), dtype=np.bool_, count=len(values))
+            if (np.abs(array[ints]) > 2 ** 53).any():
+                return None                             # not exact in float64
+            return array, ints
+    except OverflowError:
+        return None
+    if types <= {bool}:
+        return np.array(values, dtype=np.bool_), None
+    if types <= {str}:
+        return np.array(values, dtype=np.str_), None
+    return None
+
+
+def _write_table(directory, rows, counter):
+    # rows: list of tuples -> list of column files (or inline values)
+    columns = []
+    for values in zip(*rows):
+        typed = _column(list(values))
+        if typed is None:
+            columns.append({'inline': list(values)})
+            continue
+        array, ints = typed
+        fname = '%d.npy' % next(counter)
+        np.save(os.path.join(directory, fname), array)
+        columns.append({'file': fname})
+        if ints is not None:
+            columns[-1]['ints'] = '%d.npy' % next(counter)
+            np.save(os.path.join(directory, columns[-1]['ints']), ints)
+    return columns
+
+
+def _entry(directory, data, counter):
+    if list(data.keys()) == [None]:
+        value = data[None]
+        if isinstance(value, (list, tuple, set)):
+            # a Set: one row per member
+            rows = [v if isinstance(v, tuple) else (v,) for v in value]
+            return {'kind': 'set', 'length': len(rows), 'dimen': len(rows[0]) if rows else 1,
+                    'columns': _write_table(directory, rows, counter)}
+        return {'kind': 'scalar', 'value': value}
+    # an indexed Param: index columns + value column
+    rows = [(k if isinstance(k, tuple) else (k,)) + (v,) for k, v in data.items()]
+    return {'kind': 'param', 'length': len(rows), 'dimen': len(rows[0]) - 1,
+            'columns': _write_table(directory, rows, counter)}
+
+
+def cache_path(filename):
+    return os.path.abspath(filename) + '.cache'
+
+
+def compile_dat(filename, model):
+    """Parse the .dat file with the DataPortal and write its compiled cache, return the cache directory."""
+    deps = dependencies(filename)
+    portal = pyo.DataPortal(model=model, filename=filename)
+
+    target = cache_path(filename)
+    tmp = target + '.tmp%d' % os.getpid()
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    counter = iter(range(sys.maxsize))
+    manifest = {
+        'version': CACHE_VERSION,
+        'hash': content_hash(deps),
+        'dependencies': [[name] + _stamp(name) for name in deps],
+        'defaults': portal._default,
+        'namespaces': [[ns, {name: _entry(tmp, data, counter) for name, data in components.items()}]
+                       for ns, components in portal._data.items()],
+    }
+    with open(os.path.join(tmp, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return target
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# reading
+
+class _Rows(Sequence):
+    # the members of a Set, read from the column arrays
+    def __init__(self, columns, length):
+        self._columns = columns
+        self._length = length
+
+    def __len__(self):
+        return self._length
+
+    def _chunk(self, start, stop):
+        cols = [c[start:stop] if isinstance(c, list) else _values(c, start, stop) for c in self._columns]
+        return cols[0] if len(cols) == 1 else list(zip(*cols))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self._chunk(*i.indices(self._length)[:2])
+        if i < 0:
+            i += self._length
+        return self._chunk(i, i + 1)[0]
+
+    def __iter__(self):
+        for start in range(0, self._length, CHUNK):
+            yield from self._chunk(start, start + CHUNK)
+
+
+class _IntFloatColumn(np.ndarray):
+    # float64 column of ints mixed with floats: an array of floats for numpy, `ints` marks the ones that were ints
+    ints = None
+
+
+def _values(column, start, stop):
+    values = column[start:stop].tolist()
+    ints = getattr(column, 'ints', None)
+    if ints is not None:
+        for k in np.flatnonzero(ints[start:stop]).tolist():
+            values[k] = int(values[k])
+    return values
+
+
+class _ParamData(Mapping):
+    # index -> value of an indexed Param, read from the column arrays.
+    # Param.construct() only calls items(), lookups build an index dict on first use.
+    def __init__(self, columns, length):
+        self._keys = _Rows(columns[:-1], length)
+        self._values = _Rows(columns[-1:], length)
+        self._lookup = None
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def items(self):
+        return zip(self._keys, self._values)
+
+    def __getitem__(self, key):
+        if self._lookup is None:
+            self._lookup = dict(self.items())
+        return self._lookup[key]
+
+
+def _open_columns(directory, columns):
+    opened = []
+    for c in columns:
+        if 'inline' in c:
+            opened.append(c['inline'])
+            continue
+        array = np.load(os.path.join(directory, c['file']), mmap_mode='r')
+        if 'ints' in c:
+            array = array.view(_IntFloatColumn)
+            array.ints = np.load(os.path.join(directory, c['ints']), mmap_mode='r')
+        opened.append(array)
+    return opened
+
+
+def _is_fresh(manifest, target):
+    deps = [d[0] for d in manifest['dependencies']]
+    try:
+        if all(_stamp(d[0]) == d[1:] for d in manifest['dependencies']):
+            return True
+        if content_hash(deps) != manifest['hash'] or deps != dependencies(deps[0]):
+            return False
+        stamps = [[name] + _stamp(name) for name in deps]
+    except OSError:
+        return False
+    # same content with a new size / mtime (touched, copied): store the new stamps, or every later load rehashes
+    manifest['dependencies'] = stamps
+    tmp = os.path.join(target, 'manifest.json.tmp%d' % os.getpid())
+    try:
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp, os.path.join(target, 'manifest.json'))
+    except OSError:
+        pass                                          # read-only cache: still fresh, only hashed again next time
+    return True
+
+
+def load_dat(filename, model):
+    """Return a DataPortal for the .dat file read from its compiled cache (compiled first if missing or stale)."""
+    target = cache_path(filename)
+    manifest = None
+    try:
+        with open(os.path.join(target, 'manifest.json')) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        pass
+    if manifest is None or manifest.get('version') != CACHE_VERSION or not _is_fresh(manifest, target):
+        compile_dat(filename, model)
+        with open(os.path.join(target, 'manifest.json')) as f:
+            manifest = json.load(f)
+
+    data = {}
+    for ns, components in manifest['namespaces']:
+        data[ns] = {}
+        for name, entry in components.items():
+            if entry['kind'] == 'scalar':
+                data[ns][name] = {None: entry['value']}
+            elif entry['kind'] == 'set':
+                data[ns][name] = {None: _Rows(_open_columns(target, entry['columns']), entry['length'])}
+            else:
+                data[ns][name] = _ParamData(_open_columns(target, entry['columns']), entry['length'])
+    portal = pyo.DataPortal(data_dict=data, model=model)
+    portal._default = dict(manifest['defaults'])
+    return portal
+
+
+if __name__ == '__main__':
+    # python DatCache.py <model file> <data file>    compiles the data file for the `model` of the model file
+    import runpy
+    model = runpy.run_path(sys.argv[1])['model']
+    print("compiled to", compile_dat(sys.argv[2], model))
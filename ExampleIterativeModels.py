@@ -28,6 +28,7 @@ results = opt.solve(instance)
 instance.display()
 
 # Iterate to eliminate the previously found solution
+# (SolutionPool.py does the same with enumerate_solutions(instance, instance.x, k) without rebuilding the cut expression)
 for i in range(5):
     expr = 0
     for j in instance.x:
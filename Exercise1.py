@@ -34,6 +34,7 @@ def Obj(model):
 
 model.OBJ = pyo.Objective(rule=Obj, sense=pyo.maximize)
 
+# (MatrixModel.py builds this same problem from the {(j,i): coef} dict and the sign vector d)
 def Constr(model, j):
     return ((model.d[j]*(sum(model.x[i]*model.b[j,i]) <= model.c[j])) for i in model.I)
 
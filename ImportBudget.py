@@ -0,0 +1,57 @@
+# Startup-time benchmark: how long a fresh python process needs before it can build and solve a model.
+#
+# Every run starts a new interpreter (like a serverless cold start) that imports Pyomo, builds the model of
+# Attempt1.py and creates its solver, and reports the time spent from the first import to the ready solver.
+# It is measured for "import pyomo.environ" and for "import LazyPyomo" (the lazy import path) and the best of
+# `runs` runs is kept. The script exits with status 1 when the lazy path is over the budget, so it can be used
+# as a check before a release:
+#
+#   python ImportBudget.py                     budget 0.15 s, 5 runs, solver glpk
+#   python ImportBudget.py 0.10 10 numpy       budget, runs, solver
+
+import json
+import os
+import subprocess
+import sys
+
+SNIPPET = r'''
+import time
+start = time.perf_counter()
+import %(module)s as pyo
+model = pyo.ConcreteModel()
+model.x = pyo.Var([0, 1], domain=pyo.NonNegativeReals)
+model.OBJ = pyo.Objective(expr=2 * model.x[0] + 3 * model.x[1])
+model.CON = pyo.Constraint(expr=3 * model.x[0] + 4 * model.x[1] >= 1)
+opt = pyo.SolverFactory(%(solver)r)
+print(time.perf_counter() - start)
+'''
+
+
+def startup_time(module, solver, runs):
+    # best wall time over `runs` fresh interpreters
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', SNIPPET % {'module': module, 'solver': solver}],
+                             cwd=here, capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.split()[-1]))
+    return min(times)
+
+
+if __name__ == '__main__':
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 0.15
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    solver = sys.argv[3] if len(sys.argv) > 3 else 'glpk'
+
+    report = {
+        'solver': solver,
+        'runs': runs,
+        'budget_s': budget,
+        'pyomo.environ_s': startup_time('pyomo.environ', solver, runs),
+        'LazyPyomo_s': startup_time('LazyPyomo', solver, runs),
+    }
+    report['ok'] = report['LazyPyomo_s'] <= budget
+    print(json.dumps(report, indent=2))
+    if not report['ok']:
+        print("startup regression: %.3f s > budget %.3f s" % (report['LazyPyomo_s'], budget), file=sys.stderr)
+        sys.exit(1)
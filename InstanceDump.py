@@ -0,0 +1,593 @@
+# inst.pprint() / instance.display() for big instances, and a columnar dump of a whole instance.
+#
+# AnotherTry.py, bho.py, Exercise1.py, ... call inst.pprint() or instance.display() to see what was built. Pyomo
+# prints EVERY index of every component, a Constraint with its whole expression, and it formats all the rows of a
+# component in memory first (to align the columns): on an instance with millions of rows that is minutes of work
+# and gigabytes of strings, for output nobody reads. Here:
+#
+#   pprint(instance)                              like inst.pprint(): at most 10 rows per component + a summary
+#   pprint(instance, ostream=f, max_rows=100)     rows are written to f as they are produced (any open file)
+#   display(instance, max_rows=5)                 like instance.display(): values instead of expressions
+#   pprint(instance.x) / display(instance.con)    one component
+#   summary(instance)                             only the summary line of every component
+#
+# The summary line of a component is computed in the same pass over it:
+#   Set         members (of all the indices), dimen
+#   Param       values stored (the others are the default), value range
+#   Var         fixed, integer (binary), values [min, max] and how many are None, ranges of the bounds
+#   Constraint  active, equalities, nonzeros (distinct variables per row) and the longest row; with display the range
+#               of the body values and the rows that are violated (by more than tol)
+#   Objective   nonzeros, value range
+# Only the first max_terms terms of a long sum are printed: "3*x[1] + x[2] + ... (5000 terms)".
+#
+# dump(instance, 'inst.dump') writes a directory with manifest.json and one .npy file per column (the layout of
+# the DatCache.py cache): Set members, Param index and values, Var index / value / lb / ub / fixed / domain,
+# Constraint index / lower / upper / active, and the linear part of the active constraints and objectives as CSR
+# arrays (the standard form compiler, as in SolutionArrays.py: fixed variables are moved to the bounds). The
+# columns are built with one list per component and written with np.save; most of the time of a dump is the
+# compiler (dump(instance, target, matrix=False) skips the matrix).
+#
+#   d = load('inst.dump')        only manifest.json is read here
+#   d.names                      the components, in the order of the instance
+#   d['x'].value                 numpy array (opened with mmap_mode='r' on first access), d['x'].index the keys
+#   d['x'].frame()               a pandas DataFrame indexed like the component (if pandas is installed)
+#   A, lower, upper = d.matrix() scipy CSR matrix (rows: all the constraints, columns: all the variables)
+#   d.load_values(instance)      puts the variable values back into an instance of the same model
+
+import itertools
+import json
+import os
+import sys
+
+import numpy as np
+import scipy.sparse as sp
+
+import pyomo.environ as pyo
+from pyomo.common.dependencies import pandas as pd, pandas_available
+from pyomo.core.expr.numeric_expr import MonomialTermExpression, SumExpression
+from pyomo.core.expr.visitor import identify_variables
+from pyomo.repn.plugins.standard_form import LinearStandardFormCompiler
+
+from DatCache import _Rows, _open_columns, _write_table
+
+DUMP_VERSION = 1
+_shown = (pyo.Set, pyo.RangeSet, pyo.Param, pyo.Var, pyo.Expression, pyo.Objective, pyo.Constraint)
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# pprint / display
+
+class _Range(object):
+    # count, min and max of the numbers seen, and how many were None
+    __slots__ = ('count', 'none', 'low', 'high')
+
+    def __init__(self):
+        self.count = self.none = 0
+        self.low = self.high = None
+
+    def add(self, value):
+        if value is None:
+            self.none += 1
+        elif isinstance(value, (int, float)):
+            self.count += 1
+            if self.low is None or value < self.low:
+                self.low = value
+            if self.high is None or value > self.high:
+                self.high = value
+
+    def __str__(self):
+        text = '-' if self.low is None else '[%s, %s]' % (self.low, self.high)
+        return text + (' (None: %d)' % self.none if self.none else '')
+
+
+def _text(expr, max_terms):
+    # the expression as text, with at most max_terms terms of a sum
+    if isinstance(expr, SumExpression) and expr.nargs() > max_terms:
+        terms = ' + '.join(str(expr.arg(i)) for i in range(max_terms))
+        return '%s + ... (%d terms)' % (terms, expr.nargs())
+    return str(expr)
+
+
+def _nonzeros(expr):
+    # number of distinct variables in an expression (a variable repeated in a linear sum is one nonzero)
+    if not hasattr(expr, 'is_expression_type'):
+        return 0
+    if isinstance(expr, SumExpression):
+        seen = set()
+        for arg in expr.args:
+            if arg.__class__ is MonomialTermExpression:
+                seen.add(id(arg.args[1]))
+            elif getattr(arg, 'is_variable_type', bool)():
+                seen.add(id(arg))
+            elif hasattr(arg, 'is_expression_type'):
+                seen.update(id(v) for v in identify_variables(arg))
+        return len(seen)
+    if expr.is_variable_type():
+        return 1
+    return sum(1 for _ in identify_variables(expr))
+
+
+def _number(value):
+    return value if value is None or isinstance(value, (int, float)) else pyo.value(value, exception=False)
+
+
+def _set(component, values, max_terms, shown):
+    if not component.is_indexed():
+        dimen = component.dimen
+        members = _Range()
+        header = 'Size=%d, Dimen=%s, Ordered=%s' % (len(component), dimen, component.isordered())
+
+        def rows():
+            for member in component:
+                members.count += 1
+                yield (str(member),) if members.count <= shown else None
+        return header, ('Members',), rows(), lambda: 'members=%d, dimen=%s' % (members.count, dimen)
+
+    total = [0]
+    dimen = next(iter(component.values())).dimen if len(component) else None
+    header = 'Size=%d, Index=%s, Dimen=%s' % (len(component), component.index_set().name, dimen)
+
+    def rows():
+        for n, (key, data) in enumerate(component.items()):
+            total[0] += len(data)
+            if n >= shown:
+                yield None
+                continue
+            members = ', '.join(str(member) for member in itertools.islice(data, max_terms))
+            yield str(key), str(len(data)), '{%s%s}' % (members, ', ...' if len(data) > max_terms else '')
+    return header, ('Key', 'Size', 'Members'), rows(), lambda: 'members=%d, dimen=%s' % (total[0], dimen)
+
+
+def _param(component, values, max_terms, shown):
+    value_range = _Range()
+    stored = len(component._data) if component.is_indexed() else 1
+    header = 'Size=%d, Index=%s, Default=%s, Mutable=%s' % (
+        len(component), component.index_set().name if component.is_indexed() else None,
+        component._default_val if component._default_val is not pyo.Param.NoValue else None, component.mutable)
+
+    def rows():
+        for n, (key, data) in enumerate(component.items()):
+            value = _number(data)
+            value_range.add(value)
+            yield (str(key), str(value if value is not None else data)) if n < shown else None
+    return header, ('Key', 'Value'), rows(), lambda: 'stored=%d, value=%s' % (stored, value_range)
+
+
+def _var(component, values, max_terms, shown):
+    value_range, lower, upper = _Range(), _Range(), _Range()
+    counts = {'fixed': 0, 'integer': 0, 'binary': 0}
+    header = 'Size=%d, Index=%s' % (len(component), component.index_set().name if component.is_indexed() else None)
+
+    def rows():
+        for n, (key, var) in enumerate(component.items()):
+            lb, value, ub = var.lb, var.value, var.ub
+            value_range.add(value)
+            lower.add(lb)
+            upper.add(ub)
+            counts['fixed'] += var.fixed
+            if var.is_integer():
+                counts['integer'] += 1
+                counts['binary'] += var.is_binary()
+            yield (str(key), str(lb), str(value), str(ub), str(var.fixed), str(var.stale),
+                   str(var.domain.local_name if hasattr(var.domain, 'local_name') else var.domain)) if n < shown else None
+
+    def summary():
+        return ('fixed=%(fixed)d, integer=%(integer)d (binary=%(binary)d), ' % counts
+                + 'value=%s, lb=%s, ub=%s' % (value_range, lower, upper))
+    return header, ('Key', 'Lower', 'Value', 'Upper', 'Fixed', 'Stale', 'Domain'), rows(), summary
+
+
+def _constraint(component, values, max_terms, shown, tol=1e-6):
+    counts = {'active': 0, 'equality': 0, 'nonzeros': 0, 'longest': 0, 'violated': 0}
+    body_range = _Range()
+    header = 'Size=%d, Index=%s' % (len(component), component.index_set().name if component.is_indexed() else None)
+
+    def rows():
+        for n, (key, con) in enumerate(component.items()):
+            nonzeros = _nonzeros(con.body)
+            counts['nonzeros'] += nonzeros
+            counts['longest'] = max(counts['longest'], nonzeros)
+            counts['equality'] += con.equality
+            if not values:
+                counts['active'] += con.active
+                yield (str(key), str(con.lb), _text(con.body, max_terms), str(con.ub), str(con.active)) \
+                    if n < shown else None
+                continue
+            if not con.active:
+                continue
+            counts['active'] += 1
+            lb, ub = con.lb, con.ub
+            body = pyo.value(con.body, exception=False)
+            body_range.add(body)
+            if body is not None and ((lb is not None and lb - body > tol) or (ub is not None and body - ub > tol)):
+                counts['violated'] += 1
+            yield (str(key), str(lb), str(body), str(ub)) if counts['active'] <= shown else None
+
+    def summary():
+        text = 'active=%(active)d, equality=%(equality)d, nonzeros=%(nonzeros)d (longest row: %(longest)d)' % counts
+        if values:
+            text += ', body=%s, violated=%d' % (body_range, counts['violated'])
+        return text
+    columns = ('Key', 'Lower', 'Body', 'Upper') + (() if values else ('Active',))
+    return header, columns, rows(), summary
+
+
+def _objective(component, values, max_terms, shown):
+    value_range = _Range()
+    nonzeros = [0]
+    header = 'Size=%d, Index=%s' % (len(component), component.index_set().name if component.is_indexed() else None)
+
+    def rows():
+        for n, (key, obj) in enumerate(component.items()):
+            nonzeros[0] += _nonzeros(obj.expr)
+            sense = 'minimize' if obj.sense == pyo.minimize else 'maximize'
+            if values:
+                value = pyo.value(obj, exception=False)
+                value_range.add(value)
+                yield (str(key), str(obj.active), sense, str(value)) if n < shown else None
+            else:
+                yield (str(key), str(obj.active), sense, _text(obj.expr, max_terms)) if n < shown else None
+
+    def summary():
+        return 'nonzeros=%d' % nonzeros[0] + (', value=%s' % value_range if values else '')
+    return header, ('Key', 'Active', 'Sense', 'Value' if values else 'Expression'), rows(), summary
+
+
+def _expression(component, values, max_terms, shown):
+    value_range = _Range()
+    header = 'Size=%d, Index=%s' % (len(component), component.index_set().name if component.is_indexed() else None)
+
+    def rows():
+        for n, (key, expr) in enumerate(component.items()):
+            if values:
+                value = pyo.value(expr, exception=False)
+                value_range.add(value)
+                yield (str(key), str(value)) if n < shown else None
+            else:
+                yield (str(key), _text(expr.expr, max_terms)) if n < shown else None
+    return header, ('Key', 'Value' if values else 'Expression'), rows(), lambda: 'value=%s' % value_range
+
+
+_renderers = {pyo.Set: _set, pyo.RangeSet: _set, pyo.Param: _param, pyo.Var: _var, pyo.Constraint: _constraint,
+              pyo.Objective: _objective, pyo.Expression: _expression}
+
+
+def _write_component(component, ostream, max_rows, values, max_terms):
+    renderer = _renderers.get(component.ctype)
+    if renderer is None or (component.ctype in (pyo.Set, pyo.RangeSet) and not component.is_indexed()
+                            and not component.isfinite()):
+        ostream.write('%s : %s, Size=%d\n' % (component.name, component.ctype.__name__, len(component)))
+        return
+    # the renderers format the first max_rows rows, the other ones (None) only go into the summary
+    header, columns, rows, summary = renderer(component, values, max_terms, max_rows)
+    ostream.write('%s : %s\n' % (component.name, header))
+    if max_rows:
+        # only the first max_rows rows are kept in memory (to align their columns)
+        first = [columns] + list(itertools.islice(rows, max_rows))
+        widths = [max(len(row[i]) for row in first) for i in range(len(columns))]
+        for row in first:
+            ostream.write('    ' + ' : '.join(cell.rjust(width) for cell, width in zip(row, widths)) + '\n')
+    more = sum(1 for _ in rows)     # the rest of the pass, for the summary
+    if more and max_rows:
+        ostream.write('    ... %d more\n' % more)
+    ostream.write('    Summary: %s\n' % summary())
+
+
+def _components(block, ctypes):
+    if block.ctype in ctypes and block.parent_block() is not None or not hasattr(block, 'component_objects'):
+        return [block]
+    return block.component_objects(ctypes, descend_into=True)
+
+
+def pprint(component, ostream=None, max_rows=10, max_terms=10):
+    """inst.pprint() with at most max_rows rows per component and a summary line, written row by row."""
+    ostream = ostream or sys.stdout
+    for c in _components(component, _shown):
+        _write_component(c, ostream, max_rows, False, max_terms)
+
+
+def display(component, ostream=None, max_rows=10, max_terms=10):
+    """instance.display() with at most max_rows rows per component and a summary line, written row by row."""
+    ostream = ostream or sys.stdout
+    for c in _components(component, (pyo.Var, pyo.Objective, pyo.Constraint, pyo.Expression)):
+        _write_component(c, ostream, max_rows, True, max_terms)
+
+
+def summary(component, ostream=None, values=True):
+    """Only the summary line of every component."""
+    ostream = ostream or sys.stdout
+    for c in _components(component, _shown):
+        _write_component(c, ostream, 0, values, 0)
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# columnar dump
+
+def _save(directory, array, counter):
+    fname = '%d.npy' % next(counter)
+    np.save(os.path.join(directory, fname), array)
+    return fname
+
+
+def _keys(component):
+    return [key if isinstance(key, tuple) else (key,) for key in component.keys()]
+
+
+def _floats(values, missing):
+    return np.array([missing if v is None else v for v in values], dtype=np.float64)
+
+
+def _csr(matrix, row_of, col_of, shape):
+    # rows/columns of a compiler matrix -> rows/columns of the dump (only the first row of a ranged constraint)
+    coo = matrix.tocoo()
+    rows, first = np.unique(row_of, return_index=True)
+    keep = np.zeros(len(row_of), dtype=bool)
+    keep[first] = True
+    mask = keep[coo.row]
+    return sp.csr_matrix((coo.data[mask], (row_of[coo.row[mask]], col_of[coo.col[mask]])), shape=shape)
+
+
+def dump(instance, directory, matrix=True):
+    """Write the instance as columns (one .npy file per column) in directory and return its manifest."""
+    os.makedirs(directory, exist_ok=True)
+    counter = itertools.count()
+    components = []
+    var_offset = {}
+    con_offset = {}
+    n_vars = n_cons = 0
+    for component in instance.component_objects((pyo.Set, pyo.RangeSet, pyo.Param, pyo.Var, pyo.Constraint,
+                                                  pyo.Objective), descend_into=True):
+        entry = {'name': component.name, 'kind': component.ctype.__name__, 'length': len(component)}
+        if component.ctype in (pyo.Set, pyo.RangeSet):
+            if component.is_indexed():
+                rows = [key + (m if isinstance(m, tuple) else (m,)) for key in _keys(component)
+                        for m in component[key if len(key) > 1 else key[0]]]
+                entry['dimen'] = component.index_set().dimen
+            elif component.isfinite():
+                rows = [m if isinstance(m, tuple) else (m,) for m in component]
+            else:
+                continue
+            entry['members'] = len(rows)
+            entry['index'] = _write_table(directory, rows, counter) if rows else []
+        elif component.ctype is pyo.Param:
+            entry['index'] = _write_table(directory, _keys(component), counter)
+            entry['value'] = _write_table(directory, [(_number(v),) for v in component.values()], counter)[0]
+        elif component.ctype is pyo.Var:
+            vars = list(component.values())
+            domains = {}
+            codes = [domains.setdefault(str(v.domain), len(domains)) for v in vars]
+            entry['index'] = _write_table(directory, _keys(component), counter)
+            entry['columns'] = {
+                'value': _save(directory, _floats([v.value for v in vars], np.nan), counter),
+                'lb': _save(directory, _floats([v.lb for v in vars], -np.inf), counter),
+                'ub': _save(directory, _floats([v.ub for v in vars], np.inf), counter),
+                'fixed': _save(directory, np.array([v.fixed for v in vars], dtype=np.bool_), counter),
+                'domain': _save(directory, np.array(codes, dtype=np.int32), counter)}
+            entry['domains'] = list(domains)
+            entry['offset'] = n_vars
+            for pos, v in enumerate(vars):
+                var_offset[id(v)] = n_vars + pos
+            n_vars += len(vars)
+        elif component.ctype is pyo.Constraint:
+            cons = list(component.values())
+            entry['index'] = _write_table(directory, _keys(component), counter)
+            entry['columns'] = {
+                'lower': _save(directory, _floats([_number(c.lower) for c in cons], -np.inf), counter),
+                'upper': _save(directory, _floats([_number(c.upper) for c in cons], np.inf), counter),
+                'active': _save(directory, np.array([c.active for c in cons], dtype=np.bool_), counter)}
+            entry['offset'] = n_cons
+            for pos, c in enumerate(cons):
+                con_offset[id(c)] = n_cons + pos
+            n_cons += len(cons)
+        else:
+            entry['index'] = _write_table(directory, _keys(component), counter)
+            entry['sense'] = [int(o.sense) for o in component.values()]
+            entry['value'] = [_number(pyo.value(o, exception=False)) for o in component.values()]
+        components.append(entry)
+
+    manifest = {'version': DUMP_VERSION, 'name': instance.name, 'components': components,
+                'variables': n_vars, 'constraints': n_cons, 'matrix': None}
+    repn = None
+    if matrix:
+        try:
+            repn = LinearStandardFormCompiler().write(instance, mixed_form=True, set_sense=None)
+        except Exception as e:        # nonlinear rows (or anything else the compiler does not take)
+            manifest['matrix_error'] = str(e)
+    if repn is not None:
+        row_of = np.array([con_offset[id(row.constraint)] for row in repn.rows], dtype=np.int64)
+        col_of = np.array([var_offset[id(v)] for v in repn.columns], dtype=np.int64)
+        A = _csr(repn.A, row_of, col_of, (n_cons, n_vars))
+        # bounds of A x (the constants of the bodies and the fixed variables are in them)
+        lower, upper = np.full(n_cons, -np.inf), np.full(n_cons, np.inf)
+        rhs = np.asarray(repn.rhs, dtype=np.float64)
+        bound = np.array([row.bound_type for row in repn.rows], dtype=np.int64)
+        lower[row_of[bound <= 0]] = rhs[bound <= 0]
+        upper[row_of[bound >= 0]] = rhs[bound >= 0]
+        objectives = list(repn.objectives)
+        c = _csr(repn.c, np.arange(len(objectives)), col_of, (len(objectives), n_vars))
+        manifest['matrix'] = {name: _save(directory, array, counter) for name, array in
+                              (('indptr', A.indptr), ('indices', A.indices), ('data', A.data),
+                               ('lower', lower), ('upper', upper), ('c_indptr', c.indptr),
+                               ('c_indices', c.indices), ('c_data', c.data),
+                               ('c_offset', np.asarray(repn.c_offset, dtype=np.float64)))}
+        manifest['objectives'] = [o.name for o in objectives]
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+class DumpedComponent(object):
+    """The columns of one component of a dump, read from disk on first access."""
+
+    def __init__(self, directory, entry):
+        self._directory = directory
+        self._entry = entry
+        self._arrays = {}
+        self.name = entry['name']
+        self.kind = entry['kind']
+
+    def __len__(self):
+        return self._entry.get('members', self._entry['length'])
+
+    @property
+    def columns(self):
+        return list(self._entry.get('columns', ())) + (['value'] if 'value' in self._entry else [])
+
+    @property
+    def index(self):
+        # the keys (Var, Param, Constraint, Objective) or the members (Set), as a lazy sequence
+        return _Rows(_open_columns(self._directory, self._entry['index']), len(self))
+
+    def __getattr__(self, column):
+        if column.startswith('_'):
+            raise AttributeError(column)
+        if column not in self._arrays:
+            entry = self._entry
+            if column in entry.get('columns', ()):
+                self._arrays[column] = np.load(os.path.join(self._directory, entry['columns'][column]),
+                                               mmap_mode='r')
+            elif column == 'value' and isinstance(entry.get('value'), dict):
+                self._arrays[column] = _open_columns(self._directory, [entry['value']])[0]
+            elif column in entry:
+                self._arrays[column] = entry[column]
+            else:
+                raise AttributeError("%s has no column '%s'" % (self.name, column))
+        return self._arrays[column]
+
+    def frame(self):
+        if not pandas_available:
+            raise ImportError("pandas is needed for frame()")
+        keys = list(self.index)
+        data = {c: np.asarray(getattr(self, c)) for c in self.columns}
+        return pd.DataFrame(data, index=pd.Index(keys) if keys and not isinstance(keys[0], tuple)
+                            else pd.MultiIndex.from_tuples(keys))
+
+    def __repr__(self):
+        return '<%s %s: %d rows, columns %s>' % (self.kind, self.name, len(self), self.columns)
+
+
+class InstanceDump(object):
+    """A dump written by dump(): the components are opened when they are used."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'manifest.json')) as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != DUMP_VERSION:
+            raise ValueError("%s: dump version %s, expected %s"
+                             % (directory, self.manifest.get('version'), DUMP_VERSION))
+        self._entries = {entry['name']: entry for entry in self.manifest['components']}
+        self._components = {}
+
+    @property
+    def names(self):
+        return list(self._entries)
+
+    def __getitem__(self, name):
+        if name not in self._components:
+            self._components[name] = DumpedComponent(self.directory, self._entries[name])
+        return self._components[name]
+
+    def _array(self, name):
+        return np.load(os.path.join(self.directory, self.manifest['matrix'][name]), mmap_mode='r')
+
+    def matrix(self):
+        # (A, lower, upper): lower <= A x <= upper for the active linear constraints (rows of the other ones are
+        # empty, with infinite bounds)
+        if self.manifest['matrix'] is None:
+            raise ValueError("No matrix in the dump: %s"
+                             % self.manifest.get('matrix_error', 'written with dump(matrix=False)'))
+        shape = (self.manifest['constraints'], self.manifest['variables'])
+        A = sp.csr_matrix((self._array('data'), self._array('indices'), self._array('indptr')), shape=shape)
+        return A, self._array('lower'), self._array('upper')
+
+    def objective(self):
+        # (c, offset): one row of c per active objective
+        shape = (len(self.manifest['objectives']), self.manifest['variables'])
+        c = sp.csr_matrix((self._array('c_data'), self._array('c_indices'), self._array('c_indptr')), shape=shape)
+        return c, self._array('c_offset')
+
+    def load_values(self, instance):
+        """Set the variable values of the dump in an instance of the same model (None for nan)."""
+        for name, entry in self._entries.items():
+            if entry['kind'] != 'Var':
+                continue
+            component = instance.find_component(name)
+            if component is None or len(component) != entry['length']:
+                raise ValueError("Variable %s of the dump is not in the instance (or has another size)" % name)
+            for var, value in zip(component.values(), self[name].value.tolist()):
+                var.set_value(None if value != value else value, skip_validation=True)
+
+
+def load(directory):
+    return InstanceDump(directory)
+
+
+if __name__ == '__main__':
+    # python InstanceDump.py [variables]
+    # a sparse LP with 10 terms per row: pprint / display of Pyomo against the ones here (time and peak memory),
+    # then dump and load
+    import shutil
+    import tempfile
+    import time
+    import tracemalloc
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rows = n // 2
+    rng = np.random.default_rng(0)
+    cols = rng.integers(0, n, (rows, 10)).tolist()
+    coefs = rng.integers(1, 9, (rows, 10)).tolist()
+
+    model = pyo.ConcreteModel()
+    model.I = pyo.RangeSet(0, n - 1)
+    model.R = pyo.RangeSet(0, rows - 1)
+    model.cost = pyo.Param(model.I, initialize=dict(enumerate(rng.integers(1, 20, n).tolist())))
+    model.x = pyo.Var(model.I, bounds=(0, 10))
+    model.y = pyo.Var(model.R, domain=pyo.Binary)
+    model.obj = pyo.Objective(expr=pyo.quicksum(model.cost[i] * model.x[i] for i in model.I))
+    model.con = pyo.Constraint(model.R, rule=lambda m, r: pyo.quicksum(
+        c * m.x[j] for c, j in zip(coefs[r], cols[r])) + m.y[r] >= 5)
+    for i, v in enumerate(rng.random(n).tolist()):
+        model.x[i].value = 10 * v
+    print("%d variables, %d constraints" % (n + rows, rows))
+
+    def measure(label, function):
+        with open(os.devnull, 'w') as sink:
+            tracemalloc.start()
+            start = time.perf_counter()
+            function(sink)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        print("%-36s %8.2f s   peak %8.1f MB" % (label, elapsed, peak / 2 ** 20))
+
+    measure("instance.pprint()", lambda f: model.pprint(ostream=f))
+    measure("pprint(instance, max_rows=10)", lambda f: pprint(model, ostream=f))
+    measure("instance.display()", lambda f: model.display(ostream=f))
+    measure("display(instance, max_rows=10)", lambda f: display(model, ostream=f))
+    print()
+    display(model, max_rows=3)
+    print()
+
+    tmp = tempfile.mkdtemp()
+    target = os.path.join(tmp, 'instance.dump')
+    start = time.perf_counter()
+    dump(model, target)
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(target, f)) for f in os.listdir(target))
+    start = time.perf_counter()
+    d = load(target)
+    opened = time.perf_counter() - start
+    A, lower, upper = d.matrix()
+    copy = model.clone()
+    for v in copy.x.values():
+        v.value = None
+    d.load_values(copy)
+    print("dump: %.2f s, %.1f MB (%.0f MB/s); load: %.1f ms" % (elapsed, size / 2 ** 20, size / 2 ** 20 / elapsed,
+                                                                1000 * opened))
+    print(d['x'], d['con'])
+    x = np.nan_to_num(np.concatenate([d['x'].value, d['y'].value]))     # y has no values: 0
+    print("A: %s, %d nonzeros, rows satisfied: %d of %d"
+          % (A.shape, A.nnz, int(np.sum((A @ x >= lower - 1e-9) & (A @ x <= upper + 1e-9))), rows))
+    print("values loaded back:", all(copy.x[i].value == model.x[i].value for i in model.I))
+    shutil.rmtree(tmp)
@@ -0,0 +1,213 @@
+# Per-component and per-solve-phase timing and memory, recorded from python (no cProfile of the whole process).
+#
+# "pyomo solve" prints the time of every step (the numbers in [] of its output, see Pyomo_notes.py), but only as text
+# in the terminal. Inside a context:
+#
+#   with Instrumentation() as ins:
+#       instance = model.create_instance(data)       every Set, Param, Var, Constraint, ... construction is recorded
+#       opt.solve(instance)                          write / solve / read / load phases of the SolverFactory solvers
+#       with ins.span('my step'):                    any other block of code
+#           ...
+#   ins.summary()                                    the slowest records
+#   ins.write_json('timing.json')                    list of records
+#   ins.write_chrome_trace('timing.trace.json')      open it in chrome://tracing or https://ui.perfetto.dev
+#
+# Every record has: name, kind (construct / solve / span), ctype, start (s since the context started), wall (s),
+# cpu (s, process time) and peak (bytes allocated above the start of the record, from tracemalloc).
+# memory=False skips tracemalloc, which slows allocations down while it is active.
+#
+# How: Pyomo times every component construction with pyomo.common.timing.ConstructionTimer (the same timer behind
+# report_timing()), so its __init__ / report are wrapped while the context is active. The legacy solvers
+# (SolverFactory('glpk'), 'cbc', ...) all go through OptSolver.solve, which calls _presolve (writes the problem file),
+# _apply_solver (runs the solver) and _postsolve (reads the results): those are wrapped for each solve call.
+# Other solver objects (appsi, persistent, NumpySolver) can be added with ins.wrap_solver(opt).
+
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from pyomo.common.timing import ConstructionTimer
+from pyomo.core.base.PyomoModel import ModelSolutions
+from pyomo.opt.base.solvers import OptSolver
+
+_solver_phases = (('_presolve', 'write'), ('_apply_solver', 'solve'), ('_postsolve', 'read'))
+
+
+class Instrumentation(object):
+
+    def __init__(self, memory=True):
+        self.memory = memory
+        self.records = []
+        self._stack = []        # open records (the parents of a record are below it)
+        self._t0 = None
+        self._saved = {}
+
+    # ------------------------------------------------------------------------------------------------------------
+    # records
+
+    def _start(self, name, kind, ctype=None):
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                # the parent keeps the peak reached so far before the counter is reset for the child
+                parent = self._stack[-1]
+                parent['_peak'] = max(parent['_peak'], peak)
+            tracemalloc.reset_peak()
+        else:
+            current = 0
+        rec = {'name': name, 'kind': kind, 'ctype': ctype, 'depth': len(self._stack),
+               'start': time.perf_counter() - self._t0, '_cpu': time.process_time(),
+               '_mem': current, '_peak': current}
+        self._stack.append(rec)
+        return rec
+
+    def _stop(self, rec):
+        rec['wall'] = time.perf_counter() - self._t0 - rec['start']
+        rec['cpu'] = time.process_time() - rec.pop('_cpu')
+        if self.memory:
+            peak = max(rec.pop('_peak'), tracemalloc.get_traced_memory()[1])
+            rec['peak'] = peak - rec.pop('_mem')
+        else:
+            rec.pop('_peak')
+            rec.pop('_mem')
+            rec['peak'] = None
+        self._stack.remove(rec)
+        if self._stack and self.memory:
+            parent = self._stack[-1]
+            parent['_peak'] = max(parent['_peak'], peak)
+        self.records.append(rec)
+
+    @contextmanager
+    def span(self, name, kind='span'):
+        rec = self._start(name, kind)
+        try:
+            yield rec
+        finally:
+            self._stop(rec)
+
+    # ------------------------------------------------------------------------------------------------------------
+    # hooks
+
+    def wrap_solver(self, opt):
+        # time opt.solve (and its phases, if it has them) for this solver object only
+        name = getattr(opt, 'name', type(opt).__name__)
+        for attr, label in _solver_phases:
+            method = getattr(opt, attr, None)
+            if method is not None and attr not in vars(opt):
+                setattr(opt, attr, self._timed(method, '%s %s' % (name, label), 'solve'))
+        if 'solve' not in vars(opt):
+            opt.solve = self._timed(opt.solve, '%s solve()' % name, 'solve')
+        return opt
+
+    def _timed(self, method, name, kind):
+        def wrapper(*args, **kwds):
+            with self.span(name, kind):
+                return method(*args, **kwds)
+        return wrapper
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        else:
+            self._started_tracemalloc = False
+
+        ins = self
+        open_timers = {}
+        timer_init, timer_report = ConstructionTimer.__init__, ConstructionTimer.report
+        solve, load_from = OptSolver.solve, ModelSolutions.load_from
+        self._saved = {'init': timer_init, 'report': timer_report, 'solve': solve, 'load_from': load_from}
+
+        def init(timer, obj):
+            timer_init(timer, obj)
+            try:
+                ctype = obj.ctype.__name__
+            except AttributeError:
+                ctype = type(obj).__name__
+            open_timers[id(timer)] = ins._start(timer.name, 'construct', ctype)
+
+        def report(timer):
+            rec = open_timers.pop(id(timer), None)
+            if rec is not None:
+                ins._stop(rec)
+            timer_report(timer)
+
+        def solve_wrapper(opt, *args, **kwds):
+            # the phases of this call only: the solver object is left as it was
+            name = getattr(opt, 'name', type(opt).__name__)
+            patched = [attr for attr, _ in _solver_phases if attr not in vars(opt)]
+            for attr, label in _solver_phases:
+                if attr in patched:
+                    setattr(opt, attr, ins._timed(getattr(opt, attr), '%s %s' % (name, label), 'solve'))
+            try:
+                with ins.span('%s solve()' % name, 'solve'):
+                    return solve(opt, *args, **kwds)
+            finally:
+                for attr in patched:
+                    delattr(opt, attr)
+
+        def load_wrapper(solutions, *args, **kwds):
+            with ins.span('load solution', 'solve'):
+                return load_from(solutions, *args, **kwds)
+
+        ConstructionTimer.__init__ = init
+        ConstructionTimer.report = report
+        OptSolver.solve = solve_wrapper
+        ModelSolutions.load_from = load_wrapper
+        return self
+
+    def __exit__(self, *exc):
+        ConstructionTimer.__init__ = self._saved['init']
+        ConstructionTimer.report = self._saved['report']
+        OptSolver.solve = self._saved['solve']
+        ModelSolutions.load_from = self._saved['load_from']
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        return False
+
+    # ------------------------------------------------------------------------------------------------------------
+    # output
+
+    def summary(self, top=10, kind=None):
+        records = [r for r in self.records if kind is None or r['kind'] == kind]
+        print("%-40s %-12s %10s %10s %12s" % ('name', 'type', 'wall [s]', 'cpu [s]', 'peak [kB]'))
+        for r in sorted(records, key=lambda r: -r['wall'])[:top]:
+            peak = '-' if r['peak'] is None else '%.1f' % (r['peak'] / 1024)
+            print("%-40s %-12s %10.6f %10.6f %12s" % (r['name'][:40], r['ctype'] or r['kind'], r['wall'], r['cpu'], peak))
+
+    def write_json(self, filename):
+        with open(filename, 'w') as f:
+            json.dump(sorted(self.records, key=lambda r: r['start']), f, indent=1)
+
+    def write_chrome_trace(self, filename):
+        # "complete" events (ph = X), times in microseconds
+        events = [{'name': r['name'], 'cat': r['kind'], 'ph': 'X', 'pid': os.getpid(), 'tid': 0,
+                   'ts': round(r['start'] * 1e6, 3), 'dur': round(r['wall'] * 1e6, 3),
+                   'args': {'ctype': r['ctype'], 'cpu_s': r['cpu'], 'peak_bytes': r['peak']}}
+                  for r in sorted(self.records, key=lambda r: r['start'])]
+        with open(filename, 'w') as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+
+if __name__ == '__main__':
+    # abstract1.py with abstract1.dat, as "pyomo solve --solver=glpk abstract1.py abstract1.dat" would run it
+    import sys
+    import runpy
+    import LazyPyomo as pyo         # its SolverFactory also knows 'numpy'
+
+    solver = sys.argv[1] if len(sys.argv) > 1 else 'glpk'
+    model = runpy.run_path('abstract1.py')['model']
+    with Instrumentation() as ins:
+        with ins.span('create_instance'):
+            instance = model.create_instance('abstract1.dat')
+        opt = pyo.SolverFactory(solver)
+        if not isinstance(opt, OptSolver):
+            ins.wrap_solver(opt)
+        opt.solve(instance)
+    print("\n")
+    ins.summary(20)
+    ins.write_chrome_trace('abstract1.trace.json')
+    print("\nChrome trace written to abstract1.trace.json\n")
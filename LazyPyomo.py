@@ -0,0 +1,115 @@
+# A lighter replacement for "import pyomo.environ as pyo".
+#
+# import pyomo.environ loads every Pyomo package and registers every solver, writer, transformation and data plugin,
+# and that alone takes longer than solving Attempt1.py. Most scripts here only use Var, Param, Set, Objective,
+# Constraint and one solver, so this module:
+#   - takes the modeling components from pyomo.core (a fraction of the import time of pyomo.environ)
+#   - registers a solver plugin (and the file writers it needs) only when SolverFactory(name) asks for it
+#   - registers a transformation only when TransformationFactory(name) asks for it (e.g. core.scale_model)
+#   - loads the DataPortal plugins only when DataPortal or AbstractModel is used (for the .dat files)
+# Anything it does not know about falls back to importing pyomo.environ, so the scripts keep working.
+# model.write('model.lp') needs the file writers: they come with the first file-based solver (glpk, cbc, ...),
+# otherwise call pyo.load_writers() first.
+#
+# Usage (same names as pyomo.environ):
+#   import LazyPyomo as pyo
+#   model = pyo.ConcreteModel()
+#   model.x = pyo.Var([0, 1], domain=pyo.NonNegativeReals)
+#   pyo.SolverFactory('glpk').solve(model)
+#
+# ImportBudget.py measures the import time and fails when it goes over the budget.
+
+import importlib
+
+# solver name -> modules to import (and "load()") to register it
+_solver_plugins = {
+    'glpk': ['pyomo.solvers.plugins.solvers.GLPK'],
+    'cbc': ['pyomo.solvers.plugins.solvers.CBCplugin'],
+    'cplex': ['pyomo.solvers.plugins.solvers.CPLEX'],
+    'gurobi': ['pyomo.solvers.plugins.solvers.GUROBI'],
+    'xpress': ['pyomo.solvers.plugins.solvers.XPRESS'],
+    'ipopt': ['pyomo.solvers.plugins.solvers.IPOPT'],
+    'gurobi_direct': ['pyomo.solvers.plugins.solvers.gurobi_direct'],
+    'gurobi_persistent': ['pyomo.solvers.plugins.solvers.gurobi_persistent'],
+    'cplex_direct': ['pyomo.solvers.plugins.solvers.cplex_direct'],
+    'cplex_persistent': ['pyomo.solvers.plugins.solvers.cplex_persistent'],
+    'numpy': ['NumpySolver'],
+}
+# the shell solvers talk to the solver through files: they need the writers / readers too
+_file_plugins = ['pyomo.repn.plugins', 'pyomo.opt.plugins']
+
+# transformation name -> module that registers it
+_transformations = {
+    'core.scale_model': 'pyomo.core.plugins.transform.scaling',
+    'core.relax_integer_vars': 'pyomo.core.plugins.transform.discrete_vars',
+    'core.fix_discrete': 'pyomo.core.plugins.transform.discrete_vars',
+    'core.add_slack_variables': 'pyomo.core.plugins.transform.add_slack_vars',
+}
+
+_loaded = set()
+
+
+def _load(name):
+    # import a module once and call its load() if it is a plugin package
+    if name in _loaded:
+        return
+    module = importlib.import_module(name)
+    if name.endswith('.plugins') and hasattr(module, 'load'):
+        module.load()
+    _loaded.add(name)
+
+
+def _environ():
+    # the full registration, for everything that is not in the tables above
+    _load('pyomo.environ')
+
+
+def load_writers():
+    # LP / NL / ... writers and the solution readers (what model.write() and the shell solvers use)
+    for plugin in _file_plugins:
+        _load(plugin)
+
+
+def SolverFactory(name=None, **kwds):
+    from pyomo.opt import SolverFactory as _factory
+    if name is not None and name not in _factory:
+        if name in _solver_plugins:
+            if not name.endswith(('_direct', '_persistent')) and name != 'numpy':
+                load_writers()
+            for plugin in _solver_plugins[name]:
+                _load(plugin)
+        elif name.startswith('appsi_'):
+            _load('pyomo.contrib.appsi.plugins')
+        else:
+            _environ()
+    return _factory(name, **kwds)
+
+
+def TransformationFactory(name=None, **kwds):
+    from pyomo.core import TransformationFactory as _factory
+    if name is not None and name not in _factory:
+        if name in _transformations:
+            _load(_transformations[name])
+        else:
+            _environ()
+    return _factory(name, **kwds)
+
+
+def __getattr__(name):
+    # every other name: the modeling components of pyomo.core, then pyomo.opt, then pyomo.environ
+    if name in ('DataPortal', 'AbstractModel'):
+        # create_instance('file.dat') reads the data through the DataPortal plugins (they are cheap to load)
+        _load('pyomo.dataportal.plugins')
+    core = importlib.import_module('pyomo.core')
+    if hasattr(core, name):
+        value = getattr(core, name)
+    else:
+        if name in ('DataPortal', 'TerminationCondition', 'SolverStatus', 'SolverResults', 'WriterFactory'):
+            source = 'pyomo.dataportal' if name == 'DataPortal' else 'pyomo.opt'
+        else:
+            _environ()
+            source = 'pyomo.environ'
+        value = getattr(importlib.import_module(source), name)
+    globals()[name] = value         # next time it is a plain module attribute
+    return value
+
@@ -0,0 +1,523 @@
+# Set algebra that stays virtual: unions, intersections, differences and cross products of big sets without
+# storing their members.
+#
+# Pyomo_notes.py builds  model.A | model.D,  &,  -,  ^  and  model.A * model.D. Pyomo keeps these as operator
+# objects too, but len() of a union / intersection / difference counts the members again at every call, and
+# at() / ord() walk the set from the start, so code that asks for positions (ordered sets, model.I.next(i), ...)
+# is quadratic. Here every set expression is a view over its operands:
+#
+#   membership   x in view        the operands' own membership test (dict / arithmetic), O(1)
+#   len(view)                     products: product of the lengths; union / intersection / difference: the positions
+#                                 of the members that survive are counted once and kept as one int64 array
+#   view[k]                       k-th member (0-based) without iterating: arithmetic for ranges and products,
+#                                 one array lookup otherwise
+#   view.index(x)                 position of a member (searchsorted on the same array)
+#   iteration                     in order: the members of the first operand, then the new ones of the second
+#
+# Ranges are kept as (first, last, step), and the cross product of ranges is pure arithmetic (mixed radix), no
+# tuple is ever stored. The members are only copied with materialize().
+#
+#   I = view(model.I)                         RangeSet, Set, range(), list, or a Pyomo set expression
+#   M = I * view(model.J)                     or  view(model.I * model.J)
+#   len(M), (3, 7) in M, M[12345], M.index((3, 7))
+#   model.x = pyo.Var(M.set())                a Pyomo Set (SetOf) that reads the view, for indexing components
+#   model.M = M.materialize()                 a normal Pyomo Set with a copy of the members
+#
+# The operands are read when a length or position is first needed: call refresh() if one of them changes afterwards.
+
+import itertools
+from collections.abc import Sequence
+from numbers import Integral, Real
+
+import numpy as np
+
+import pyomo.environ as pyo
+from pyomo.core.base.set import (OrderedSetOf, SetData, SetDifference, SetIntersection, SetProduct,
+                                 SetSymmetricDifference, SetUnion)
+
+
+class View(Sequence):
+    # an ordered, read-only set of members
+    dimen = 1
+
+    def __or__(self, other):
+        return union(self, other)
+
+    def __and__(self, other):
+        return intersection(self, other)
+
+    def __sub__(self, other):
+        return Difference(self, view(other))
+
+    def __xor__(self, other):
+        return SymmetricDifference(self, view(other))
+
+    def __mul__(self, other):
+        return Product(self, view(other))
+
+    def __ror__(self, other):
+        return union(other, self)
+
+    def __rand__(self, other):
+        return intersection(other, self)
+
+    def __rsub__(self, other):
+        return Difference(view(other), self)
+
+    def __rxor__(self, other):
+        return SymmetricDifference(view(other), self)
+
+    def __rmul__(self, other):
+        return Product(view(other), self)
+
+    def _position(self, k):
+        # 0-based position (negative from the end)
+        n = len(self)
+        if not isinstance(k, Integral):
+            raise TypeError("%s indices must be integers, not %s" % (type(self).__name__, type(k).__name__))
+        if k < 0:
+            k += n
+        if not 0 <= k < n:
+            raise IndexError("%s index out of range" % type(self).__name__)
+        return k
+
+    def __getitem__(self, k):
+        return self._at(self._position(k))
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return id(self)
+
+    def refresh(self):
+        pass
+
+    def set(self, **kwds):
+        # Pyomo Set that reads this view (nothing is copied)
+        return VirtualSetOf(self, **kwds)
+
+    def materialize(self, **kwds):
+        # Pyomo Set with a copy of the members
+        kwds.setdefault('dimen', self.dimen)
+        s = pyo.Set(initialize=list(self), ordered=True, **kwds)
+        s.construct()
+        return s
+
+
+class Range(View):
+    # first, first + step, ..., last  (integers)
+
+    def __init__(self, first, last, step=1):
+        if step == 0:
+            raise ValueError("Range step cannot be 0")
+        self.first, self.step = first, step
+        self._len = max(0, (last - first) // step + 1)
+        self.last = first + (self._len - 1) * step
+
+    def __repr__(self):
+        return "Range(%s, %s, %s)" % (self.first, self.last, self.step)
+
+    def __len__(self):
+        return self._len
+
+    def __contains__(self, x):
+        if not isinstance(x, Real) or x != x or x in (float('inf'), float('-inf')) or x != int(x):
+            return False
+        k, r = divmod(x - self.first, self.step)
+        return r == 0 and 0 <= k < self._len
+
+    def __iter__(self):
+        return iter(range(self.first, self.last + self.step, self.step)) if self._len else iter(())
+
+    def _at(self, k):
+        return self.first + k * self.step
+
+    def index(self, x, *args):
+        if x not in self:
+            raise ValueError("%s is not in %r" % (x, self))
+        return int((x - self.first) // self.step)
+
+    def materialize(self, **kwds):
+        s = pyo.RangeSet(self.first, self.last, self.step, **kwds)
+        s.construct()
+        return s
+
+
+class Members(View):
+    # the members of an ordered Pyomo Set or of a python sequence
+
+    def __init__(self, members):
+        self._members = members
+        self._pyomo = isinstance(members, SetData)
+        if self._pyomo:
+            dimen = members.dimen
+            self.dimen = dimen if isinstance(dimen, int) else 1
+        else:
+            self._lookup = None
+            first = next(iter(members), None)
+            self.dimen = len(first) if type(first) is tuple else 1
+
+    def __repr__(self):
+        return "Members(%s)" % (self._members.name if self._pyomo else '%d members' % len(self._members))
+
+    def __len__(self):
+        return len(self._members)
+
+    def __iter__(self):
+        return iter(self._members)
+
+    def _index_of(self):
+        if self._lookup is None:
+            self._lookup = {m: k for k, m in enumerate(self._members)}
+        return self._lookup
+
+    def __contains__(self, x):
+        if self._pyomo:
+            return x in self._members
+        try:
+            return x in self._index_of()
+        except TypeError:
+            return False
+
+    def _at(self, k):
+        return self._members.at(k + 1) if self._pyomo else self._members[k]
+
+    def index(self, x, *args):
+        if self._pyomo:
+            if x not in self._members:
+                raise ValueError("%s is not in %s" % (x, self._members.name))
+            return self._members.ord(x) - 1
+        try:
+            return self._index_of()[x]
+        except (KeyError, TypeError):
+            raise ValueError("%s is not in the members" % (x,))
+
+    def refresh(self):
+        if not self._pyomo:
+            self._lookup = None
+
+
+class _Filtered(View):
+    # members of one operand kept by a test (the union keeps the members of b that are not in a): the positions
+    # that survive are found once, as a sorted int64 array
+
+    def __init__(self, a, b):
+        self.a, self.b = a, b
+        self.dimen = a.dimen
+        self._kept = None
+
+    def refresh(self):
+        self.a.refresh()
+        self.b.refresh()
+        self._kept = None
+
+    def _source(self):
+        # the operand whose positions are filtered
+        return self.a
+
+    def _keep(self, x):
+        raise NotImplementedError
+
+    def kept(self):
+        if self._kept is None:
+            source = self._source()
+            keep = self._keep
+            self._kept = np.fromiter((k for k, x in enumerate(source) if keep(x)), dtype=np.int64)
+        return self._kept
+
+    def __len__(self):
+        return len(self.kept())
+
+    def __iter__(self):
+        if self._kept is not None:
+            source = self._source()
+            return (source[k] for k in self._kept.tolist())
+        keep = self._keep
+        return (x for x in self._source() if keep(x))
+
+    def _at(self, k):
+        return self._source()[int(self.kept()[k])]
+
+    def index(self, x, *args):
+        if x not in self:
+            raise ValueError("%s is not in %r" % (x, self))
+        return int(np.searchsorted(self.kept(), self._source().index(x)))
+
+
+class Intersection(_Filtered):
+
+    def __repr__(self):
+        return "(%r & %r)" % (self.a, self.b)
+
+    def _keep(self, x):
+        return x in self.b
+
+    def __contains__(self, x):
+        return x in self.a and x in self.b
+
+
+class Difference(_Filtered):
+
+    def __repr__(self):
+        return "(%r - %r)" % (self.a, self.b)
+
+    def _keep(self, x):
+        return x not in self.b
+
+    def __contains__(self, x):
+        return x in self.a and x not in self.b
+
+
+class Union(_Filtered):
+    # the members of a, then the members of b that are not in a (disjoint=True: b has none of them)
+
+    def __init__(self, a, b, disjoint=False):
+        _Filtered.__init__(self, a, b)
+        self._disjoint = disjoint
+
+    def __repr__(self):
+        return "(%r | %r)" % (self.a, self.b)
+
+    def _source(self):
+        return self.b
+
+    def _keep(self, x):
+        return x not in self.a
+
+    def kept(self):
+        if self._disjoint and self._kept is None:
+            self._kept = np.arange(len(self.b), dtype=np.int64)
+        return _Filtered.kept(self)
+
+    def __contains__(self, x):
+        return x in self.a or x in self.b
+
+    def __len__(self):
+        return len(self.a) + (len(self.b) if self._disjoint else len(self.kept()))
+
+    def __iter__(self):
+        return itertools.chain(self.a, self.b if self._disjoint else _Filtered.__iter__(self))
+
+    def _at(self, k):
+        n = len(self.a)
+        if k < n:
+            return self.a[k]
+        return self.b[k - n] if self._disjoint else _Filtered._at(self, k - n)
+
+    def index(self, x, *args):
+        if x in self.a:
+            return self.a.index(x)
+        if x not in self.b:
+            raise ValueError("%s is not in %r" % (x, self))
+        k = self.b.index(x)
+        return len(self.a) + (k if self._disjoint else int(np.searchsorted(self.kept(), k)))
+
+
+class SymmetricDifference(Union):
+    # (a - b) followed by (b - a), the order of Pyomo's ^
+
+    def __init__(self, a, b):
+        Union.__init__(self, Difference(a, b), Difference(b, a), disjoint=True)
+
+    def __repr__(self):
+        return "(%r ^ %r)" % (self.a.a, self.a.b)
+
+
+class Product(View):
+    # cross product: the k-th member is found from k in mixed radix over the lengths of the factors
+
+    def __init__(self, *factors):
+        flat = []
+        for f in factors:
+            f = view(f)
+            flat.extend(f.factors if isinstance(f, Product) else [f])
+        self.factors = flat
+        self.dimen = sum(f.dimen for f in flat)
+        self._flatten = any(f.dimen != 1 for f in flat)
+        self._shape = None
+
+    def __repr__(self):
+        return " * ".join(repr(f) for f in self.factors)
+
+    def refresh(self):
+        for f in self.factors:
+            f.refresh()
+        self._shape = None
+
+    def shape(self):
+        if self._shape is None:
+            self._shape = tuple(len(f) for f in self.factors)
+        return self._shape
+
+    def __len__(self):
+        n = 1
+        for size in self.shape():
+            n *= size
+        return n
+
+    def _split(self, x):
+        # the part of the tuple x that belongs to each factor
+        if type(x) is not tuple or len(x) != self.dimen:
+            return None
+        if not self._flatten:
+            return x
+        parts, k = [], 0
+        for f in self.factors:
+            parts.append(x[k] if f.dimen == 1 else x[k:k + f.dimen])
+            k += f.dimen
+        return parts
+
+    def _join(self, parts):
+        if not self._flatten:
+            return tuple(parts)
+        return sum((p if type(p) is tuple else (p,) for p in parts), ())
+
+    def __contains__(self, x):
+        parts = self._split(x)
+        return parts is not None and all(p in f for p, f in zip(parts, self.factors))
+
+    def __iter__(self):
+        it = itertools.product(*self.factors)
+        return map(self._join, it) if self._flatten else it
+
+    def _at(self, k):
+        parts = []
+        for f, size in zip(reversed(self.factors), reversed(self.shape())):
+            k, r = divmod(k, size)
+            parts.append(f._at(r))
+        return self._join(reversed(parts))
+
+    def index(self, x, *args):
+        parts = self._split(x)
+        if parts is None:
+            raise ValueError("%s is not in %r" % (x, self))
+        k = 0
+        for p, f, size in zip(parts, self.factors, self.shape()):
+            k = k * size + f.index(p)
+        return k
+
+
+def _range_of(s):
+    # Range of a RangeSet with one finite integer range, else None
+    if not isinstance(s, SetData) or not s.isfinite() or not hasattr(s, 'ranges'):
+        return None
+    ranges = list(s.ranges())
+    if len(ranges) != 1 or not s.isordered():
+        return None
+    r = ranges[0]
+    if not r.step or not all(isinstance(v, Integral) for v in (r.start, r.end, r.step)):
+        return None
+    return Range(r.start, r.end, r.step) if r.step > 0 else None
+
+
+def view(s):
+    # the View of a set: View, range(), RangeSet, Pyomo set expression, ordered Pyomo Set, list / tuple
+    if isinstance(s, View):
+        return s
+    if isinstance(s, range):
+        return Range(s.start, s.stop - (1 if s.step > 0 else -1), s.step)
+    if isinstance(s, SetData):
+        if not s.isfinite():
+            raise TypeError("cannot make a view of the infinite set %s" % s.name)
+        r = _range_of(s)
+        if r is not None and not isinstance(s, (SetUnion, SetIntersection, SetDifference)):
+            return r
+        if isinstance(s, SetProduct):
+            return Product(*[view(f) for f in s._sets])
+        if isinstance(s, SetSymmetricDifference):
+            return SymmetricDifference(view(s._sets[0]), view(s._sets[1]))
+        if isinstance(s, SetUnion):
+            return union(s._sets[0], s._sets[1])
+        if isinstance(s, SetIntersection):
+            return intersection(s._sets[0], s._sets[1])
+        if isinstance(s, SetDifference):
+            return Difference(view(s._sets[0]), view(s._sets[1]))
+        if not s.isordered():
+            raise TypeError("set %s is not ordered: a view needs the positions of the members" % s.name)
+        return Members(s)
+    if isinstance(s, Sequence):
+        return Members(s)
+    raise TypeError("cannot make a view of %s" % type(s).__name__)
+
+
+def union(a, b):
+    a, b = view(a), view(b)
+    if isinstance(a, Range) and isinstance(b, Range) and a.step == b.step == 1 and len(a) and len(b):
+        if a.first <= b.first <= a.last + 1:
+            return Range(a.first, max(a.last, b.last))
+        if b.last < a.first or b.first > a.last:
+            return Union(a, b, disjoint=True)
+    return Union(a, b)
+
+
+def intersection(a, b):
+    a, b = view(a), view(b)
+    if isinstance(a, Range) and isinstance(b, Range) and a.step == b.step == 1:
+        return Range(max(a.first, b.first), min(a.last, b.last))
+    return Intersection(a, b)
+
+
+class VirtualSetOf(OrderedSetOf):
+    # SetOf of a View: OrderedSetOf would find the dimension by checking every member
+    @property
+    def dimen(self):
+        return self._ref.dimen
+
+
+if __name__ == '__main__':
+    # the sets of Pyomo_notes.py, then products and unions of big RangeSets: Pyomo set expressions vs views
+    import sys
+    import time
+    import tracemalloc
+
+    model = pyo.ConcreteModel()
+    model.A = pyo.Set(initialize=[1, 2, 3, 'x'])
+    model.D = pyo.RangeSet(5, 10)
+    for op in ('|', '&', '-', '^', '*'):
+        expr = eval('model.A %s model.D' % op)
+        v = eval('view(model.A) %s view(model.D)' % op)
+        assert list(v) == list(expr) and len(v) == len(expr), op
+        assert all(v[k] == expr.at(k + 1) and v.index(expr.at(k + 1)) == k for k in range(len(v))), op
+        print("A %s D: %-40r %d members" % (op, v, len(v)))
+
+    n = int(float(sys.argv[1])) if len(sys.argv) > 1 else 2000
+    model.I = pyo.RangeSet(n)
+    model.J = pyo.RangeSet(n)
+    model.K = pyo.Set(initialize=range(n // 2, 2 * n), ordered=True)
+    probes = [(1 + (7 * k) % n, 1 + (13 * k) % n) for k in range(1000)]
+
+    def timed(label, f):
+        tracemalloc.start()
+        start = time.perf_counter()
+        out = f()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("  %-44s %10.4f s %10.1f MB" % (label, elapsed, peak / 2 ** 20))
+        return out
+
+    print("I * J, %d x %d members" % (n, n))
+    pyomo_product = model.I * model.J
+    virtual = view(model.I) * view(model.J)
+    timed("Pyomo product: len + 1000 (in, at, ord)",
+          lambda: (len(pyomo_product), [(p in pyomo_product, pyomo_product.ord(pyomo_product.at(pyomo_product.ord(p))))
+                                        for p in probes]))
+    timed("view: len + 1000 (in, [k], index)",
+          lambda: (len(virtual), [(p in virtual, virtual.index(virtual[virtual.index(p)])) for p in probes]))
+    timed("materialize()", lambda: virtual.materialize())
+
+    print("I | K and I & K, %d + %d members" % (n, 3 * n // 2))
+    pyomo_union, pyomo_inter = model.I | model.K, model.I & model.K
+    virtual_union, virtual_inter = view(model.I) | view(model.K), view(model.I) & view(model.K)
+    last = [n + n // 2 + k for k in range(100)]
+    timed("Pyomo: 100 x (len, at(-1), ord) of the union",
+          lambda: [(len(pyomo_union), pyomo_union.at(len(pyomo_union)), pyomo_union.ord(x)) for x in last])
+    timed("view: 100 x (len, [-1], index) of the union",
+          lambda: [(len(virtual_union), virtual_union[-1], virtual_union.index(x)) for x in last])
+    timed("Pyomo: 100 x len of the intersection", lambda: [len(pyomo_inter) for _ in range(100)])
+    timed("view: 100 x len of the intersection", lambda: [len(virtual_inter) for _ in range(100)])
+
+    # indexing a component with a view: only the VarData are created, the index set is not copied
+    model.x = pyo.Var((view(range(1, 101)) * view(model.D)).set(), initialize=0)
+    print("x indexed by", model.x.index_set(), ":", len(model.x), "variables, x[100, 10] =", model.x[100, 10].value)
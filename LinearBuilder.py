@@ -0,0 +1,210 @@
+# Building large linear sums term by term without copying expression trees.
+#
+# Pyomo_notes.py: "e1 is copied when generating e2" (e2 = e1 + model.x), and ExampleIterativeModels.py builds its
+# cut with  expr += instance.x[j]  in a loop. Every "+" creates a new expression node, and an expression that is
+# extended from two places (e2 = e1 + x ; e3 = e1 + y) has its whole list of terms copied.
+# LinearBuilder keeps the terms in two buffers instead:
+#
+#   coefficients   array.array('d')   (C doubles, amortized O(1) append, bulk extend from numpy)
+#   variables      list of VarData    (amortized O(1) append)
+#
+# and creates the Pyomo expression once, at the end: freeze() hands a single argument list to LinearExpression,
+# which keeps that list as its own (no copy), so nothing is built twice.
+#
+#   cut = LinearBuilder()
+#   for j in instance.x:
+#       if pyo.value(instance.x[j]) == 0:
+#           cut += instance.x[j]
+#       else:
+#           cut += 1 - instance.x[j]
+#   instance.c.add(cut.freeze() >= 1)
+#
+# Mutable Params used as coefficients are taken by value (the buffers only hold numbers).
+# python LinearBuilder.py runs the benchmark (10^3 ... 10^6 terms).
+
+from array import array
+
+import numpy as np
+
+from pyomo.core.expr.numeric_expr import LinearExpression, MonomialTermExpression, SumExpression
+from pyomo.core.expr.numvalue import native_numeric_types, value
+from pyomo.repn import generate_standard_repn
+
+
+class LinearBuilder(object):
+
+    __slots__ = ('constant', '_coefs', '_vars', '_frozen')
+
+    def __init__(self, constant=0.0):
+        self.constant = float(constant)
+        self._coefs = array('d')
+        self._vars = []
+        self._frozen = None
+
+    def __len__(self):
+        return len(self._vars)
+
+    def _check(self):
+        if self._frozen is not None:
+            raise RuntimeError("LinearBuilder already frozen into an expression (use clear() to start again)")
+
+    # ------------------------------------------------------------------------------------------------------------
+    # adding terms
+
+    def add_term(self, coef, var):
+        self._check()
+        self._coefs.append(coef)
+        self._vars.append(var)
+        return self
+
+    def extend(self, coefs, variables):
+        # many terms at once: coefs is an array (or scalar) aligned with the list of variables
+        self._check()
+        variables = list(variables)
+        coefs = np.broadcast_to(np.asarray(coefs, dtype=float), (len(variables),))
+        self._coefs.frombytes(np.ascontiguousarray(coefs).tobytes())
+        self._vars.extend(variables)
+        return self
+
+    def add(self, expr, multiplier=1.0):
+        # a number, a variable or any linear expression (times multiplier)
+        self._check()
+        cls = expr.__class__
+        if cls in native_numeric_types:
+            self.constant += multiplier * expr
+        elif cls is MonomialTermExpression:
+            coef, var = expr.args
+            self._coefs.append(multiplier * value(coef))
+            self._vars.append(var)
+        elif cls is LinearExpression or cls is SumExpression:
+            for arg in expr.args:
+                self.add(arg, multiplier)
+        elif cls is LinearBuilder:
+            self.extend(expr.coefficients * multiplier, expr.variables)
+            self.constant += multiplier * expr.constant
+        elif not expr.is_potentially_variable():
+            self.constant += multiplier * value(expr)
+        elif expr.is_variable_type():
+            self._coefs.append(multiplier)
+            self._vars.append(expr)
+        else:
+            repn = generate_standard_repn(expr, compute_values=True)
+            if not repn.is_linear():
+                raise ValueError("LinearBuilder only accepts linear terms, got %s" % (expr,))
+            self.constant += multiplier * repn.constant
+            self.extend(np.asarray(repn.linear_coefs, dtype=float) * multiplier, repn.linear_vars)
+        return self
+
+    def __iadd__(self, expr):
+        return self.add(expr)
+
+    def __isub__(self, expr):
+        return self.add(expr, -1.0)
+
+    def clear(self):
+        self.constant = 0.0
+        self._coefs = array('d')
+        self._vars = []
+        self._frozen = None
+
+    # ------------------------------------------------------------------------------------------------------------
+    # reading the terms
+
+    @property
+    def coefficients(self):
+        # numpy view of the coefficient buffer (no copy)
+        return np.frombuffer(self._coefs, dtype=float) if len(self._coefs) else np.zeros(0)
+
+    @property
+    def variables(self):
+        return self._vars
+
+    def combine(self):
+        # merge repeated variables (summing their coefficients) and drop the zero coefficients
+        self._check()
+        if not self._vars:
+            return self
+        ids = np.fromiter(map(id, self._vars), dtype=np.int64, count=len(self._vars))
+        unique, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+        coefs = np.bincount(inverse, weights=self.coefficients, minlength=len(unique))
+        order = np.argsort(first)               # keep the order in which the variables were first added
+        keep = order[coefs[order] != 0]
+        variables = self._vars
+        self._vars = [variables[k] for k in first[keep].tolist()]
+        self._coefs = array('d', coefs[keep].tobytes()) if len(keep) else array('d')
+        return self
+
+    # ------------------------------------------------------------------------------------------------------------
+    # the Pyomo expression
+
+    def freeze(self):
+        # a LinearExpression that owns the list built here (terms with coefficient 1 are the variable itself)
+        if self._frozen is None:
+            args = [self.constant] if self.constant else []
+            args.extend([v if c == 1 else MonomialTermExpression((c, v))
+                         for c, v in zip(self._coefs.tolist(), self._vars)])
+            self._frozen = LinearExpression(args)
+        return self._frozen
+
+
+def linear_sum(coefs, variables, constant=0.0):
+    # one-call version:  constant + sum_k coefs[k] * variables[k]
+    return LinearBuilder(constant).extend(coefs, variables).freeze()
+
+
+if __name__ == '__main__':
+    # time per term of the different ways of building  sum_j (x[j] or 1 - x[j])  as in ExampleIterativeModels.py
+    import sys
+    import time
+
+    import pyomo.environ as pyo
+
+    sizes = [int(float(s)) for s in sys.argv[1:]] or [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+
+    def plus_equal(xs, ones):
+        expr = 0
+        for v, one in zip(xs, ones):
+            expr += v if one else 1 - v
+        return expr
+
+    def branching(xs, ones):
+        # e2 = e1 + x: every partial sum is also used somewhere else (the copy of Pyomo_notes.py)
+        expr = 0
+        for v, one in zip(xs, ones):
+            other = expr + 0 * v
+            expr = expr + v if one else expr + 1 - v
+        return expr
+
+    def builder(xs, ones):
+        cut = LinearBuilder()
+        for v, one in zip(xs, ones):
+            if one:
+                cut += v
+            else:
+                cut.constant += 1
+                cut.add_term(-1.0, v)
+        return cut.freeze()
+
+    def builder_bulk(xs, ones):
+        ones = np.asarray(ones)
+        return linear_sum(np.where(ones, 1.0, -1.0), xs, constant=float((~ones).sum()))
+
+    methods = [('expr += x', plus_equal), ('e2 = e1 + x', branching),
+               ('LinearBuilder', builder), ('LinearBuilder.extend', builder_bulk)]
+    print("%-22s" % 'terms' + ''.join("%14d" % n for n in sizes) + "   [microseconds per term]")
+    results = {name: [] for name, _ in methods}
+    for n in sizes:
+        model = pyo.ConcreteModel()
+        model.x = pyo.Var(range(n), within=pyo.Binary)
+        xs = list(model.x.values())
+        ones = (np.random.default_rng(0).random(n) < 0.5).tolist()
+        for name, method in methods:
+            if name == 'e2 = e1 + x' and n > 10 ** 4:       # quadratic
+                results[name].append(None)
+                continue
+            start = time.perf_counter()
+            model.c = pyo.Constraint(expr=method(xs, ones) >= 1)
+            results[name].append((time.perf_counter() - start) / n * 1e6)
+            model.del_component(model.c)
+    for name, _ in methods:
+        print("%-22s" % name + ''.join("%14s" % ('-' if t is None else '%.3f' % t) for t in results[name]))
@@ -0,0 +1,205 @@
+# Building an LP/MIP directly from the matrix form:     min/max c'x   s.t.  A x (<=, >=, ==) b,  lb <= x <= ub
+#
+# Exercise1.py tries to write its 5 constraints with a coefficient dict b[(j,i)] and a sign vector d[j] inside a
+# per-element rule. Writing one python expression per nonzero is also what makes big models slow to build.
+# Here the model is built from the arrays:
+#
+#   A       numpy 2D array, scipy sparse matrix or a dict {(row, col): coef} like the one in Exercise1.py
+#   b, c    arrays (or dicts {row: value}, {col: value} when A is a dict)
+#   sense   one entry per row: '<=', '>=', '==' (or 'L', 'G', 'E') or the sign vector of Exercise1.py:
+#           1 -> <=,  -1 -> >=,  0 -> ==
+#   bounds  (lb, ub) with scalars or arrays, None / inf for no bound (default: free variables, like pyo.Var)
+#   domain  pyo.Reals, pyo.Binary, ... or one domain per column
+#
+# Two builders:
+#   build_matrix_model(...)  a ConcreteModel (pyo) with model.x[col], model.con[row], model.obj. Every row is ONE
+#                            LinearExpression built from a CSR slice, so there is no expression tree per nonzero
+#                            and it works with everything else (SolverFactory, persistent solvers, scaling, ...)
+#                            model_from_arrays(...) builds it from the arrays of normalize() (row_lb <= A x <= row_ub,
+#                            so also ranged rows)
+#   build_matrix_block(...)  a pyomo.kernel block that keeps A as a matrix_constraint (the CSR arrays themselves,
+#                            no python object at all per nonzero). The LP writer reads the arrays directly, so this
+#                            is the fastest path to SolverFactory('glpk') for very large matrices.
+#
+# Exercise1.py with the builder (see the bottom of this file):
+#   model = build_matrix_model(A, b, c, sense=d, maximize=True)
+#   pyo.SolverFactory('glpk').solve(model)
+
+import numpy as np
+import scipy.sparse as sp
+
+import pyomo.environ as pyo
+import pyomo.kernel as pmo
+from pyomo.core.expr.numeric_expr import LinearExpression
+
+_senses = {'<=': 1, 'L': 1, '>=': -1, 'G': -1, '==': 0, '=': 0, 'E': 0}
+
+
+def _labels_and_vector(v, labels, name):
+    # dict {label: value} -> (labels, values) ; array -> (given labels or 0..len-1, values)
+    if isinstance(v, dict):
+        labels = sorted(v) if labels is None else labels
+        return labels, np.array([v.get(k, 0.0) for k in labels], dtype=float)
+    v = np.asarray(v, dtype=float).ravel()
+    if labels is not None and len(labels) != len(v):
+        raise ValueError("%s has %d entries for %d labels" % (name, len(v), len(labels)))
+    return (list(range(len(v))) if labels is None else labels), v
+
+
+def _bound_vector(v, n, default):
+    if v is None:
+        return np.full(n, default)
+    v = np.asarray(v, dtype=float) if not np.isscalar(v) else np.full(n, float(v))
+    return np.where(np.isnan(v), default, v)
+
+
+def normalize(A, b, c, sense, bounds=(None, None), rows=None, cols=None):
+    """Return (A as CSR, row lb, row ub, c, var lb, var ub, row labels, column labels), all as numpy arrays."""
+    if isinstance(A, dict):
+        # {(row, col): coef} with labels taken from b/c (or from the keys)
+        if rows is None:
+            rows = sorted(b) if isinstance(b, dict) else sorted({k[0] for k in A})
+        if cols is None:
+            cols = sorted(c) if isinstance(c, dict) else sorted({k[1] for k in A})
+        row_pos = {r: k for k, r in enumerate(rows)}
+        col_pos = {r: k for k, r in enumerate(cols)}
+        keys = list(A)
+        A = sp.csr_matrix((np.fromiter(A.values(), float, len(keys)),
+                           (np.fromiter((row_pos[k[0]] for k in keys), np.int64, len(keys)),
+                            np.fromiter((col_pos[k[1]] for k in keys), np.int64, len(keys)))),
+                          shape=(len(rows), len(cols)))
+    else:
+        A = sp.csr_matrix(A, dtype=float)
+    A.sum_duplicates()
+    A.eliminate_zeros()
+    m, n = A.shape
+
+    rows, b = _labels_and_vector(b, rows, 'b')
+    cols, c = _labels_and_vector(c, cols, 'c')
+    if len(b) != m or len(c) != n:
+        raise ValueError("A is %dx%d but b has %d and c has %d entries" % (m, n, len(b), len(c)))
+
+    if isinstance(sense, dict):
+        sense = [sense[r] for r in rows]
+    if isinstance(sense, str) or np.isscalar(sense):
+        sense = [sense] * m
+    s = np.array([_senses[x] if isinstance(x, str) else int(np.sign(x)) for x in sense])
+    if len(s) != m:
+        raise ValueError("sense has %d entries for %d rows" % (len(s), m))
+    row_lb = np.where(s <= 0, b, -np.inf)
+    row_ub = np.where(s >= 0, b, np.inf)
+
+    lb, ub = bounds
+    return (A, row_lb, row_ub, c, _bound_vector(lb, n, -np.inf), _bound_vector(ub, n, np.inf), rows, cols)
+
+
+def _finite(v):
+    return None if np.isinf(v) else _number(v)
+
+
+def _number(v):
+    # whole floats as ints: the LP file gets "1 x3" instead of "1.0 x3"
+    v = float(v)
+    return int(v) if v.is_integer() else v
+
+
+def _numbers(v):
+    # the same for a whole array, as a list
+    v = np.asarray(v, dtype=float)
+    out = v.astype(object)
+    whole = (v == np.round(v)) & (np.abs(v) < 2 ** 53)
+    out[whole] = v[whole].astype(np.int64)
+    return out.tolist()
+
+
+def build_matrix_model(A, b, c, sense, bounds=(None, None), domain=pyo.Reals, maximize=False, rows=None, cols=None):
+    """ConcreteModel with x[col], con[row] (one LinearExpression per row) and obj, built from the matrix form."""
+    A, row_lb, row_ub, c, lb, ub, rows, cols = normalize(A, b, c, sense, bounds, rows, cols)
+    return model_from_arrays(A, row_lb, row_ub, c, lb, ub, rows, cols, domain, maximize)
+
+
+def model_from_arrays(A, row_lb, row_ub, c, lb, ub, rows=None, cols=None, domain=pyo.Reals, maximize=False):
+    """The same ConcreteModel from the arrays of normalize() (A as CSR, row_lb <= A x <= row_ub, lb <= x <= ub)."""
+    rows = list(range(A.shape[0])) if rows is None else rows
+    cols = list(range(A.shape[1])) if cols is None else cols
+    model = pyo.ConcreteModel()
+    model.I = pyo.Set(initialize=rows, ordered=True)    # rows
+    model.J = pyo.Set(initialize=cols, ordered=True)    # columns
+    if isinstance(domain, (list, tuple, np.ndarray)):
+        domains = dict(zip(cols, domain))
+        model.x = pyo.Var(model.J, domain=lambda m, j: domains[j])
+    else:
+        model.x = pyo.Var(model.J, domain=domain)
+    xs = list(model.x.values())
+    for v, l, u in zip(xs, lb.tolist(), ub.tolist()):
+        v.setlb(_finite(l))
+        v.setub(_finite(u))
+
+    nz = np.flatnonzero(c)
+    model.obj = pyo.Objective(
+        expr=LinearExpression(linear_coefs=_numbers(c[nz]), linear_vars=[xs[k] for k in nz]),
+        sense=pyo.maximize if maximize else pyo.minimize)
+
+    indptr, indices, data = A.indptr, A.indices.tolist(), _numbers(A.data)
+    row_lb, row_ub = row_lb.tolist(), row_ub.tolist()
+    ptr = indptr.tolist()
+
+    def con_rule(m, i):
+        k = m.I.ord(i) - 1
+        if row_lb[k] == -np.inf and row_ub[k] == np.inf:
+            return pyo.Constraint.Skip          # free row
+        start, stop = ptr[k], ptr[k + 1]
+        body = LinearExpression(linear_coefs=data[start:stop], linear_vars=[xs[j] for j in indices[start:stop]])
+        return (_finite(row_lb[k]), body, _finite(row_ub[k]))
+
+    model.con = pyo.Constraint(model.I, rule=con_rule)
+    return model
+
+
+def _kernel_variable(domain, lb, ub):
+    # a pmo.variable for a pyo domain: integrality and the bounds of the domain (NonNegativeReals -> lb 0,
+    # Binary -> [0, 1], ...) intersected with lb / ub, as pyo.Var does
+    d_lb, d_ub, step = domain.get_interval()
+    if step not in (0, 1):
+        raise ValueError("domain %s is not an interval of reals or integers" % domain)
+    if d_lb is not None:
+        lb = max(lb, d_lb)
+    if d_ub is not None:
+        ub = min(ub, d_ub)
+    return pmo.variable(domain_type=pmo.IntegerSet if step == 1 else pmo.RealSet, lb=_finite(lb), ub=_finite(ub))
+
+
+def build_matrix_block(A, b, c, sense, bounds=(None, None), domain=None, maximize=False):
+    """pyomo.kernel block with x (variable_list), con (matrix_constraint over the CSR arrays) and obj."""
+    A, row_lb, row_ub, c, lb, ub, rows, cols = normalize(A, b, c, sense, bounds)
+    n = len(cols)
+
+    blk = pmo.block()
+    if domain is None or domain is pyo.Reals:
+        blk.x = pmo.variable_list(pmo.variable(lb=_finite(l), ub=_finite(u)) for l, u in zip(lb.tolist(), ub.tolist()))
+    else:
+        domains = domain if isinstance(domain, (list, tuple, np.ndarray)) else [domain] * n
+        blk.x = pmo.variable_list(_kernel_variable(d, l, u) for d, l, u in zip(domains, lb.tolist(), ub.tolist()))
+    blk.con = pmo.matrix_constraint(A, lb=row_lb, ub=row_ub, x=blk.x)
+    nz = np.flatnonzero(c)
+    blk.obj = pmo.objective(
+        LinearExpression(linear_coefs=c[nz].tolist(), linear_vars=[blk.x[k] for k in nz]),
+        sense=pmo.maximize if maximize else pmo.minimize)
+    return blk
+
+
+if __name__ == '__main__':
+    # Exercise1.py:   max x + 2y - 3z   with the 5 mixed-sense rows, coefficients as {(j,i): coef}
+    A = {(1, 1): 2, (1, 2): 1,
+         (2, 1): 1, (2, 2): -3, (2, 3): 1,
+         (3, 1): 1, (3, 2): 2, (3, 3): 2,
+         (4, 1): 3, (4, 2): -1, (4, 3): -1,
+         (5, 1): 1, (5, 2): 1, (5, 3): 1}
+    b = {1: 5, 2: 3, 3: 7, 4: 10, 5: 4}
+    c = {1: 1, 2: 2, 3: -3}
+    d = {1: 1, 2: -1, 3: 1, 4: 1, 5: -1}
+
+    model = build_matrix_model(A, b, c, sense=d, maximize=True)
+    model.pprint()
+    pyo.SolverFactory('glpk').solve(model)
+    model.display()
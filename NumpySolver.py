@@ -0,0 +1,355 @@
+# A small LP/MIP solver written with NumPy, usable through SolverFactory('numpy').
+#
+# Attempt1.py, tryforpyomo.py and the concrete model of Pyomo_notes.py are tiny LPs: with SolverFactory('glpk') almost
+# all of the time goes in writing the LP file, starting glpsol and reading its output back. This solver runs inside
+# the python process:
+#   - the model is read as matrices with Pyomo's LinearStandardFormCompiler (A, rhs, c, one row per constraint side)
+#   - the LP is put in standard form (x >= 0, Ax = b, b >= 0) and solved with a revised simplex on dense NumPy arrays
+#     (phase 1 with artificial variables, Dantzig pricing, Bland's rule when the pivots stay degenerate)
+#   - Binary / Integer variables are handled with a depth-first branch and bound on the variable bounds
+#     (enough for models like ExampleIterativeModels.py)
+# It is meant for SMALL models (the basis inverse is a dense m x m matrix), for bigger ones use a real solver.
+#
+# Usage:
+#   import NumpySolver                      registers the solver
+#   opt = pyo.SolverFactory('numpy')
+#   results = opt.solve(model)              same results object as the other solvers, duals go to model.dual
+#                                           if it is declared: model.dual = pyo.Suffix(direction=pyo.Suffix.IMPORT)
+# Options: opt.options['max_iter'] (simplex pivots per LP), opt.options['max_nodes'] (branch and bound nodes),
+#          opt.options['tol'] (feasibility / optimality / integrality tolerance)
+
+import math
+import time
+
+import numpy as np
+
+import pyomo.core as pyo
+from pyomo.common.collections import Bunch
+from pyomo.common.errors import InfeasibleConstraintException
+from pyomo.core.base.symbol_map import SymbolMap
+from pyomo.opt import SolverFactory, SolverResults, SolverStatus, TerminationCondition
+from pyomo.opt.results.solution import SolutionStatus
+from pyomo.repn.plugins.standard_form import LinearStandardFormCompiler
+
+INF = float('inf')
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# revised simplex on  min c'x  s.t.  Ax = b (b >= 0), x >= 0
+
+def _pivot(Binv, u, r):
+    # update the basis inverse when the column with B^-1 a_q = u enters at row r
+    Binv[r] /= u[r]
+    other = np.arange(len(u)) != r
+    Binv[other] -= np.outer(u[other], Binv[r])
+
+
+def _simplex(A, b, c, basis, Binv, tol, max_iter):
+    # basis must be feasible; returns (status, x_B) with basis / Binv updated in place
+    m = len(b)
+    x_B = Binv @ b
+    degenerate = 0
+    for _ in range(max_iter):
+        y = c[basis] @ Binv
+        d = c - y @ A
+        d[basis] = 0.0
+        entering = np.flatnonzero(d < -tol)
+        if entering.size == 0:
+            return 'optimal', x_B
+        q = entering[0] if degenerate > 50 else entering[np.argmin(d[entering])]
+        u = Binv @ A[:, q]
+        positive = u > tol
+        if not positive.any():
+            return 'unbounded', x_B
+        ratios = np.full(m, INF)
+        ratios[positive] = x_B[positive] / u[positive]
+        theta = ratios.min()
+        ties = np.flatnonzero(ratios <= theta + tol)
+        r = ties[np.argmin(np.asarray(basis)[ties])]        # Bland: leaving variable with the smallest index
+        degenerate = degenerate + 1 if theta <= tol else 0
+        x_B -= theta * u
+        x_B[r] = theta
+        _pivot(Binv, u, r)
+        basis[r] = q
+    return 'iterations', x_B
+
+
+def solve_standard_lp(A, b, c, tol=1e-9, max_iter=10000):
+    """min c'x s.t. Ax = b, x >= 0 (dense A). Returns (status, x, y) with y the row duals (None if not optimal)."""
+    m, n = A.shape
+    A = A.copy()
+    b = b.copy()
+    flip = b < 0
+    A[flip] *= -1
+    b[flip] *= -1
+    if m == 0:
+        if (c < -tol).any():
+            return 'unbounded', None, None
+        return 'optimal', np.zeros(n), np.zeros(0)
+
+    # phase 1: min sum(artificials)
+    A1 = np.hstack([A, np.eye(m)])
+    c1 = np.concatenate([np.zeros(n), np.ones(m)])
+    basis = list(range(n, n + m))
+    Binv = np.eye(m)
+    status, x_B = _simplex(A1, b, c1, basis, Binv, tol, max_iter)
+    if status == 'iterations':
+        return status, None, None
+    if x_B @ c1[basis] > tol * max(1.0, np.abs(b).max()):
+        return 'infeasible', None, None
+
+    # drive the artificials out of the basis (or drop the row when it is redundant)
+    keep = np.ones(m, dtype=bool)
+    for r in range(m):
+        if basis[r] < n:
+            continue
+        row = Binv[r] @ A
+        row[[k for k in basis if k < n]] = 0.0
+        candidates = np.flatnonzero(np.abs(row) > tol)
+        if candidates.size:
+            q = candidates[0]
+            u = Binv @ A[:, q]
+            x_B[r] = 0.0
+            _pivot(Binv, u, r)
+            basis[r] = q
+        else:
+            keep[r] = False
+    rows = np.flatnonzero(keep)
+    basis = [basis[r] for r in rows]
+    A2 = A[rows]
+    Binv = np.linalg.inv(A2[:, basis])
+
+    # phase 2
+    status, x_B = _simplex(A2, b[rows], c, basis, Binv, tol, max_iter)
+    if status != 'optimal':
+        return status, None, None
+    x = np.zeros(n)
+    x[basis] = x_B
+    y = np.zeros(m)
+    y[rows] = c[basis] @ Binv
+    y[flip] *= -1
+    return 'optimal', x, y
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# general LP:  min c'x  s.t.  row_lo <= A x <= row_hi (one side per row),  lb <= x <= ub
+
+def solve_lp(A, sense, rhs, c, lb, ub, tol=1e-9, max_iter=10000):
+    """sense: +1 for <=, -1 for >=, 0 for ==. Returns (status, x, duals of the rows)."""
+    m, n = A.shape
+    # x = offset + T x_std  with x_std >= 0
+    cols = []       # (original column, sign) for every standard column
+    offset = np.zeros(n)
+    upper = []      # (standard column, bound) for the rows x_std <= u - l
+    for j in range(n):
+        if lb[j] > -INF:
+            offset[j] = lb[j]
+            cols.append((j, 1.0))
+            if ub[j] < INF:
+                upper.append((len(cols) - 1, ub[j] - lb[j]))
+        elif ub[j] < INF:
+            offset[j] = ub[j]
+            cols.append((j, -1.0))
+        else:
+            cols.append((j, 1.0))
+            cols.append((j, -1.0))
+    N = len(cols)
+    T = np.zeros((n, N))
+    for k, (j, s) in enumerate(cols):
+        T[j, k] = s
+
+    n_slack = int(np.count_nonzero(sense)) + len(upper)
+    rows = m + len(upper)
+    S = np.zeros((rows, N + n_slack))
+    S[:m, :N] = A @ T
+    b = np.concatenate([rhs - A @ offset, [u for _, u in upper]])
+    k = N
+    for i in range(m):
+        if sense[i] != 0:
+            S[i, k] = 1.0 if sense[i] > 0 else -1.0
+            k += 1
+    for r, (col, _) in enumerate(upper):
+        S[m + r, col] = 1.0
+        S[m + r, k] = 1.0
+        k += 1
+    cs = np.concatenate([T.T @ c, np.zeros(n_slack)])
+
+    status, x_std, y = solve_standard_lp(S, b, cs, tol, max_iter)
+    if status != 'optimal':
+        return status, None, None
+    return status, offset + T @ x_std[:N], y[:m]
+
+
+def solve_milp(A, sense, rhs, c, lb, ub, integer, tol=1e-6, max_iter=10000, max_nodes=100000):
+    """Depth-first branch and bound over solve_lp. Returns (status, x, duals of the final LP, nodes)."""
+    best, best_x, best_y = INF, None, None
+    stack = [(lb.copy(), ub.copy())]
+    nodes = 0
+    status = 'infeasible'
+    while stack:
+        if nodes >= max_nodes:
+            return ('feasible' if best_x is not None else 'nodes'), best_x, best_y, nodes
+        node_lb, node_ub = stack.pop()
+        nodes += 1
+        lp_status, x, y = solve_lp(A, sense, rhs, c, node_lb, node_ub, max_iter=max_iter)
+        if lp_status == 'unbounded':
+            # an unbounded relaxation: unbounded if there is an integer point, else infeasible
+            return 'infeasible_or_unbounded', None, None, nodes
+        if lp_status != 'optimal' or c @ x >= best - tol:
+            continue
+        frac = np.abs(x[integer] - np.round(x[integer]))
+        if not (frac > tol).any():
+            best, best_x, best_y = c @ x, x, y
+            best_x[integer] = np.round(best_x[integer])
+            status = 'optimal'
+            continue
+        # branch on the most fractional variable, the "down" branch is explored first
+        j = integer[np.argmax(frac)]
+        up_lb = node_lb.copy()
+        up_lb[j] = math.ceil(x[j])
+        down_ub = node_ub.copy()
+        down_ub[j] = math.floor(x[j])
+        stack.append((up_lb, node_ub))
+        stack.append((node_lb, down_ub))
+    return status, best_x, best_y, nodes
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# the SolverFactory plugin
+
+@SolverFactory.register('numpy', doc='In-process NumPy simplex / branch and bound for small LP and MIP models')
+class NumpySolver(object):
+
+    def __init__(self, **kwds):
+        self.name = 'numpy'
+        self.options = Bunch()
+        self._version = (1, 0, 0)
+
+    def available(self, exception_flag=True):
+        return True
+
+    def license_is_valid(self):
+        return True
+
+    def version(self):
+        return self._version
+
+    def warm_start_capable(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, t, v, traceback):
+        pass
+
+    def solve(self, model, tee=False, load_solutions=True, **kwds):
+        start = time.time()
+        options = dict(self.options)
+        options.update(kwds.pop('options', {}) or {})
+        tol = options.get('tol', 1e-6)
+
+        try:
+            repn = LinearStandardFormCompiler().write(model, mixed_form=True, set_sense=None)
+        except InfeasibleConstraintException:
+            # a constraint without variables that can never be satisfied
+            results = SolverResults()
+            results.solver.name = self.name
+            results.solver.status = SolverStatus.ok
+            results.solver.termination_condition = TerminationCondition.infeasible
+            results.solver.time = time.time() - start
+            return results
+        A = repn.A.toarray()
+        rhs = np.asarray(repn.rhs, dtype=float)
+        sense = np.array([row.bound_type for row in repn.rows], dtype=int)
+        columns = repn.columns
+        objective = repn.objectives[0]
+        maximize = objective.sense == pyo.maximize
+        c = np.asarray(repn.c[[0]].toarray()).ravel() if repn.c.shape[1] else np.zeros(len(columns))
+        if maximize:
+            c = -c
+        offset = float(repn.c_offset[0]) if len(repn.c_offset) else 0.0
+        lb = np.array([-INF if v.lb is None else v.lb for v in columns], dtype=float)
+        ub = np.array([INF if v.ub is None else v.ub for v in columns], dtype=float)
+        integer = np.array([k for k, v in enumerate(columns) if v.is_integer() or v.is_binary()], dtype=int)
+
+        nodes = 0
+        if integer.size:
+            status, x, y, nodes = solve_milp(A, sense, rhs, c, lb, ub, integer, tol,
+                                             options.get('max_iter', 10000), options.get('max_nodes', 100000))
+        else:
+            status, x, y = solve_lp(A, sense, rhs, c, lb, ub, min(tol, 1e-9), options.get('max_iter', 10000))
+
+        results = SolverResults()
+        results.problem.name = model.name
+        results.problem.number_of_constraints = len(repn.rows)
+        results.problem.number_of_variables = len(columns)
+        results.problem.number_of_nonzeros = int(repn.A.nnz)
+        results.problem.number_of_objectives = 1
+        results.problem.sense = pyo.maximize if maximize else pyo.minimize
+        results.solver.name = self.name
+        results.solver.time = time.time() - start
+        results.solver.statistics.branch_and_bound.number_of_bounded_subproblems = nodes
+        results.solver.statistics.branch_and_bound.number_of_created_subproblems = nodes
+        results.solver.status = SolverStatus.ok
+        results.solver.termination_condition = {
+            'optimal': TerminationCondition.optimal,
+            'feasible': TerminationCondition.maxEvaluations,
+            'infeasible': TerminationCondition.infeasible,
+            'unbounded': TerminationCondition.unbounded,
+            'infeasible_or_unbounded': TerminationCondition.infeasibleOrUnbounded,
+            'iterations': TerminationCondition.maxIterations,
+            'nodes': TerminationCondition.maxEvaluations,
+        }[status]
+        if tee:
+            print("numpy solver: %s after %.6f s (%d rows, %d columns, %d nodes)"
+                  % (status, results.solver.time, len(repn.rows), len(columns), nodes))
+        if x is None:
+            if status in ('iterations', 'nodes'):
+                results.solver.status = SolverStatus.aborted
+            return results
+
+        value = float(c @ x) * (-1 if maximize else 1) + offset
+        results.problem.lower_bound = results.problem.upper_bound = value
+
+        # the solution, with the symbol map used by instance.solutions.load_from()
+        smap = SymbolMap()
+        soln = results.solution.add()
+        soln.status = SolutionStatus.optimal if status == 'optimal' else SolutionStatus.feasible
+        soln.gap = 0.0 if status == 'optimal' else None
+        smap.addSymbol(objective, 'obj')
+        soln.objective['obj'] = {'Value': value}
+        for k, (v, val) in enumerate(zip(columns, x.tolist())):
+            smap.addSymbol(v, 'x%d' % k)
+            soln.variable['x%d' % k] = {'Value': val}
+        if not integer.size:
+            duals = {}
+            for row, dual in zip(repn.rows, y.tolist()):
+                # ranged / equality constraints can appear twice, their duals add up
+                duals[row.constraint] = duals.get(row.constraint, 0.0) + (-dual if maximize else dual)
+            for k, (con, dual) in enumerate(duals.items()):
+                smap.addSymbol(con, 'c%d' % k)
+                soln.constraint['c%d' % k] = {'Dual': dual}
+        results._smap = smap
+
+        if load_solutions:
+            model.solutions.load_from(results)
+            results.solution.clear()
+            results._smap = None
+        return results
+
+
+if __name__ == '__main__':
+    # Attempt1.py:   min 2*x1 + 3*x2   s.t.  3*x1 + 4*x2 >= 1,  x1, x2 >= 0
+    model = pyo.ConcreteModel()
+    model.x = pyo.Var([0, 1], domain=pyo.NonNegativeReals)
+    model.OBJ = pyo.Objective(expr=2 * model.x[0] + 3 * model.x[1])
+    model.CON = pyo.Constraint(expr=3 * model.x[0] + 4 * model.x[1] >= 1)
+    model.dual = pyo.Suffix(direction=pyo.Suffix.IMPORT)
+
+    start = time.perf_counter()
+    results = SolverFactory('numpy').solve(model)
+    print("\nsolved in %.3f ms" % (1e3 * (time.perf_counter() - start)))
+    print(results)
+    model.display()
+    model.dual.display()
@@ -0,0 +1,128 @@
+# Same no-good cut loop as ExampleIterativeModels.py, but with a PERSISTENT solver session.
+#
+# In ExampleIterativeModels.py every opt.solve(instance) with SolverFactory('glpk'):
+#   1. writes the whole model to an LP file
+#   2. starts a new glpsol process
+#   3. parses the solution file again
+# so with thousands of iterations this fixed cost is most of the run time.
+#
+# A persistent solver keeps the model loaded inside the Python process (here HiGHS through the
+# pyomo.contrib.appsi interface, "pip install highspy"). The model is sent once with set_instance(),
+# then every new cut is sent as ONE added row with add_constraints([con]) and the next solve
+# starts from the basis of the previous one (the solver model is never rebuilt).
+#
+# https://pyomo.readthedocs.io/en/stable/contributed_packages/appsi.html
+# https://pyomo.readthedocs.io/en/stable/working_models.html#persistent-solvers
+#
+# At the bottom there is a small benchmark: per-iteration latency of the from-scratch glpk path
+# against the persistent path, run with:   python PersistentIterativeModels.py [n] [iterations]
+
+import sys
+import time
+
+import pyomo.environ as pyo
+from pyomo.contrib import appsi
+
+
+def build_instance(n=4):
+    # the same model as ExampleIterativeModels.py: n binary variables, empty constraint list
+    model = pyo.AbstractModel()
+    model.n = pyo.Param(default=n)
+    model.x = pyo.Var(pyo.RangeSet(model.n), within=pyo.Binary)
+
+    def o_rule(model):
+        return pyo.summation(model.x)
+
+    model.o = pyo.Objective(rule=o_rule)
+    model.c = pyo.ConstraintList()
+    return model.create_instance()
+
+
+def no_good_cut(instance):
+    # cut excluding the current solution: sum of the x at 0 + sum of (1 - x) of the x at 1 >= 1
+    expr = 0
+    for j in instance.x:
+        if pyo.value(instance.x[j]) < 0.5:
+            expr += instance.x[j]
+        else:
+            expr += 1 - instance.x[j]
+    return expr >= 1
+
+
+def persistent_session(instance):
+    # Create the in-process solver and load the model ONCE.
+    # All the automatic change detection is switched off: we tell the solver explicitly
+    # what changed (only new rows here), so a re-solve does not scan the whole model.
+    opt = appsi.solvers.Highs()
+    if not opt.available():
+        raise RuntimeError("HiGHS is not available, install it with: pip install highspy")
+    opt.update_config.check_for_new_or_removed_constraints = False
+    opt.update_config.check_for_new_or_removed_vars = False
+    opt.update_config.check_for_new_or_removed_params = False
+    opt.update_config.check_for_new_objective = False
+    opt.update_config.update_constraints = False
+    opt.update_config.update_vars = False
+    opt.update_config.update_params = False
+    opt.update_config.update_named_expressions = False
+    opt.update_config.update_objective = False
+    opt.set_instance(instance)
+    return opt
+
+
+def run_from_scratch(instance, iterations, solver='glpk'):
+    # the current path: every solve rewrites the model and restarts the solver process
+    opt = pyo.SolverFactory(solver)
+    opt.solve(instance)
+    times = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        instance.c.add(no_good_cut(instance))
+        results = opt.solve(instance)
+        times.append(time.perf_counter() - start)
+        if results.solver.termination_condition != pyo.TerminationCondition.optimal:
+            break
+    return times
+
+
+def run_persistent(instance, iterations):
+    # the persistent path: only the new row goes to the solver at every iteration
+    opt = persistent_session(instance)
+    # with load_solution=True an infeasible solve raises instead of returning its termination condition
+    opt.config.load_solution = False
+    opt.solve(instance).solution_loader.load_vars()
+    times = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        con = instance.c.add(no_good_cut(instance))
+        opt.add_constraints([con])      # one added row, the rest of the solver model is untouched
+        results = opt.solve(instance)
+        if results.termination_condition != appsi.base.TerminationCondition.optimal:
+            times.append(time.perf_counter() - start)
+            break
+        results.solution_loader.load_vars()     # the solution back into instance.x
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def report(label, times):
+    if not times:
+        print("%-14s no iterations" % label)
+        return
+    times = sorted(times)
+    print("%-14s iterations = %5d   mean = %8.3f ms   median = %8.3f ms   max = %8.3f ms" % (
+        label, len(times), 1e3 * sum(times) / len(times), 1e3 * times[len(times) // 2], 1e3 * times[-1]))
+
+
+if __name__ == '__main__':
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    print("\n\nPer-iteration latency of the no-good cut loop (n = %d binary variables)\n" % n)
+
+    if pyo.SolverFactory('glpk').available(exception_flag=False):
+        report("glpk (scratch)", run_from_scratch(build_instance(n), iterations))
+    else:
+        print("glpk not found, skipping the from-scratch path")
+
+    report("highs (persist)", run_persistent(build_instance(n), iterations))
+    print("\n\n")
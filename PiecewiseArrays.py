@@ -0,0 +1,296 @@
+# Piecewise linear functions y[k] = f_k(x[k]) for all the indices at once, from arrays of breakpoints.
+#
+# pyo.Piecewise (the pw_pts / pw_repn / f_rule keywords of Pyomo_notes.py) builds one sub-block per index, calls
+# f_rule once per breakpoint and checks every function point by point in python. With thousands of breakpoints
+# over thousands of indices most of the time goes there. Here:
+#   points   breakpoints, (n,) shared by all the indices or (m, n), one row per index (non-decreasing)
+#   values   f at the breakpoints, same shapes, or a vectorized function called once on the whole points array
+#   the checks of pyo.Piecewise are done on the arrays: non-decreasing points, slopes of consecutive segments within
+#   warn_tol (one warning for all the indices), convex / concave rows
+#   the rows of the formulation are built from the arrays (linear_sum of LinearBuilder.py, one expression per row)
+#
+# pw_repn:
+#   'SOS2'   lam[k, j] >= 0, sum_j lam = 1, x = sum_j points lam, y = sum_j values lam, lam[k, :] in an SOS2 set
+#   'LOG'    the same lam with ceil(log2(n - 1)) binaries z[k, l] instead of the SOS2 set (Vielma-Nemhauser,
+#            Gray code of the segments): binaries and branching rows grow with log(breakpoints). Any number of
+#            breakpoints (pyo.Piecewise needs n - 1 to be a power of two)
+# pw_constr_type: 'EQ' y = f(x), 'UB' y <= f(x), 'LB' y >= f(x). Like pyo.Piecewise, a convex f with 'LB' or a
+# concave f with 'UB' needs no lam at all: one cut per segment and the domain of x (force_pw=True to disable).
+#
+# Usage:
+#   model.x = pyo.Var(model.K, bounds=(0, 10))
+#   model.y = pyo.Var(model.K)
+#   model.f = build_piecewise(model.x, model.y, np.linspace(0, 10, 1025), np.sqrt, pw_repn='LOG')
+#
+# python PiecewiseArrays.py [indices] [breakpoints] compares construction time and model size with every
+# pw_repn of pyo.Piecewise.
+
+import numpy as np
+
+import pyomo.environ as pyo
+
+from LinearBuilder import linear_sum
+
+_WARNING_TOLERANCE = 1e-8       # the default warn_tol of pyo.Piecewise
+
+
+def _rows(a, m, name):
+    # (n,) or (m, n) -> (m, n) float array
+    a = np.asarray(a, dtype=float)
+    if a.ndim == 1:
+        a = np.broadcast_to(a, (m, len(a)))
+    if a.ndim != 2 or a.shape[0] != m:
+        raise ValueError("%s must have shape (n,) or (%d, n), not %s" % (name, m, a.shape))
+    if a.shape[1] < 2:
+        raise ValueError("%s needs at least 2 breakpoints" % name)
+    return a
+
+
+def _variables(v, keys):
+    # the VarData of v (IndexedVar, scalar Var or list) in the order of keys
+    if isinstance(v, (list, tuple)):
+        return list(v)
+    if not v.is_indexed():
+        return [v]
+    return [v[k] for k in keys]
+
+
+def characterize(points, values, warn_tol=_WARNING_TOLERANCE, name='piecewise', keys=None):
+    """Slopes (m, n-1) and convex / concave flags (m,) of every row, with the checks of pyo.Piecewise."""
+    widths = np.diff(points, axis=1)
+    keys = list(range(len(points))) if keys is None else keys
+    bad = np.flatnonzero((widths < 0).any(axis=1))
+    if len(bad):
+        raise ValueError("'%s[%s]' does not have a list of domain points that is non-decreasing" % (name, keys[bad[0]]))
+    bad = np.flatnonzero((widths == 0).any(axis=1))
+    if len(bad):
+        raise ValueError("'%s[%s]' has repeated domain points: step functions are not supported here (use pyo.Piecewise)"
+                         % (name, keys[bad[0]]))
+    slopes = np.diff(values, axis=1) / widths
+    turns = np.diff(slopes, axis=1)
+    close = np.flatnonzero((np.abs(turns) <= warn_tol).any(axis=1))
+    if len(close):
+        print("**WARNING: Piecewise component '%s' has detected slopes of consecutive piecewise segments to be within "
+              "%s of one another at %d indices (%s%s)"
+              % (name, warn_tol, len(close), ', '.join(str(keys[i]) for i in close[:5]), ', ...' if len(close) > 5 else ''))
+    return slopes, (turns >= 0).all(axis=1), (turns <= 0).all(axis=1)
+
+
+def gray_code_masks(n):
+    """Points (n,) x bits of the LOG formulation: plus[j, l] (zero[j, l]) when both segments of point j have bit l = 1 (0)."""
+    segments = np.arange(n - 1)
+    bits = int(np.ceil(np.log2(n - 1))) if n > 2 else 0
+    code = ((segments ^ (segments >> 1))[:, None] >> np.arange(bits)) & 1
+    left = np.vstack([code[:1], code])          # segment j - 1 of point j (segment 0 for the first point)
+    right = np.vstack([code, code[-1:]])        # segment j of point j (the last segment for the last point)
+    return (left == 1) & (right == 1), (left == 0) & (right == 0)
+
+
+def piecewise_value(points, values, x):
+    """f_k(x[k]) for every row k (linear interpolation, like PiecewiseData.__call__)."""
+    x = np.asarray(x, dtype=float)
+    points, values = _rows(points, len(x), 'points'), _rows(values, len(x), 'values')
+    seg = np.clip((points <= x[:, None]).sum(axis=1) - 1, 0, points.shape[1] - 2)
+    rows = np.arange(len(x))
+    x0, x1 = points[rows, seg], points[rows, seg + 1]
+    y0, y1 = values[rows, seg], values[rows, seg + 1]
+    return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+
+def build_piecewise(x, y, points, values, pw_repn='SOS2', pw_constr_type='EQ', warn_tol=_WARNING_TOLERANCE,
+                    force_pw=False, name='piecewise'):
+    """Block with y[k] (==, <=, >=) f_k(x[k]) for every index k of x, built from breakpoint / value arrays."""
+    if pw_repn not in ('SOS2', 'LOG'):
+        raise ValueError("pw_repn must be 'SOS2' or 'LOG', not %r" % (pw_repn,))
+    if pw_constr_type not in ('EQ', 'UB', 'LB'):
+        raise ValueError("pw_constr_type must be 'EQ', 'UB' or 'LB', not %r" % (pw_constr_type,))
+    keys = list(x.keys()) if not isinstance(x, (list, tuple)) and x.is_indexed() else list(range(len(_variables(x, None))))
+    xs, ys = _variables(x, keys), _variables(y, keys)
+    if len(xs) != len(ys):
+        raise ValueError("%d x variables and %d y variables" % (len(xs), len(ys)))
+    m = len(xs)
+    points = _rows(points, m, 'points')
+    values = _rows(values(points) if callable(values) else values, m, 'values')
+    if values.shape != points.shape:
+        raise ValueError("points %s and values %s have different shapes" % (points.shape, values.shape))
+    slopes, convex, concave = characterize(points, values, warn_tol, name, keys)
+
+    block = pyo.Block(concrete=True)
+    lp = np.zeros(m, dtype=bool)
+    if not force_pw:
+        lp = convex & (pw_constr_type == 'LB') | concave & (pw_constr_type == 'UB')
+    _build_cuts(block, np.flatnonzero(lp), keys, xs, ys, points, values, slopes, pw_constr_type)
+    _build_lambda(block, np.flatnonzero(~lp), keys, xs, ys, points, values, pw_repn, pw_constr_type)
+    return block
+
+
+def _build_cuts(block, rows, keys, xs, ys, points, values, slopes, pw_constr_type):
+    # convex f with y >= f(x) (concave with y <= f(x)): y (>=, <=) values_s + slopes_s (x - points_s) on every segment
+    if not len(rows):
+        return
+    n = points.shape[1]
+    position = {keys[i]: i for i in rows}
+    block.C = pyo.Set(initialize=[keys[i] for i in rows], ordered=True)
+    block.S = pyo.RangeSet(0, n - 2)
+    intercepts = values[:, :-1] - slopes * points[:, :-1]
+    lower = pw_constr_type == 'LB'
+
+    def cut(b, *index):
+        s = index[-1]
+        i = position[index[0] if len(index) == 2 else index[:-1]]
+        body = linear_sum([1.0, -float(slopes[i, s])], [ys[i], xs[i]])
+        bound = float(intercepts[i, s])
+        return body >= bound if lower else body <= bound
+
+    def domain(b, *index):
+        i = position[index[0] if len(index) == 1 else index]
+        return (float(points[i, 0]), xs[i], float(points[i, -1]))
+
+    block.cut = pyo.Constraint(block.C, block.S, rule=cut)
+    block.domain = pyo.Constraint(block.C, rule=domain)
+
+
+def _build_lambda(block, rows, keys, xs, ys, points, values, pw_repn, pw_constr_type):
+    if not len(rows):
+        return
+    n = points.shape[1]
+    position = {keys[i]: k for k, i in enumerate(rows)}
+    block.K = pyo.Set(initialize=[keys[i] for i in rows], ordered=True)
+    block.J = pyo.RangeSet(0, n - 1)
+    block.lam = pyo.Var(block.K, block.J, bounds=(0, 1))
+    lam = list(block.lam.values())
+    lam = [lam[k * n:(k + 1) * n] for k in range(len(rows))]       # K x J in construction order
+    p, v = points[rows].tolist(), values[rows].tolist()
+    ones = [1.0] * n
+
+    def row(index):
+        return position[index[0] if len(index) == 1 else index]
+
+    def convexity(b, *index):
+        return linear_sum(ones, lam[row(index)]) == 1
+
+    def x_link(b, *index):
+        k = row(index)
+        return linear_sum([1.0] + [-c for c in p[k]], [xs[rows[k]]] + lam[k]) == 0
+
+    def y_link(b, *index):
+        k = row(index)
+        body = linear_sum([1.0] + [-c for c in v[k]], [ys[rows[k]]] + lam[k])
+        return body == 0 if pw_constr_type == 'EQ' else (body <= 0 if pw_constr_type == 'UB' else body >= 0)
+
+    block.convexity = pyo.Constraint(block.K, rule=convexity)
+    block.x_link = pyo.Constraint(block.K, rule=x_link)
+    block.y_link = pyo.Constraint(block.K, rule=y_link)
+
+    if pw_repn == 'SOS2':
+        weights = list(range(1, n + 1))
+        block.sos = pyo.SOSConstraint(block.K, rule=lambda b, *index: (lam[row(index)], weights), sos=2)
+        return
+
+    plus, zero = gray_code_masks(n)
+    bits = plus.shape[1]
+    if not bits:
+        return                                  # one segment: the convex combination is enough
+    block.L = pyo.RangeSet(0, bits - 1)
+    block.z = pyo.Var(block.K, block.L, domain=pyo.Binary)
+    z = list(block.z.values())
+    z = [z[k * bits:(k + 1) * bits] for k in range(len(rows))]
+    plus = [np.flatnonzero(plus[:, l]).tolist() for l in range(bits)]
+    zero = [np.flatnonzero(zero[:, l]).tolist() for l in range(bits)]
+
+    def branch_plus(b, *index):
+        # the points whose segments all have bit l = 1 are only used when z[l] = 1
+        k, l = row(index[:-1]), index[-1]
+        terms = [lam[k][j] for j in plus[l]]
+        return linear_sum([1.0] * len(terms) + [-1.0], terms + [z[k][l]]) <= 0
+
+    def branch_zero(b, *index):
+        k, l = row(index[:-1]), index[-1]
+        terms = [lam[k][j] for j in zero[l]]
+        return linear_sum([1.0] * (len(terms) + 1), terms + [z[k][l]]) <= 1
+
+    block.branch_plus = pyo.Constraint(block.K, block.L, rule=branch_plus)
+    block.branch_zero = pyo.Constraint(block.K, block.L, rule=branch_zero)
+
+
+def model_size(model):
+    """(variables, binaries, constraints, SOS sets) of a model."""
+    variables = list(model.component_data_objects(pyo.Var))
+    return (len(variables), sum(1 for v in variables if v.is_binary()),
+            sum(1 for _ in model.component_data_objects(pyo.Constraint, active=True)),
+            sum(1 for _ in model.component_data_objects(pyo.SOSConstraint, active=True)))
+
+
+if __name__ == '__main__':
+    import gc
+    import sys
+    import time
+
+    m = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 65           # 64 segments: LOG / DLOG of pyo.Piecewise work
+    rng = np.random.default_rng(0)
+    points = np.linspace(0, 10, n)
+    freq = rng.uniform(0.5, 2, m)
+    values = np.sin(points[None, :] * freq[:, None]) * 10 + points     # (m, n), not convex
+
+    def model_base():
+        model = pyo.ConcreteModel()
+        model.K = pyo.RangeSet(0, m - 1)
+        model.x = pyo.Var(model.K, bounds=(0, 10))
+        model.y = pyo.Var(model.K)
+        return model
+
+    pts = {k: points.tolist() for k in range(m)}
+    vals = {k: values[k].tolist() for k in range(m)}
+    rows = []
+    for repn in ('SOS2', 'CC', 'DCC', 'INC', 'MC', 'LOG', 'DLOG', 'SOS2 f_rule'):
+        if repn in ('DCC', 'DLOG') and m * n * n > 2e7:
+            rows.append(('Piecewise ' + repn, None, None, 'skipped (n^2 variables per index)'))
+            continue
+        model = model_base()
+        f_rule = (lambda mod, k, x: float(np.sin(x * freq[k]) * 10 + x)) if repn == 'SOS2 f_rule' else vals
+        gc.collect()
+        start = time.perf_counter()
+        try:
+            model.f = pyo.Piecewise(model.K, model.y, model.x, pw_pts=pts, f_rule=f_rule, pw_constr_type='EQ',
+                                    pw_repn=repn.split()[0], warning_tol=0.0)
+        except Exception as e:
+            rows.append(('Piecewise ' + repn, None, None, str(e).splitlines()[0][:60]))
+            continue
+        rows.append(('Piecewise ' + repn, time.perf_counter() - start, model_size(model), ''))
+
+    for repn in ('SOS2', 'LOG'):
+        model = model_base()
+        gc.collect()
+        start = time.perf_counter()
+        model.f = build_piecewise(model.x, model.y, points, values, pw_repn=repn, warn_tol=0)
+        rows.append(('build_piecewise ' + repn, time.perf_counter() - start, model_size(model), ''))
+
+    print("%d indices x %d breakpoints" % (m, n))
+    print("%-26s %9s %9s %9s %9s %6s" % ('', 'build s', 'vars', 'binaries', 'rows', 'SOS'))
+    for label, seconds, size, note in rows:
+        if seconds is None:
+            print("%-26s %s" % (label, note))
+        else:
+            print("%-26s %9.3f %9d %9d %9d %6d" % ((label, seconds) + size))
+
+    # LOG on the first 20 indices gives y = f(x) at random x (needs a MIP solver)
+    opt = pyo.SolverFactory('appsi_highs')
+    if opt.available(exception_flag=False):
+        check = min(m, 20)
+        model = pyo.ConcreteModel()
+        model.K = pyo.RangeSet(0, check - 1)
+        model.x = pyo.Var(model.K, bounds=(0, 10))
+        model.y = pyo.Var(model.K)
+        model.f = build_piecewise(model.x, model.y, points, values[:check], pw_repn='LOG', warn_tol=0)
+        xq = rng.uniform(0, 10, check)
+        for k in model.K:
+            model.x[k].fix(xq[k])
+        model.obj = pyo.Objective(expr=sum(model.y.values()))
+        results = opt.solve(model, load_solutions=False)
+        if results.solver.termination_condition == pyo.TerminationCondition.optimal:
+            model.solutions.load_from(results)
+            y = np.array([model.y[k].value for k in model.K])
+            print("LOG: max |y - f(x)| = %.2e" % np.abs(y - piecewise_value(points, values[:check], xq)).max())
+        else:
+            print("LOG check:", results.solver.termination_condition)
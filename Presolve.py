@@ -0,0 +1,566 @@
+# Presolve: a smaller problem is sent to the solver, and its solution (values and duals) is mapped back to the
+# original instance.
+#
+# abstract1.py (Ax >= b), Exercise1.py (rows with mixed senses) and the fix/unfix examples of Pyomo_notes.py
+# (instance.x[2].fix(1)) give instances with fixed variables, rows left with one variable or none at all, the same
+# row written twice (a ranged constraint is two rows of the matrix) and rows that no point within the bounds can
+# violate. All of them are written to the LP file and read by the solver. Here the matrix is extracted once with
+# the standard form compiler, and the following reductions are repeated (each one is a numpy pass over the
+# nonzeros of the rows / columns still there) until nothing changes:
+#
+#   empty rows          0 within the bounds: removed (else the instance is infeasible)
+#   singleton rows      l <= a x_j <= u  becomes a bound of x_j and the row is removed
+#   duplicate rows      rows that are multiples of each other (same columns, proportional coefficients) become one
+#                       row with the intersection of their bounds
+#   redundant rows      min / max of the row over the bounds of its columns within the row bounds: removed
+#   bound tightening    bounds implied by the rows for the Integer / Binary columns (rounded), which shrinks the
+#                       branch and bound. Continuous columns keep their bounds: an implied bound only repeats a
+#                       row, and a solver that stops on it would return duals that are not the ones of the instance
+#   fixed columns       lb == ub (also after the steps above): the column is removed and moved to the row bounds
+#                       and to the objective constant. Variables fixed with .fix() are left out by the compiler
+#                       already (as the LP writer does), so only the rows they leave behind are reduced here
+#
+#   results = solve(pyo.SolverFactory('glpk'), instance)      presolve, solve the reduced model, postsolve: the
+#                                                             values, and the duals / reduced costs when instance.dual /
+#                                                             instance.rc are declared, are loaded into the instance
+#   opt = wrap(pyo.SolverFactory('glpk'));  opt.solve(instance)          the same through opt.solve
+#   pre = presolve(instance);  pre.model                      the reduced ConcreteModel (MatrixModel.model_from_arrays)
+#   pre.stats                                                 rows / columns / nonzeros before and after, reductions
+#   postsolve(pre)                                            after pre.model has been solved by hand
+# load_solutions=False returns the results of the reduced model and leaves the instance as it is.
+#
+# The postsolve walks back the passes: a merged row gives its dual to the row whose bound is active, a singleton
+# row whose bound is active gets the reduced cost of its column (dual = rc / a), and the reduced costs of all the
+# columns are  c - A'y  over the original matrix. presolve_arrays() / postsolve_arrays() do the same on the arrays
+# of MatrixModel.normalize(). Only linear models (LP and MIP), like NumpySolver.py.
+
+import time
+
+import numpy as np
+import scipy.sparse as sp
+
+import pyomo.environ as pyo
+from pyomo.common.errors import InfeasibleConstraintException
+from pyomo.opt import SolverResults, SolverStatus, TerminationCondition
+from pyomo.opt.results.solution import SolutionStatus
+from pyomo.repn.plugins.standard_form import LinearStandardFormCompiler
+
+from MatrixModel import model_from_arrays
+from SolutionArrays import extract
+
+INF = float('inf')
+_reductions = ('empty', 'singleton', 'duplicate', 'redundant', 'tightened', 'fixed')
+
+
+class Reduction(object):
+    # what presolve_arrays() did, enough to map a solution of the reduced arrays back
+
+    def __init__(self, A, c, sign):
+        self.A = A                      # original matrix (CSR) and objective
+        self.c = c
+        self.sign = sign                # 1 minimize, -1 maximize (the side of a bound that a dual points to)
+        m, n = A.shape
+        self.rows = None                # original row of every reduced row
+        self.columns = None             # original column of every reduced column
+        self.fixed = np.full(n, np.nan) # value of the removed (fixed) columns
+        self.lb, self.ub = None, None   # final bounds of all the columns
+        self.lb_row = np.full(n, -1)    # singleton row that gave the lower / upper bound of a column (-1: none)
+        self.ub_row = np.full(n, -1)
+        self.pass_of_row = np.full(m, -1)
+        self.passes = []                # per pass: {'singleton': (rows, columns), 'duplicate': (...)}
+        self.offset = 0.0               # objective constant of the fixed columns
+        self.arrays = None              # (A, row_lb, row_ub, c, lb, ub, integer) of the reduced problem
+        self.counts = dict.fromkeys(_reductions, 0)
+
+    def __repr__(self):
+        (m, n), (rm, rn) = self.A.shape, self.arrays[0].shape
+        return "Reduction(rows %d -> %d, columns %d -> %d, nonzeros %d -> %d)" % (
+            m, rm, n, rn, self.A.nnz, self.arrays[0].nnz)
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# reductions on the arrays (numpy only)
+
+def _margin(b, tol):
+    # tolerance relative to the size of a bound (0 for the infinite ones)
+    with np.errstate(invalid='ignore'):
+        return np.where(np.isfinite(b), tol * np.maximum(1.0, np.abs(b)), 0.0)
+
+
+def _segments(starts, lengths):
+    # concatenation of the ranges  start, ..., start + length - 1
+    total = int(lengths.sum())
+    first = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + np.arange(total) - first
+
+
+def _tighten(red, lb, ub, integer, j, lo, hi, source, tol):
+    # new bounds lo <= x_j <= hi (several per column allowed); source: the row that gives them (-1 when implied)
+    rounded = integer[j]
+    lo, hi = lo.copy(), hi.copy()
+    lo[rounded] = np.ceil(lo[rounded] - tol) + 0.0         # + 0.0: no -0.0 bounds
+    hi[rounded] = np.floor(hi[rounded] + tol) + 0.0
+    improved = 0
+    for bound, new, rows, better in ((lb, lo, red.lb_row, np.maximum), (ub, hi, red.ub_row, np.minimum)):
+        best = bound.copy()
+        better.at(best, j, new)
+        if better is np.maximum:
+            changed = best > bound + _margin(bound, tol)
+        else:
+            changed = best < bound - _margin(bound, tol)
+        win = changed[j] & (new == best[j])
+        rows[j[win]] = source[win]
+        bound[changed] = best[changed]
+        improved += int(changed.sum())
+    return improved
+
+
+def _duplicates(B, rows):
+    # rows of B (alive rows x alive columns, >= 2 nonzeros each) that are multiples of another one:
+    # (members, their representative, factor t with  member = t * representative)
+    count = np.diff(B.indptr)
+    scale = B.data[B.indptr[:-1]]
+    norm = B.data / np.repeat(scale, count)
+    # group by the sparsity pattern and the normalized coefficients (float32, so tiny differences do not matter
+    # here), with two random projections as the key; the groups are checked exactly below
+    rng = np.random.default_rng(0)
+    weights = rng.random((2, B.shape[1]))
+    q = norm.astype(np.float32).astype(float)
+    h1 = np.add.reduceat(q * weights[0][B.indices], B.indptr[:-1])
+    h2 = np.add.reduceat(q * weights[1][B.indices], B.indptr[:-1])
+    order = np.lexsort((h2, h1, count))
+    new = np.ones(len(order), dtype=bool)
+    new[1:] = (count[order][1:] != count[order][:-1]) | (h1[order][1:] != h1[order][:-1]) | \
+              (h2[order][1:] != h2[order][:-1])
+    first = order[np.flatnonzero(new)[np.cumsum(new) - 1]]
+    members = order[~new]
+    rep = first[~new]
+    if not len(members):
+        return members, rep, members.astype(float)
+    i = _segments(B.indptr[members], count[members])
+    g = _segments(B.indptr[rep], count[rep])
+    same = (B.indices[i] == B.indices[g]) & (np.abs(norm[i] - norm[g]) <= 1e-9 * np.maximum(1.0, np.abs(norm[g])))
+    ok = np.logical_and.reduceat(same, np.cumsum(count[members]) - count[members])
+    members, rep = members[ok], rep[ok]
+    return rows[members], rows[rep], scale[members] / scale[rep]
+
+
+def _merge(red, record, members, rep, t, row_lb, row_ub, tol):
+    # the bounds of the members, in the scale of their representative, intersected with its own
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lo = np.where(t > 0, row_lb[members], row_ub[members]) / t
+        hi = np.where(t > 0, row_ub[members], row_lb[members]) / t
+    reps = np.unique(rep)
+    lo_src, hi_src = reps.copy(), reps.copy()
+    lo_t, hi_t = np.ones(len(reps)), np.ones(len(reps))
+    k = np.searchsorted(reps, rep)
+    for bound, new, src, factor, better, sign in ((row_lb, lo, lo_src, lo_t, np.maximum, 1),
+                                                   (row_ub, hi, hi_src, hi_t, np.minimum, -1)):
+        best = bound[reps].copy()
+        better.at(best, k, new)
+        with np.errstate(invalid='ignore'):
+            changed = sign * (best - bound[reps]) > _margin(bound[reps], tol)
+        win = changed[k] & (new == best[k])
+        src[k[win]] = members[win]
+        factor[k[win]] = t[win]
+        bound[reps[changed]] = best[changed]
+    bad = row_lb[reps] > row_ub[reps] + _margin(row_ub[reps], tol)
+    if bad.any():
+        raise InfeasibleConstraintException("presolve: row %d and its multiples have no common point"
+                                            % reps[bad][0])
+    record['duplicate'] = (reps, lo_src, lo_t, hi_src, hi_t)
+
+
+def _activity(B, lb, ub):
+    # min / max of every row of B over the bounds (inf when a column is unbounded), with the contributions
+    # of every nonzero and the number of infinite ones per row
+    a = B.data
+    L, U = lb[B.indices], ub[B.indices]
+    low = np.where(a > 0, a * L, a * U)
+    high = np.where(a > 0, a * U, a * L)
+    row = np.repeat(np.arange(B.shape[0]), np.diff(B.indptr))
+    inf_low, inf_high = np.isinf(low), np.isinf(high)
+    n_low = np.bincount(row, inf_low, minlength=B.shape[0])
+    n_high = np.bincount(row, inf_high, minlength=B.shape[0])
+    sum_low = np.bincount(row, np.where(inf_low, 0.0, low), minlength=B.shape[0])
+    sum_high = np.bincount(row, np.where(inf_high, 0.0, high), minlength=B.shape[0])
+    return row, low, high, inf_low, inf_high, n_low, n_high, sum_low, sum_high
+
+
+def presolve_arrays(A, row_lb, row_ub, c, lb, ub, integer=None, maximize=False, tighten=True, duplicates=True,
+                    tol=1e-9, max_passes=20):
+    """Reduce  row_lb <= A x <= row_ub, lb <= x <= ub, min/max c'x. Returns the Reduction (reduced arrays in
+    .arrays). Raises InfeasibleConstraintException when a reduction proves that there is no feasible point."""
+    A = sp.csr_matrix(A, dtype=float, copy=True)
+    A.sum_duplicates()
+    A.eliminate_zeros()
+    m, n = A.shape
+    row_lb, row_ub = np.array(row_lb, dtype=float), np.array(row_ub, dtype=float)
+    c, lb, ub = np.array(c, dtype=float), np.array(lb, dtype=float), np.array(ub, dtype=float)
+    integer = np.zeros(n, dtype=bool) if integer is None else np.asarray(integer, dtype=bool)
+    lb[integer] = np.ceil(lb[integer] - tol) + 0.0
+    ub[integer] = np.floor(ub[integer] + tol) + 0.0
+    red = Reduction(A, c, -1 if maximize else 1)
+    counts = red.counts
+    row_alive, col_alive = np.ones(m, dtype=bool), np.ones(n, dtype=bool)
+
+    for p in range(max_passes):
+        record = {}
+        before = dict(counts)
+        rows, cols = np.flatnonzero(row_alive), np.flatnonzero(col_alive)
+        B = A[rows][:, cols]
+        B.sort_indices()
+        count = np.diff(B.indptr)
+
+        # empty rows
+        r = rows[count == 0]
+        bad = (row_lb[r] > _margin(row_lb[r], tol)) | (row_ub[r] < -_margin(row_ub[r], tol))
+        if bad.any():
+            raise InfeasibleConstraintException("presolve: row %d has no variables left and 0 is not within its "
+                                                "bounds [%s, %s]" % (r[bad][0], row_lb[r[bad][0]], row_ub[r[bad][0]]))
+        row_alive[r] = False
+        counts['empty'] += len(r)
+
+        # singleton rows -> bounds
+        k = np.flatnonzero(count == 1)
+        if len(k):
+            r, pos = rows[k], B.indptr[k]
+            j, a = cols[B.indices[pos]], B.data[pos]
+            lo = np.where(a > 0, row_lb[r], row_ub[r]) / a
+            hi = np.where(a > 0, row_ub[r], row_lb[r]) / a
+            _tighten(red, lb, ub, integer, j, lo, hi, r, tol)
+            row_alive[r] = False
+            red.pass_of_row[r] = p
+            record['singleton'] = (r, np.unique(j))
+            counts['singleton'] += len(r)
+
+        # duplicate rows
+        keep = np.flatnonzero(row_alive[rows] & (count >= 2))
+        if duplicates and len(keep) > 1:
+            members, rep, t = _duplicates(B[keep], rows[keep])
+            if len(members):
+                _merge(red, record, members, rep, t, row_lb, row_ub, tol)
+                row_alive[members] = False
+                red.pass_of_row[members] = p
+                counts['duplicate'] += len(members)
+
+        # redundant rows, and the bounds of the integer columns implied by the rows
+        keep = np.flatnonzero(row_alive[rows])
+        if len(keep):
+            E, er = B[keep], rows[keep]
+            row, low, high, inf_low, inf_high, n_low, n_high, sum_low, sum_high = _activity(E, lb[cols], ub[cols])
+            min_act = np.where(n_low == 0, sum_low, -INF)
+            max_act = np.where(n_high == 0, sum_high, INF)
+            l, u = row_lb[er], row_ub[er]
+            bad = (min_act > u + _margin(u, tol)) | (max_act < l - _margin(l, tol))
+            if bad.any():
+                raise InfeasibleConstraintException("presolve: row %d cannot be satisfied within the bounds of its "
+                                                    "variables" % er[bad][0])
+            redundant = (min_act >= l - _margin(l, tol)) & (max_act <= u + _margin(u, tol))
+            row_alive[er[redundant]] = False
+            counts['redundant'] += int(redundant.sum())
+
+            e = np.flatnonzero(integer[cols[E.indices]] & ~redundant[row]) if tighten else []
+            if len(e):
+                a, i = E.data[e], row[e]
+                # the rest of the row without this column: finite only if the other columns are all bounded
+                with np.errstate(invalid='ignore'):
+                    rest_low = np.where(n_low[i] - inf_low[e] == 0,
+                                        sum_low[i] - np.where(inf_low[e], 0, low[e]), np.nan)
+                    rest_high = np.where(n_high[i] - inf_high[e] == 0,
+                                         sum_high[i] - np.where(inf_high[e], 0, high[e]), np.nan)
+                    from_u = (u[i] - rest_low) / a
+                    from_l = (l[i] - rest_high) / a
+                lo = np.where(a > 0, from_l, from_u)
+                hi = np.where(a > 0, from_u, from_l)
+                # nan (unbounded rest) and huge values are no bound
+                lo = np.where(np.isnan(lo) | (np.abs(lo) > 1e9), -INF, lo)
+                hi = np.where(np.isnan(hi) | (np.abs(hi) > 1e9), INF, hi)
+                counts['tightened'] += _tighten(red, lb, ub, integer, cols[E.indices[e]], lo, hi,
+                                                np.full(len(e), -1), tol)
+
+        # fixed columns
+        bad = col_alive & (lb > ub + _margin(ub, tol))
+        if bad.any():
+            raise InfeasibleConstraintException("presolve: the bounds of column %d cross (%s > %s)"
+                                                % (np.flatnonzero(bad)[0], lb[bad][0], ub[bad][0]))
+        with np.errstate(invalid='ignore'):
+            fix = col_alive & (ub - lb <= _margin(lb, tol))
+        if fix.any():
+            value = np.zeros(n)
+            value[fix] = lb[fix]
+            shift = A @ value
+            row_lb -= shift
+            row_ub -= shift
+            red.offset += float(c @ value)
+            red.fixed[fix] = lb[fix]
+            col_alive[fix] = False
+            counts['fixed'] += int(fix.sum())
+
+        red.passes.append(record)
+        if counts == before:
+            break
+
+    red.rows, red.columns = np.flatnonzero(row_alive), np.flatnonzero(col_alive)
+    red.lb, red.ub = lb, ub
+    R = A[red.rows][:, red.columns]
+    R.sort_indices()
+    red.arrays = (R, row_lb[red.rows], row_ub[red.rows], c[red.columns], lb[red.columns], ub[red.columns],
+                  integer[red.columns])
+    return red
+
+
+def postsolve_arrays(red, x, y=None):
+    """Solution of the reduced arrays -> solution of the original ones: x, and (if the row duals y of the reduced
+    problem are given) the duals of all the rows and the reduced costs of all the columns."""
+    n = red.A.shape[1]
+    values = red.fixed.copy()
+    values[red.columns] = np.asarray(x, dtype=float)
+    # columns that are in no row any more and not in the objective are not reported by the solvers: any point
+    # within the bounds will do
+    missing = np.isnan(values)
+    values[missing] = np.clip(0.0, red.lb, red.ub)[missing]
+    if y is None:
+        return values, None, None
+
+    A, c = red.A, red.c
+    At = A.T.tocsr()
+    duals = np.zeros(A.shape[0])
+    duals[red.rows] = np.nan_to_num(np.asarray(y, dtype=float))
+    for p in range(len(red.passes) - 1, -1, -1):
+        record = red.passes[p]
+        if 'duplicate' in record:
+            reps, lo_src, lo_t, hi_src, hi_t = record['duplicate']
+            dual = duals[reps]
+            lower = red.sign * dual > 0
+            duals[reps] = 0.0
+            np.add.at(duals, np.where(lower, lo_src, hi_src), dual / np.where(lower, lo_t, hi_t))
+        if 'singleton' in record:
+            # a column at a bound that comes from a singleton row of this pass: the row takes its reduced cost
+            _, j = record['singleton']
+            rc = c[j] - At[j] @ duals
+            src = np.where(red.sign * rc > 0, red.lb_row[j], red.ub_row[j])
+            ok = src >= 0
+            ok[ok] = red.pass_of_row[src[ok]] == p
+            a = np.asarray(A[src[ok], j[ok]]).ravel()
+            duals[src[ok]] = rc[ok] / a
+    return values, duals, c - At @ duals
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# Pyomo instances
+
+class Presolve(object):
+    # an instance, its reduced model and the Reduction between them
+
+    def __init__(self, instance, rows, columns, objective, reduction, model, duals, seconds):
+        self.instance = instance
+        self.rows = rows                    # ConstraintData of every row of the matrix (ranged ones twice)
+        self.columns = columns              # VarData of every column
+        self.objective = objective
+        self.reduction = reduction
+        self.model = model                  # reduced ConcreteModel (None when no column is left)
+        self.duals = duals                  # duals / reduced costs are mapped back (LP and instance.dual or .rc)
+        (m, n), R = reduction.A.shape, reduction.arrays[0]
+        self.stats = dict(reduction.counts, rows=(m, R.shape[0]), columns=(n, R.shape[1]),
+                          nonzeros=(reduction.A.nnz, R.nnz), passes=len(reduction.passes), time=seconds)
+
+    def __repr__(self):
+        return "Presolve(rows %d -> %d, columns %d -> %d, nonzeros %d -> %d)" % (
+            self.stats['rows'] + self.stats['columns'] + self.stats['nonzeros'])
+
+
+def _wants(instance, name):
+    suffix = instance.component(name)
+    return isinstance(suffix, pyo.Suffix) and suffix.import_enabled()
+
+
+def presolve(instance, tighten=True, duplicates=True, tol=1e-9):
+    # matrix of the active linear constraints and objective -> reductions -> reduced ConcreteModel
+    start = time.perf_counter()
+    repn = LinearStandardFormCompiler().write(instance, mixed_form=True, set_sense=None)
+    columns = list(repn.columns)
+    bound = np.array([row.bound_type for row in repn.rows], dtype=int)
+    rhs = np.asarray(repn.rhs, dtype=float)
+    row_lb = np.where(bound <= 0, rhs, -INF)
+    row_ub = np.where(bound >= 0, rhs, INF)
+    lb = np.array([-INF if v.lb is None else v.lb for v in columns], dtype=float)
+    ub = np.array([INF if v.ub is None else v.ub for v in columns], dtype=float)
+    integer = np.array([v.is_integer() or v.is_binary() for v in columns], dtype=bool)
+    objective = repn.objectives[0] if len(repn.objectives) else None
+    maximize = objective is not None and objective.sense == pyo.maximize
+    c = repn.c[[0]].toarray().ravel() if objective is not None else np.zeros(len(columns))
+
+    red = presolve_arrays(repn.A, row_lb, row_ub, c, lb, ub, integer, maximize, tighten, duplicates, tol)
+    red.offset += float(repn.c_offset[0]) if objective is not None else 0.0
+
+    # duals only for LPs (a MIP solver does not return them)
+    duals = not integer.any() and (_wants(instance, 'dual') or _wants(instance, 'rc'))
+    model = None
+    R, r_lb, r_ub, r_c, r_lb_col, r_ub_col, r_int = red.arrays
+    if R.shape[1]:
+        domain = [pyo.Integers if k else pyo.Reals for k in r_int.tolist()]
+        model = model_from_arrays(R, r_lb, r_ub, r_c, r_lb_col, r_ub_col, domain=domain, maximize=maximize)
+        if red.offset:
+            model.obj.expr = model.obj.expr + red.offset
+        if duals:
+            model.dual = pyo.Suffix(direction=pyo.Suffix.IMPORT)
+    return Presolve(instance, [row.constraint for row in repn.rows], columns, objective, red, model, duals,
+                    time.perf_counter() - start)
+
+
+def postsolve(pre, sol=None):
+    # solution of pre.model -> the instance (duals and reduced costs too when instance.dual / instance.rc exist).
+    # sol: the SolutionArrays.Solution of the reduced solve, else the values loaded in pre.model are used
+    red = pre.reduction
+    R = red.arrays[0]
+    x, y = np.full(R.shape[1], np.nan), np.zeros(R.shape[0]) if pre.duals else None
+    if sol is not None:
+        x[sol.index['x']] = sol.value['x']
+        if pre.duals:
+            y[sol.index['con']] = np.nan_to_num(sol.dual['con'])
+    elif pre.model is not None:
+        x[:] = [np.nan if v.value is None else v.value for v in pre.model.x.values()]
+        if pre.duals:
+            y[list(pre.model.con.keys())] = [pre.model.dual.get(con, 0.0) for con in pre.model.con.values()]
+    values, duals, rc = postsolve_arrays(red, x, y)
+    for v, value in zip(pre.columns, values.tolist()):
+        if not v.fixed:
+            v.set_value(value, skip_validation=True)
+
+    if duals is not None:
+        if _wants(pre.instance, 'dual'):
+            # ranged / equality constraints can be two rows, their duals add up
+            per_constraint = {}
+            for con, dual in zip(pre.rows, duals.tolist()):
+                per_constraint[con] = per_constraint.get(con, 0.0) + dual
+            pre.instance.dual.update(per_constraint.items())
+        if _wants(pre.instance, 'rc'):
+            pre.instance.rc.update(zip(pre.columns, rc.tolist()))
+    return values
+
+
+def _results(pre, termination, message=None):
+    # results of a solve that did not need the solver (presolve found it infeasible, or removed every column)
+    results = SolverResults()
+    results.solver.name = 'presolve'
+    results.solver.status = SolverStatus.ok
+    results.solver.termination_condition = termination
+    results.solver.message = message
+    if pre is not None:
+        results.problem.name = pre.instance.name
+        results.problem.number_of_constraints = 0
+        results.problem.number_of_variables = 0
+        results.problem.lower_bound = results.problem.upper_bound = pre.reduction.offset
+        results.solution.add().status = SolutionStatus.optimal
+    return results
+
+
+def solve(opt, instance, tighten=True, duplicates=True, tol=1e-9, load_solutions=True, **kwds):
+    # presolve -> opt.solve(reduced model) -> postsolve into the instance; returns the results of the reduced solve
+    try:
+        pre = presolve(instance, tighten, duplicates, tol)
+    except InfeasibleConstraintException as e:
+        return _results(None, TerminationCondition.infeasible, str(e))
+    if kwds.get('tee'):
+        print("presolve:", pre, "in %.3f s" % pre.stats['time'])
+    if pre.model is None:
+        results = _results(pre, TerminationCondition.optimal)
+    else:
+        results = opt.solve(pre.model, load_solutions=False, **kwds)
+        if not load_solutions or not len(results.solution):
+            return results
+        # the reduced solution is read into arrays, it is not loaded into pre.model
+        postsolve(pre, extract(pre.model, results, slacks=False))
+        results.solution.clear()
+        return results
+    if load_solutions:
+        postsolve(pre)
+    return results
+
+
+def wrap(opt):
+    # make opt.solve(instance, ...) go through presolve / postsolve (the solver object is otherwise unchanged)
+    solve_reduced = opt.solve
+
+    class _Solver(object):
+        def __init__(self):
+            self.name = getattr(opt, 'name', type(opt).__name__)
+            self.options = getattr(opt, 'options', {})
+
+        def solve(self, *args, **kwds):
+            return solve_reduced(*args, **kwds)
+
+    inner = _Solver()
+    opt.solve = lambda instance, *args, **kwds: solve(inner, instance, *args, **kwds)
+    return opt
+
+
+if __name__ == '__main__':
+    # python Presolve.py [variables]
+    # abstract1.py-like rows  x[j] + x[j+1] + x[j+2] >= b  with what real instances have on top: fixed variables,
+    # caps written as constraints (singleton rows), a weaker copy of some rows (2x the row >= 2b - 1), ranged rows
+    # and rows that the bounds already satisfy. opt.solve(instance) against solve(opt, instance)
+    import os
+    import sys
+    import tempfile
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    m = n // 2
+
+    def build():
+        rng = np.random.default_rng(0)
+        model = pyo.ConcreteModel()
+        model.J = pyo.RangeSet(0, n - 1)
+        model.R = pyo.RangeSet(0, m - 1)
+        model.x = pyo.Var(model.J, bounds=(0, 10))
+        cost, b = rng.integers(1, 10, n).tolist(), rng.integers(1, 12, m).tolist()
+        model.obj = pyo.Objective(expr=pyo.quicksum(cost[j] * model.x[j] for j in model.J))
+        model.row = pyo.Constraint(model.R, rule=lambda mm, r: mm.x[2 * r] + mm.x[2 * r + 1] + mm.x[(2 * r + 2) % n]
+                                   >= b[r])
+        model.copy = pyo.Constraint(range(0, m, 4), rule=lambda mm, r: 2 * (mm.x[2 * r] + mm.x[2 * r + 1] +
+                                                                            mm.x[(2 * r + 2) % n]) >= 2 * b[r] - 1)
+        model.range = pyo.Constraint(range(1, m, 10), rule=lambda mm, r: (1, mm.x[2 * r] - mm.x[(2 * r + 3) % n], 8))
+        model.cap = pyo.Constraint(range(0, n, 5), rule=lambda mm, j: mm.x[j] <= 4 + j % 6)
+        model.loose = pyo.Constraint(range(3, n, 7), rule=lambda mm, j: mm.x[j] + mm.x[(j + 1) % n] <= 25)
+        for j in range(7, n, 10):
+            model.x[j].fix(j % 3)
+        model.dual = pyo.Suffix(direction=pyo.Suffix.IMPORT)
+        return model
+
+    opt = pyo.SolverFactory('glpk')
+    tmp = tempfile.mkdtemp()
+    plain, reduced = build(), build()
+
+    start = time.perf_counter()
+    opt.solve(plain)
+    t_plain = time.perf_counter() - start
+    # solve(opt, reduced) one step at a time
+    start = time.perf_counter()
+    pre = presolve(reduced)
+    t_presolve = time.perf_counter() - start
+    start = time.perf_counter()
+    results = opt.solve(pre.model, load_solutions=False)
+    t_solver = time.perf_counter() - start
+    start = time.perf_counter()
+    postsolve(pre, extract(pre.model, results, slacks=False))
+    t_postsolve = time.perf_counter() - start
+
+    plain.write(os.path.join(tmp, 'plain.lp'))
+    pre.model.write(os.path.join(tmp, 'reduced.lp'))
+    sizes = [os.path.getsize(os.path.join(tmp, f)) for f in ('plain.lp', 'reduced.lp')]
+    for f in ('plain.lp', 'reduced.lp'):
+        os.remove(os.path.join(tmp, f))
+    os.rmdir(tmp)
+
+    rows, columns, nonzeros = pre.stats['rows'], pre.stats['columns'], pre.stats['nonzeros']
+    print("rows %d -> %d, columns %d -> %d, nonzeros %d -> %d, LP file %.2f -> %.2f MB (%d passes)"
+          % (rows + columns + nonzeros + (sizes[0] / 2 ** 20, sizes[1] / 2 ** 20, pre.stats['passes'])))
+    print("  " + ", ".join("%s %d" % (k, pre.stats[k]) for k in _reductions))
+    print("opt.solve(instance):            %.2f s" % t_plain)
+    print("opt.solve(pre.model):           %.2f s  (LP file, glpsol, solution file)" % t_solver)
+    print("  + presolve %.2f s (standard form compiler, reductions, reduced model), postsolve %.2f s"
+          % (t_presolve, t_postsolve))
+    print("same objective: %s (%.6g, %.6g)" % (abs(pyo.value(plain.obj) - pyo.value(reduced.obj)) < 1e-6,
+                                              pyo.value(plain.obj), pyo.value(reduced.obj)))
+    print("duals of %d / %d constraints" % (len(reduced.dual), len(plain.dual)))
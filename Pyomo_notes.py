@@ -8,6 +8,8 @@
 # Explanation here: https://pyomo.readthedocs.io/en/stable/pyomo_overview/simple_examples.html
 
 import pyomo.environ as pyo         # Import the Pyomo library
+# (import pyomo.environ loads every solver and plugin of Pyomo. For short scripts "import LazyPyomo as pyo" gives the same
+# names but registers a solver / transformation only when it is asked for; ImportBudget.py measures the startup time)
 
 model = pyo.AbstractModel()         # Defining "model"as an Abstract model
 
@@ -36,6 +38,9 @@ def ax_constraint_rule(m, i):                           # Defining the constrain
 
 # the next line creates one constraint for each member of the set model.I
 model.AxbConstraint = pyo.Constraint(model.I, rule=ax_constraint_rule)  # Defining the constraints as the function ax_constraint_rule defined above
+# NOTE: the rule above loops over all of J for every row, so it costs |I|*|J| even if a is mostly zeros. With a sparse a
+# (default=0 and only the nonzeros in the .dat) use SparseRows.py, as abstract1.py does: the rows of a are grouped
+# once and every row only goes through its own nonzeros:    return sparse_sum(m.a, m.x, i) >= m.b[i]
 
 # To define the parameters of the model, we need to create a data file (data.dat) with the following format:
 #param m := 1 ;
@@ -52,8 +57,14 @@ model.AxbConstraint = pyo.Constraint(model.I, rule=ax_constraint_rule)  # Defini
 
 # then the model is run by typing the following command in the terminal:
 # pyomo solve --solver=glpk AbsModel.py Data.dat
+# NOTE: every pyomo solve starts python and imports pyomo and the model file again. For many small runs, keep them
+# warm with SolveDaemon.py (same options, same output, same results.yml):
+#   python SolveDaemon.py serve --preload AbsModel.py      once, then:   python SolveDaemon.py solve --solver=glpk AbsModel.py Data.dat
 
 # IN THE RESULTS: Number in [] represent the time the model required for each step
+# NOTE: the same times (plus CPU time and peak memory of every component and of every solve phase) can be recorded
+# from python and saved as JSON or as a Chrome trace with Instrumentation.py:
+#   with Instrumentation() as ins: instance = model.create_instance(data); opt.solve(instance)
 
 # ----------------------------------------------------------------------------------------------------------------
 
@@ -80,6 +91,10 @@ model.J = model.A & model.D # intersection
 model.K = model.A - model.D # difference
 model.L = model.A ^ model.D # exclusive-or
 model.M = model.A * model.D # cross-product
+# NOTE: len(), at() and ord() of a union / intersection / difference go through all the members at every call.
+# LazySets.py keeps these expressions as views (O(1) membership, positions found once, arithmetic products of
+# RangeSets) and only copies the members on request:
+#          -> M = view(model.A) * view(model.D);  model.x = pyo.Var(M.set());  model.M = M.materialize()
 
 # Pyomo provies some prefedined sets. Useful are:
 # model.A = pyo.PositiveReals     # Valid also negative
@@ -164,6 +179,9 @@ model.c = pyo.ConstraintList()      # Empty constraint list and then add the con
 # f_rule=f(model,i,i,...,x),[],{}   An object that returns a numeric value that is the range value corresponding to each piecewise domain point
 
 # warn_tol = <float>    A tolerance used to check for errors in the piecewise linear function definition. Default is 1e-6 (i.e. 6.4)
+# NOTE: pyo.Piecewise spells it warning_tol. For many indices / breakpoints PiecewiseArrays.py builds all the functions
+# from arrays (checks done with numpy, 'SOS2' or 'LOG' with log2(n) binaries):
+#          -> model.f = build_piecewise(model.x, model.y, points, values, pw_repn='LOG')
 
 # ESPRESSION OBJECTS: similar to the Param component but the underlying values can be numeric constants or Pyomo extressions:
 
@@ -183,6 +201,8 @@ e1 = model.x + 5
 # create another Pyomo expression
 # e1 is copied when generating e2
 e2 = e1 + model.x
+# NOTE: for sums with many terms (cuts, big rows) LinearBuilder.py collects coefficients and variables in buffers
+# and creates the expression once:  b = LinearBuilder(); b += model.x; b.add_term(2.0, y); con = b.freeze() >= 1
 
 # ----------------------------------------------------------------------------------------------------------------
 
@@ -194,6 +214,11 @@ e2 = e1 + model.x
 opt = pyo.SolverFactory('glpk')     # Selecting the solver (glpk) - GLPK (GNU Linear Programming Kit) is a free, open source software library written in C  
 opt.solve(model)                    # Solving the model with the selected solver 
 
+# For tiny models most of the glpk time is spent writing files and starting glpsol. NumpySolver.py registers an in-process
+# solver (NumPy simplex + branch and bound, only for SMALL models), also handy where glpk is not installed:
+# import NumpySolver
+# opt = pyo.SolverFactory('numpy')
+
 # For ABSTRACT models use the following code lines:
 
 instance = model.create_instance()  # Creating an instance of the model, "intance"means "model with data attached to it (parameters, variables, constraints)"
@@ -201,7 +226,16 @@ instance = model.create_instance()  # Creating an instance of the model, "intanc
 opt = pyo.SolverFactory('glpk')  
 opt.solve(instance)                 # Solving the model with the selected solver
 instance.display()                  # Displaying the results
+# NOTE: display() and pprint() print every index of every component. For big instances InstanceDump.py writes them
+# row by row with at most max_rows rows per component and a summary line (counts, nonzeros, value ranges, violated
+# rows), and dumps a whole instance to numpy columns that are read back lazily:
+#          -> display(instance, max_rows=5);  pprint(instance, ostream=f);  dump(instance, 'inst.dump');  load('inst.dump')
 # in the terminal use: pyomo solve --solver=glpk AbsModel.py Data.dat
+# NOTE: when the same instance is solved again and again (same model and same .dat), SolveCache.py keeps the
+# solutions on disk:  opt = SolveCache().wrap(pyo.SolverFactory('glpk'));  opt.solve(instance)  loads them back
+# NOTE: opt.solve() waits for glpsol to end. To run many independent solves from one process (a service, asyncio)
+# AsyncSolver.py runs the solver executables as asyncio subprocesses with a concurrency limit and timeouts:
+#          -> results = await AsyncSolver('glpk', limit=8, timeout=60).solve_async(instance)
 
 # the models we define can be changed and re-solved without having to re-instantiate the model. It is sufficient to change parameters, constraints, or variables.
 # for abstact models, it is needed to change the instance and re-solve instance before re-solving the model
@@ -212,11 +246,26 @@ instance.display()                  # Displaying the results
 #                       or alternatively        instance.x.value = 1
 #                                               instance.x.fixed = True
 # unfix them:                                   instance.x[2].unfix()
+# NOTE: fixed variables leave rows with one variable or none, and rows repeated or always satisfied. Presolve.py
+# removes them (and fixes columns with lb == ub) before the LP file is written, then maps values and duals back:
+#          -> results = solve(pyo.SolverFactory('glpk'), instance);  or  opt = wrap(opt);  opt.solve(instance)
 #
 # Extend OBJ FCN:                               model.obj.expr += 10 * model.y    
 #
 # Activate/disactivate BOJ FCN:                 model.obj.deactivate()
 
+# PERSISTENT SOLVERS: SolverFactory('glpk') rewrites the whole model to a file and restarts glpsol at every solve.
+# A persistent solver keeps the model loaded in memory and only receives the changes (see PersistentIterativeModels.py):
+# from pyomo.contrib import appsi
+# opt = appsi.solvers.Highs()                   the model is loaded once
+# opt.set_instance(instance)
+# con = instance.c.add(expr >= 1)
+# opt.add_constraints([con])                    only the new row is sent, the next solve starts from the previous basis
+# opt.solve(instance)
+# NOTE: ChangeTracker.py records fix / unfix / bounds / (de)activate / new expressions while the model is edited, and
+# sends only those changes: to the persistent solver (PersistentSync) or to a cached LP file (PatchedLP, any solver):
+#          -> sync = PersistentSync(instance);  instance.x[2].fix(1);  sync.solve()
+
 # ----------------------------------------------------------------------------------------------------------------
 
 # ACCESSING STUFF: https://pyomo.readthedocs.io/en/stable/working_models.html
@@ -232,6 +281,12 @@ instance.display()                  # Displaying the results
 # SOLUTION STATUS
 # OBJECTIVE VALUE
 # SOLVER TIME
+# NOTE: all of these at once, as numpy arrays aligned with the index of each component (no per-variable loop),
+# with SolutionArrays.py:  sol = solve(opt, instance);  sol.value['x'], sol.dual['con'], sol.slack['con'],
+# sol.status, sol.objective, sol.time, sol.frame('x') (pandas DataFrame)
+# NOTE: for glpk, ResultsArchive.py reads the solution files of glpsol directly into those arrays (no SolverResults,
+# no results.yml) and keeps the results of many runs in one append-only archive that is queried by column:
+#          -> sol = solve_native(opt, instance);  archive.append(sol, tags={...});  archive.values('x', archive.select(...))
 
 # DISPLAY OF SOLVER OUTPUT: results = opt.solve(instance, tee=True)
 
@@ -274,6 +329,9 @@ data = {None: {
     'r': {(1,1): 110, (1,2): 120, (2,3): 230},  # r is a 2D matrix that looks like this: [ 110 120 0 , 0 0 230 , 0 0 0]
 }}
 i = m.create_instance(data)
+# NOTE: a Param keeps every given r_ij in a dict (more than 150 bytes per entry). For large default=0 tables
+# ArrayParam.py stores them in numpy arrays (16 bytes per entry, same r[i, j] and same default):
+#          -> m.r = ArrayParam(m.I, m.I, default=0)     or     ArrayParam(m.I, m.I, default=0, values=(rows, cols, data))
 i.pprint()
 print("\n\n")
 
@@ -339,6 +397,13 @@ print("\n\n")
 #      CSV File: A text file format that uses comma or other delimiters to separate columns of values in each row of a table.
 #      XML File: An extensible markup language for documents and data structures. XML files can represent tabular data in a hierarchical format.
 #      XLS File: A spreadsheet data format that is primarily used by the Microsoft Excel application
+# NOTE: for tables with millions of rows StreamLoader.py reads the file in chunks (numpy columns) and fills the Set and
+# the Param while reading, with a memory limit and a progress line:
+#          -> instance = model.create_instance(StreamPortal(model).load('Y.tab', param='Y', index='A').data())
+
+# COMPILED .dat FILES: big .dat files take longer to parse than to solve. DatCache.py parses the file once and keeps a binary
+# copy (typed numpy arrays) in <file>.dat.cache/, rebuilt only when the file or its includes change:
+#          -> instance = model.create_instance(load_dat('abstract1.dat', model))
 
 # INCLUDE: executes the commands in a file. The file is read and interpreted as if the commands were typed directly into the data file.
 #          -> include file.dat
@@ -353,6 +418,9 @@ print("\n\n")
 # {
 #    set C := 7 8 9 ;
 #}
+# NOTE: create_instance(file, namespace=...) parses the whole file for every namespace. With many scenarios in one file
+# ScenarioNamespaces.py parses it once and the instances share the Sets/Params that their namespace does not change:
+#          -> for ns, instance in NamespaceScenarios(model, 'scenarios.dat').instances(): ...
 
 # DATA PORTAL: It is a class that can be used to load data into a model. 
 
@@ -391,6 +459,9 @@ print("new model.x value = " ,pyo.value(scaled_model.scaled_x))
 print(pyo.value(scaled_model.scaled_x.lb))
 print(pyo.value(model.obj))
 print(pyo.value(scaled_model.scaled_obj))
+# NOTE: for big models the factors can be computed automatically from the coefficient matrix (geometric mean or
+# equilibration, with numpy) with AutoScaling.py:  scaling = auto_scale(model)  fills model.scaling_factor, and
+# unscale(scaled_model, model, scaling) brings the solution (and the duals) back to the original model.
 
 # cool video
 # https://www.youtube.com/watch?v=QbYd3DOf-T4
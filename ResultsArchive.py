@@ -0,0 +1,614 @@
+# Solutions read straight from the files of glpsol, and an append-only archive of the results of many runs.
+#
+# After opt.solve(instance) the GLPK plugin reads the solution file of glpsol line by line into a SolverResults
+# (one dict per variable), pyomo solve writes that again as results.yml (a few YAML lines per variable), and the
+# scripts that compare runs parse the YAML back. For big models each of these steps takes longer than glpsol, and
+# one results.yml per run fills the disk. Here:
+#
+#   sol = solve_native(pyo.SolverFactory('glpk'), instance)
+#       writes the problem and runs glpsol as opt.solve does, then reads the --write and --wglp files of glpsol in
+#       blocks of lines (each block is converted by numpy at once) into the arrays of a SolutionArrays.Solution:
+#       sol.value['x'], sol.rc['x'], sol.dual['con'], sol.objective, sol.termination, ... no SolverResults at all.
+#       The model is not loaded: sol.load(instance) does it
+#   raw = read_glpk('problem.glp', 'solution.raw')     the two files alone: labels in file order and arrays
+#
+#   archive = ResultsArchive('runs.archive')            created on first use
+#   archive.append(sol, solver='glpk', model='abstract1', tags={'scenario': 's12'})      any Solution, also the
+#                                                        ones of SolutionArrays.solve / extract (other solvers)
+#   len(archive)                                        number of runs
+#   archive.runs()                                      {column: array} with one entry per run: run, stamp,
+#                                                       model, solver, status, termination, objective,
+#                                                       lower_bound, upper_bound, gap, time, variables, constraints
+#   archive.select(termination='optimal', where=lambda r: r['objective'] < 100)        run numbers
+#   archive.values('x', runs)                           values of x in those runs, one row per run
+#                                                       (a list of arrays if the index of x changed between them)
+#   archive.values('x', runs, key=3)                    x[3] in those runs
+#   archive.keys('x'), archive.tags(runs)               the index of x, the tags of the runs
+#
+# The archive is a directory of append-only binary columns (raw float64 / int64 arrays, opened with np.memmap), so a
+# query reads only the columns and the runs it asks for. Strings (model, solver, status, termination) are stored as
+# codes. The values of a component are one row per run in values/<name>/value.f8, and its index keys are stored
+# once per distinct index. fields=('value', 'rc', 'dual') also keeps reduced costs and duals.
+# An append takes a lock file (processes of a ScenarioRunner.py pool can share one archive). A run is visible when
+# its entry in runs/run.i8 is written (that is the last write of an append); what an interrupted append left is
+# cut off by the next one.
+
+import fcntl
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+import pyomo.environ as pyo
+from pyomo.common.collections import Bunch
+from pyomo.common.dependencies import pandas as pd, pandas_available
+from pyomo.common.errors import ApplicationError
+from pyomo.common.tempfiles import TempfileManager
+from pyomo.opt import SolverStatus, TerminationCondition
+
+from SolutionArrays import Solution, _fill_fixed, _slacks, layout
+
+ARCHIVE_VERSION = 1
+BLOCK = 1 << 22          # bytes of lines read and converted at a time
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# glpsol files
+
+class NativeSolution(object):
+    """The content of the --wglp (names) and --write (solution) files of glpsol, in the order of the files."""
+
+    def __init__(self):
+        self.kind = None            # 'bas' (simplex), 'ipt' (interior point) or 'mip'
+        self.status = None          # the status letters of the 's' line (primal, dual for 'bas')
+        self.objective = None
+        self.sense = None
+        self.objective_name = 'objective'
+        self.row_names, self.col_names = [], []
+        self.row_value = self.row_dual = self.col_value = self.col_dual = None
+        self.row_status = self.col_status = None      # 'b', 'l', 'u', 'f', 's' of a basic solution
+
+    def __repr__(self):
+        return "NativeSolution(%s %s, %d rows, %d columns, objective=%s)" % (
+            self.kind, ''.join(self.status or ()), len(self.row_names), len(self.col_names), self.objective)
+
+
+def _names(filename, native):
+    # the 'n i <row> <name>' and 'n j <col> <name>' lines of the --wglp file (the matrix lines are skipped)
+    with open(filename) as f:
+        header = f.readline().split()
+        if header[0] != 'p' or header[1] not in ('lp', 'mip') or header[2] not in ('min', 'max'):
+            raise ValueError("%s: not a GLPK problem file" % filename)
+        native.sense = pyo.minimize if header[2] == 'min' else pyo.maximize
+        rows, cols = [None] * int(header[3]), [None] * int(header[4])
+        while True:
+            lines = f.readlines(BLOCK)
+            if not lines:
+                break
+            named = [line for line in lines if line[0] == 'n']
+            tokens = ''.join(line for line in named if line[2] in 'ij').split()
+            for kind, position, name in zip(tokens[1::4], tokens[2::4], tokens[3::4]):
+                (rows if kind == 'i' else cols)[int(position) - 1] = name
+            for line in named:
+                if line[2] == 'z':
+                    native.objective_name = line.split()[2]
+    native.row_names, native.col_names = rows, cols
+
+
+def _fill(lines, width, columns):
+    # lines of the same kind and width -> columns[k][position] for every token k (k = 2, 3, ...)
+    tokens = ''.join(lines).split()
+    positions = np.array(tokens[1::width], dtype=np.int64) - 1
+    for k, target in columns.items():
+        target[positions] = np.array(tokens[k::width], dtype=target.dtype)
+
+
+def _values(filename, native):
+    # the --write file: c (comments), s (status line), i (rows), j (columns), e (end)
+    with open(filename) as f:
+        line = f.readline()
+        while line.startswith('c'):
+            line = f.readline()
+        header = line.split()
+        if header[0] != 's':
+            raise ValueError("%s: expecting the 's' line of a GLPK solution file" % filename)
+        native.kind, rows, cols = header[1], int(header[2]), int(header[3])
+        if native.kind == 'bas':
+            native.status, native.objective = (header[4], header[5]), float(header[6])
+            width = 5
+        else:
+            native.status, native.objective = (header[4],), float(header[5])
+            width = 3 if native.kind == 'mip' else 4
+        native.row_value, native.col_value = np.full(rows, np.nan), np.full(cols, np.nan)
+        native.row_dual, native.col_dual = np.full(rows, np.nan), np.full(cols, np.nan)
+        if native.kind == 'bas':
+            native.row_status, native.col_status = np.full(rows, '', dtype='<U1'), np.full(cols, '', dtype='<U1')
+            rows_columns = {2: native.row_status, 3: native.row_value, 4: native.row_dual}
+            cols_columns = {2: native.col_status, 3: native.col_value, 4: native.col_dual}
+        elif native.kind == 'ipt':
+            rows_columns = {2: native.row_value, 3: native.row_dual}
+            cols_columns = {2: native.col_value, 3: native.col_dual}
+        else:
+            rows_columns, cols_columns = {2: native.row_value}, {2: native.col_value}
+        while True:
+            lines = f.readlines(BLOCK)
+            if not lines:
+                break
+            _fill([line for line in lines if line[0] == 'i'], width, rows_columns)
+            _fill([line for line in lines if line[0] == 'j'], width, cols_columns)
+
+
+def read_glpk(problem_file, solution_file):
+    """NativeSolution of the --wglp and --write files of one glpsol run."""
+    native = NativeSolution()
+    _names(problem_file, native)
+    _values(solution_file, native)
+    return native
+
+
+def _termination(native):
+    # (termination condition, is there a solution): the same rules as the GLPK plugin of Pyomo
+    if native.kind == 'mip':
+        status = native.status[0]
+        if status == 'n':
+            return TerminationCondition.infeasible, False
+        if status in 'fo':
+            if abs(native.objective) > 1e18:
+                return TerminationCondition.unbounded, False
+            return (TerminationCondition.optimal if status == 'o' else TerminationCondition.feasible), True
+        return TerminationCondition.other, False
+    primal, dual = native.status[0], native.status[-1]
+    if native.kind == 'bas' and (dual == 'n' or primal == 'n'):
+        return TerminationCondition.unbounded, False
+    if primal == 'i':
+        return TerminationCondition.infeasible, False
+    if primal == 'f' or (native.kind == 'ipt' and primal == 'o'):
+        return TerminationCondition.optimal, True
+    return TerminationCondition.other, False
+
+
+def _place(labels, values, symbols, index, where, ranged=False):
+    # values in file order -> {component name: array in index order}; for a ranged row (r_l_ / r_u_ rows of the
+    # LP file) the dual with the largest magnitude is kept, as the GLPK plugin does
+    arrays = {name: np.full(len(keys), np.nan) for name, keys in index.items()}
+    passes = ([], [])       # the r_u_ rows go in the second pass, over the r_l_ row of the same constraint
+    for row, label in enumerate(labels):
+        upper = ranged and label.startswith('r_u_')
+        if upper:
+            label = 'r_l_' + label[4:]
+        target = where.get(id(symbols.get(label)))
+        if target is not None:
+            passes[upper].append((target[0], target[1], row))
+    for entries in passes:
+        if not entries:
+            continue
+        names, positions, rows = zip(*entries)
+        names, positions, rows = np.array(names, dtype=object), np.array(positions), np.array(rows)
+        for name in set(names.tolist()):
+            mask = names == name
+            target = arrays[name]
+            new = values[rows[mask]]
+            old = target[positions[mask]]
+            target[positions[mask]] = np.where(np.isnan(old) | (np.abs(new) > np.abs(old)), new, old)
+    return arrays
+
+
+def native_solution(native, instance, symbols, elapsed=None, slacks=False):
+    """SolutionArrays.Solution of a NativeSolution (symbols: LP label -> component data of the solve)."""
+    termination, found = _termination(native)
+    sol = Solution(SolverStatus.ok, termination, native.objective if found else None, elapsed)
+    if found and termination == TerminationCondition.optimal:
+        sol.lower_bound = sol.upper_bound = native.objective
+        sol.gap = 0.0
+    var_index, var_where = layout(instance, pyo.Var)
+    con_index, con_where = layout(instance, pyo.Constraint)
+    sol.index.update(var_index)
+    sol.index.update(con_index)
+    if not found:
+        for name, keys in var_index.items():
+            sol.value[name] = sol.rc[name] = np.full(len(keys), np.nan)
+        for name, keys in con_index.items():
+            sol.dual[name] = sol.slack[name] = np.full(len(keys), np.nan)
+        return sol
+    sol.value = _place(native.col_names, native.col_value, symbols, var_index, var_where)
+    _fill_fixed(instance, sol.value, var_where)     # not in the LP file, so not in the solution of glpsol
+    sol.rc = _place(native.col_names, native.col_dual, symbols, var_index, var_where)
+    sol.dual = _place(native.row_names, native.row_dual, symbols, con_index, con_where, ranged=True)
+    if slacks:
+        sol.slack = _slacks(instance, sol.value, con_index)
+    return sol
+
+
+def solve_native(opt, instance, slacks=False, **kwds):
+    """opt.solve(instance) for glpk that reads the files of glpsol into a Solution (the model is not loaded)."""
+    if not hasattr(opt, '_rawfile'):
+        raise ValueError("solve_native reads the files of glpsol (SolverFactory('glpk')), not of %s: "
+                         "use SolutionArrays.solve" % opt.name)
+    opt.available(exception_flag=True)
+    keepfiles = kwds.get('keepfiles', False)
+    saved = opt.options
+    opt.options = Bunch()
+    opt.options.update(saved)
+    opt.options.update(kwds.pop('options', {}))
+    opt._smap_id = None
+    depth = len(TempfileManager._context_stack)
+    try:
+        opt._presolve(instance, **kwds)          # the LP file and the command line (pushes a TempfileManager context)
+        start = time.perf_counter()
+        run = opt._apply_solver()
+        elapsed = time.perf_counter() - start
+        if run.rc:
+            raise ApplicationError("Solver (%s) did not exit normally (return code %s)\n%s"
+                                   % (opt.name, run.rc, run.log[-2000:]))
+        native = read_glpk(opt._glpfile, opt._rawfile)
+        symbols = instance.solutions.symbol_map[opt._smap_id].bySymbol
+        return native_solution(native, instance, symbols, elapsed, slacks)
+    finally:
+        if opt._smap_id is not None and opt._smap_id in instance.solutions.symbol_map:
+            instance.solutions.delete_symbol_map(opt._smap_id)
+        while len(TempfileManager._context_stack) > depth:
+            TempfileManager.pop(remove=not keepfiles)
+        opt.options = saved
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# archive
+
+# the columns of runs/, in the order they are written: 'run' is last, it makes the run visible
+_RUN_COLUMNS = (('stamp', 'f8'), ('model', 'i4'), ('solver', 'i4'), ('status', 'i4'), ('termination', 'i4'),
+                ('objective', 'f8'), ('lower_bound', 'f8'), ('upper_bound', 'f8'), ('gap', 'f8'), ('time', 'f8'),
+                ('variables', 'i8'), ('constraints', 'i8'), ('tags_end', 'i8'), ('run', 'i8'))
+_CODED = ('model', 'solver', 'status', 'termination')
+_VAR_FIELDS, _CON_FIELDS = ('value', 'rc'), ('dual', 'slack')
+
+
+def _append(path, array):
+    with open(path, 'ab') as f:
+        f.write(np.ascontiguousarray(array).tobytes())
+
+
+def _float(value):
+    return float(value) if isinstance(value, (int, float)) else np.nan
+
+
+class ResultsArchive(object):
+
+    def __init__(self, directory, fields=('value',)):
+        self.directory = directory
+        meta = os.path.join(directory, 'archive.json')
+        if os.path.exists(meta):
+            with open(meta) as f:
+                info = json.load(f)
+            if info['version'] != ARCHIVE_VERSION:
+                raise ValueError("%s: archive version %s, expected %s"
+                                 % (directory, info['version'], ARCHIVE_VERSION))
+            self.fields = tuple(info['fields'])
+        else:
+            unknown = set(fields) - set(_VAR_FIELDS + _CON_FIELDS)
+            if unknown:
+                raise ValueError("Unknown fields %s (choose from %s)" % (sorted(unknown), _VAR_FIELDS + _CON_FIELDS))
+            os.makedirs(os.path.join(directory, 'runs'), exist_ok=True)
+            os.makedirs(os.path.join(directory, 'values'), exist_ok=True)
+            self.fields = tuple(fields)
+            with open(meta, 'w') as f:
+                json.dump({'version': ARCHIVE_VERSION, 'fields': self.fields}, f)
+        self._codes = None
+        self._layouts = {}       # component -> {layout hash: layout number}
+
+    # ---- files
+
+    def _run_file(self, column):
+        return os.path.join(self.directory, 'runs', '%s.%s' % (column, dict(_RUN_COLUMNS)[column]))
+
+    def _component_dir(self, name):
+        return os.path.join(self.directory, 'values', name)
+
+    def _read_codes(self):
+        path = os.path.join(self.directory, 'runs', 'codes.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                return json.load(f)
+        return {column: [] for column in _CODED}
+
+    @property
+    def codes(self):
+        if self._codes is None:
+            self._codes = self._read_codes()
+        return self._codes
+
+    def __len__(self):
+        path = self._run_file('run')
+        return os.path.getsize(path) // 8 if os.path.exists(path) else 0
+
+    def _column(self, column, n=None):
+        n = len(self) if n is None else n
+        dtype = np.dtype(dict(_RUN_COLUMNS)[column])
+        if n == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._run_file(column), dtype=dtype, mode='r', shape=(n,))
+
+    def _rows(self, name):
+        # (run, offset, length, layout) of every run that stored the component
+        path = os.path.join(self._component_dir(name), 'rows.i8')
+        size = os.path.getsize(path) // 32 if os.path.exists(path) else 0
+        if size == 0:
+            return np.zeros((0, 4), dtype=np.int64)
+        return np.memmap(path, dtype=np.int64, mode='r', shape=(size, 4))
+
+    # ---- writing
+
+    def _repair(self, n):
+        # cut what an interrupted append wrote after the last visible run
+        for column, dtype in _RUN_COLUMNS:
+            path = self._run_file(column)
+            if os.path.exists(path) and os.path.getsize(path) > n * np.dtype(dtype).itemsize:
+                os.truncate(path, n * np.dtype(dtype).itemsize)
+        tags = os.path.join(self.directory, 'runs', 'tags.json')
+        if os.path.exists(tags):
+            os.truncate(tags, int(self._column('tags_end', n)[-1]) if n else 0)
+        for name in os.listdir(os.path.join(self.directory, 'values')):
+            rows = self._rows(name)
+            keep = int(np.searchsorted(rows[:, 0], n)) if len(rows) else 0
+            end = int(rows[keep - 1, 1] + rows[keep - 1, 2]) if keep else 0
+            if keep < len(rows):
+                os.truncate(os.path.join(self._component_dir(name), 'rows.i8'), keep * 32)
+            for field in self.fields:
+                path = os.path.join(self._component_dir(name), field + '.f8')
+                if os.path.exists(path) and os.path.getsize(path) > end * 8:
+                    os.truncate(path, end * 8)
+
+    def _layout(self, name, keys):
+        # number of the index (list of keys) of a component, stored once as layout<k>.json
+        directory = self._component_dir(name)
+        digest = hashlib.sha1(repr(keys).encode()).hexdigest()
+        known = self._layouts.get(name)
+        if known is None:
+            path = os.path.join(directory, 'layouts.json')
+            known = {}
+            if os.path.exists(path):
+                with open(path) as f:
+                    known = {h: k for k, h in enumerate(json.load(f))}
+            self._layouts[name] = known
+        if digest not in known:
+            known[digest] = len(known)
+            with open(os.path.join(directory, 'layout%d.json' % known[digest]), 'w') as f:
+                json.dump([list(key) if isinstance(key, tuple) else key for key in keys], f)
+            with open(os.path.join(directory, 'layouts.json'), 'w') as f:
+                json.dump(sorted(known, key=known.get), f)
+        return known[digest]
+
+    def _code(self, codes, column, value):
+        value = str(value)
+        if value not in codes[column]:
+            codes[column].append(value)
+        return codes[column].index(value)
+
+    def append(self, sol, solver=None, model=None, tags=None):
+        """Store one Solution (SolutionArrays.solve / extract, solve_native) and return its run number."""
+        with open(os.path.join(self.directory, 'lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            run = len(self)
+            self._repair(run)
+            self._layouts = {}
+            codes = self._read_codes()
+            new_codes = {column: list(values) for column, values in codes.items()}
+            for name, keys in sol.index.items():
+                fields = [f for f in self.fields if (f in _VAR_FIELDS) == (name in sol.value)]
+                if not fields:
+                    continue
+                directory = self._component_dir(name)
+                os.makedirs(directory, exist_ok=True)
+                layout_number = self._layout(name, keys)
+                rows = self._rows(name)
+                offset = int(rows[-1, 1] + rows[-1, 2]) if len(rows) else 0
+                for field in fields:
+                    values = getattr(sol, field).get(name)
+                    _append(os.path.join(directory, field + '.f8'),
+                            np.full(len(keys), np.nan) if values is None else np.asarray(values, dtype=np.float64))
+                _append(os.path.join(directory, 'rows.i8'),
+                        np.array([run, offset, len(keys), layout_number], dtype=np.int64))
+            tags_path = os.path.join(self.directory, 'runs', 'tags.json')
+            _append(tags_path, np.frombuffer(json.dumps(tags or {}).encode(), dtype=np.uint8))
+            row = {'stamp': time.time(), 'model': self._code(new_codes, 'model', model),
+                   'solver': self._code(new_codes, 'solver', solver),
+                   'status': self._code(new_codes, 'status', sol.status),
+                   'termination': self._code(new_codes, 'termination', sol.termination),
+                   'objective': _float(sol.objective), 'lower_bound': _float(sol.lower_bound),
+                   'upper_bound': _float(sol.upper_bound), 'gap': _float(sol.gap), 'time': _float(sol.time),
+                   'variables': sum(len(v) for v in sol.value.values()),
+                   'constraints': sum(len(sol.index[name]) for name in sol.index if name not in sol.value),
+                   'tags_end': os.path.getsize(tags_path), 'run': run}
+            if new_codes != codes:
+                path = os.path.join(self.directory, 'runs', 'codes.json')
+                with open(path + '.tmp', 'w') as f:
+                    json.dump(new_codes, f)
+                os.replace(path + '.tmp', path)
+            for column, dtype in _RUN_COLUMNS:
+                _append(self._run_file(column), np.array([row[column]], dtype=dtype))
+            self._codes = new_codes
+        return run
+
+    # ---- queries
+
+    def runs(self, columns=None):
+        """{column: array} of all the runs (strings for model, solver, status, termination)."""
+        n = len(self)
+        result = {}
+        for column in columns or [c for c, _ in _RUN_COLUMNS if c != 'tags_end']:
+            values = self._column(column, n)
+            if column in _CODED:
+                self._codes = None
+                values = np.array(self.codes[column] + [None], dtype=object)[np.asarray(values)]
+            result[column] = values
+        return result
+
+    def frame(self):
+        if not pandas_available:
+            raise ImportError("ResultsArchive.frame() needs pandas (the columns are in .runs())")
+        return pd.DataFrame(self.runs()).set_index('run')
+
+    def select(self, where=None, **equal):
+        """Numbers of the runs with the given column values (and where(runs) True, runs: the dict of runs())."""
+        n = len(self)
+        mask = np.ones(n, dtype=bool)
+        for column, value in equal.items():
+            if column in _CODED:
+                self._codes = None
+                value = str(value)
+                if value not in self.codes[column]:
+                    return np.zeros(0, dtype=np.int64)
+                mask &= self._column(column, n) == self.codes[column].index(value)
+            else:
+                mask &= self._column(column, n) == value
+        if where is not None:
+            mask &= np.asarray(where(self.runs()), dtype=bool)
+        return np.flatnonzero(mask)
+
+    def _layout_keys(self, name, number):
+        with open(os.path.join(self._component_dir(name), 'layout%d.json' % number)) as f:
+            return [tuple(key) if isinstance(key, list) else key for key in json.load(f)]
+
+    def keys(self, name, run=None):
+        """The index of a component in a run (the last run that stored it by default)."""
+        rows = self._rows(name)
+        row = rows[-1] if run is None else rows[self._positions(name, rows, [run])[0]]
+        return self._layout_keys(name, int(row[3]))
+
+    def _positions(self, name, rows, runs):
+        positions = np.searchsorted(rows[:, 0], runs)
+        bad = (positions >= len(rows)) | (rows[np.minimum(positions, len(rows) - 1), 0] != runs)
+        if len(rows) == 0 or bad.any():
+            raise KeyError("%s is not stored for the runs %s" % (name, np.asarray(runs)[bad].tolist()))
+        return positions
+
+    def values(self, name, runs=None, key=None, field='value'):
+        """Values of a component in the given runs: a (runs x index) array when the runs share one index (else a
+        list of arrays, one per run, see keys(name, run)), or one value per run with key."""
+        if field not in self.fields:
+            raise ValueError("The archive does not keep '%s' (fields: %s)" % (field, self.fields))
+        rows = self._rows(name)
+        n = len(self)
+        rows = rows[:int(np.searchsorted(rows[:, 0], n))] if len(rows) else rows
+        positions = np.arange(len(rows)) if runs is None else self._positions(name, rows, np.asarray(runs))
+        selected = np.asarray(rows[positions])
+        path = os.path.join(self._component_dir(name), field + '.f8')
+        total = int(selected[:, 1].max() + selected[:, 2].max()) if len(selected) else 0
+        data = np.memmap(path, dtype=np.float64, mode='r') if total else np.zeros(0)
+        if key is not None:
+            result = np.full(len(selected), np.nan)
+            for number in np.unique(selected[:, 3]).tolist():
+                keys = self._layout_keys(name, number)
+                position = keys.index(key) if key in keys else None
+                mask = selected[:, 3] == number
+                if position is not None:
+                    result[mask] = data[selected[mask, 1] + position]
+            return result
+        if len(selected) and (selected[:, 3] == selected[0, 3]).all():
+            # one index for all the runs: one matrix (same layout, so same length)
+            return data[selected[:, 1][:, None] + np.arange(selected[0, 2])]
+        return [np.array(data[offset:offset + length]) for offset, length in selected[:, 1:3].tolist()]
+
+    def tags(self, runs=None):
+        runs = np.arange(len(self)) if runs is None else np.asarray(runs)
+        ends = self._column('tags_end')
+        with open(os.path.join(self.directory, 'runs', 'tags.json'), 'rb') as f:
+            result = []
+            for run in runs.tolist():
+                start = int(ends[run - 1]) if run else 0
+                f.seek(start)
+                result.append(json.loads(f.read(int(ends[run]) - start)))
+        return result
+
+
+if __name__ == '__main__':
+    # python ResultsArchive.py [variables] [runs]
+    # an LP solved `runs` times with different right-hand sides: opt.solve + results.yml (written and parsed back)
+    # against solve_native + the archive, then queries across the runs
+    import shutil
+    import sys
+    import tempfile
+
+    import yaml
+    from pyomo.opt import SolverResults
+
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    m = n // 2
+    model = pyo.ConcreteModel()
+    model.I = pyo.RangeSet(0, n - 1)
+    model.R = pyo.RangeSet(0, m - 1)
+    model.b = pyo.Param(model.R, mutable=True, initialize=1)
+    model.x = pyo.Var(model.I, domain=pyo.NonNegativeReals)
+    model.obj = pyo.Objective(expr=pyo.quicksum((1 + i % 7) * model.x[i] for i in model.I))
+    model.con = pyo.Constraint(model.R, rule=lambda mm, r: mm.x[r] + 2 * mm.x[r + m] >= mm.b[r])
+    opt = pyo.SolverFactory('glpk')
+    tmp = tempfile.mkdtemp()
+
+    def scenario(k):
+        for r, v in enumerate(np.random.default_rng(k).integers(1, 10, m).tolist()):
+            model.b[r] = v
+
+    # pyomo solve: opt.solve, results.yml written, and parsed back by the script that compares the runs
+    timing = dict.fromkeys(('solve', 'write', 'parse', 'native', 'append'), 0.0)
+    yml_size = 0
+    objectives = []
+    for k in range(runs):
+        scenario(k)
+        start = time.perf_counter()
+        results = opt.solve(model)
+        model.solutions.store_to(results)
+        timing['solve'] += time.perf_counter() - start
+        start = time.perf_counter()
+        name = os.path.join(tmp, 'results%d.yml' % k)
+        results.write(filename=name)
+        timing['write'] += time.perf_counter() - start
+        start = time.perf_counter()
+        with open(name) as f:
+            document = yaml.load(f, Loader=yaml.CSafeLoader)
+        timing['parse'] += time.perf_counter() - start
+        yml_size += os.path.getsize(name)
+        objectives.append(document['Solution'][1]['Objective']['obj']['Value'])
+
+    archive = ResultsArchive(os.path.join(tmp, 'runs.archive'))
+    for k in range(runs):
+        scenario(k)
+        start = time.perf_counter()
+        sol = solve_native(opt, model)
+        timing['native'] += time.perf_counter() - start
+        start = time.perf_counter()
+        archive.append(sol, solver='glpk', model='benchmark', tags={'scenario': k})
+        timing['append'] += time.perf_counter() - start
+    archive_size = sum(os.path.getsize(os.path.join(root, f))
+                       for root, _, files in os.walk(archive.directory) for f in files)
+
+    # the files of one glpsol run, read by the GLPK plugin and by read_glpk
+    TempfileManager.push()
+    opt._presolve(model)
+    opt._apply_solver()
+    start = time.perf_counter()
+    opt.process_soln_file(SolverResults())
+    plugin = time.perf_counter() - start
+    start = time.perf_counter()
+    native = read_glpk(opt._glpfile, opt._rawfile)
+    streamed = time.perf_counter() - start
+    TempfileManager.pop(remove=True)
+
+    print("%d variables, %d constraints, %d runs" % (n, m, runs))
+    print("glpsol files -> python: GLPK plugin %.3f s, read_glpk %.3f s" % (plugin, streamed))
+    print("opt.solve + store_to:        %7.2f s per run" % (timing['solve'] / runs))
+    print("  results.yml write / parse: %7.2f s / %.2f s per run, %.1f MB per run"
+          % (timing['write'] / runs, timing['parse'] / runs, yml_size / runs / 2 ** 20))
+    print("solve_native:                %7.2f s per run" % (timing['native'] / runs))
+    print("  archive.append:            %7.2f s per run, %.1f MB per run"
+          % (timing['append'] / runs, archive_size / runs / 2 ** 20))
+    print("same objectives:", np.allclose(archive.runs()['objective'], objectives))
+
+    start = time.perf_counter()
+    best = archive.select(termination='optimal', where=lambda r: r['objective'] <= np.median(r['objective']))
+    x7 = archive.values('x', best, key=7)
+    block = archive.values('x', best)
+    print("query (runs, x[7] and all of x in %d runs): %.1f ms" % (len(best), 1000 * (time.perf_counter() - start)))
+    print("runs", best.tolist(), "tags", archive.tags(best), "x[7]", x7, "x", block.shape)
+    shutil.rmtree(tmp)
@@ -0,0 +1,279 @@
+# Many scenarios in ONE .dat file (the namespace blocks of Pyomo_notes.py), loaded with one parse.
+#
+#   set C := 1 2 3 ;                      base data (the None namespace)
+#   namespace ns1 { set C := 4 5 6 ; }    a scenario: only what changes
+#
+# model.create_instance('file.dat', namespace='ns1') parses the whole file (all the namespaces) for every instance,
+# and every instance holds its own copy of all the data. Here:
+#   - the file is parsed once (or read from the DatCache.py cache with cache=True): a namespace only keeps the data
+#     of the components it overrides, the rest is the data of the base namespace, shared by all of them
+#   - the base instance is built once. The instance of a namespace shares with it the storage of every Set and
+#     immutable Param that the namespace does not change: members and values are not copied (copy-on-write, a Set
+#     or Param gets its own copy the first time it is written). Changed components and the ones that hold the
+#     state of an instance (Var, Constraint, Objective, mutable Param, ...) are built for every instance, from the
+#     parsed data
+#   - a component is "changed" when the namespace gives data for it, when its index set or domain is changed, or
+#     when it has a rule (initialize / filter / validate) and some component declared before it is changed
+#
+# Usage:
+#   scenarios = NamespaceScenarios(model, 'scenarios.dat')
+#   instance = scenarios.create_instance('ns1')      same model as model.create_instance('scenarios.dat', namespace='ns1')
+#   for ns, instance in scenarios.instances():        one instance at a time, in the order of the file
+#       ...
+#   scenarios.changed('ns1')                          names of the components rebuilt for ns1
+#
+# Do not modify scenarios.base: its Sets and Params are the storage of the instances.
+# Namespaces that only change mutable Params do not need an instance each: run_scenarios of ScenarioRunner.py takes
+# (ns, scenarios.data(ns)) pairs and solves them on one warm instance.
+
+import sys
+
+import pyomo.environ as pyo
+from pyomo.core.base.PyomoModel import Model
+from pyomo.core.base.set import FiniteSetData, OrderedSetData
+
+_WRITES = {
+    pyo.Set: ('_update_impl', 'remove', 'discard', 'clear', 'pop'),
+    pyo.Param: ('__setitem__', '__delitem__', '_setitem_when_not_present', 'clear', 'store_values'),
+}
+_shared_classes = {}
+
+
+def _detach(component):
+    # first write to shared storage: the component gets its own copy and its own class back
+    if component.ctype is pyo.Set:
+        component._values = component._values.copy()
+        if isinstance(component, OrderedSetData):
+            component._ordered_values = None
+    else:
+        component._data = dict(component._data)
+    component.__class__ = type(component)._unshared
+
+
+def _writer(name):
+    def method(self, *args, **kwds):
+        _detach(self)
+        return getattr(self, name)(*args, **kwds)
+    method.__name__ = name
+    return method
+
+
+def _shared_class(cls, ctype):
+    # cls with the write methods of ctype behind _detach (same memory layout, so __class__ can be switched)
+    if cls not in _shared_classes:
+        name = '_Shared' + cls.__name__
+        attrs = {method: _writer(method) for method in _WRITES[ctype]}
+        attrs.update(__slots__=(), __module__=__name__, __qualname__=name, _unshared=cls)
+        _shared_classes[cls] = globals()[name] = type(name, (cls,), attrs)
+    return _shared_classes[cls]
+
+
+def _constant(initializer):
+    return initializer is None or initializer.constant()
+
+
+def is_shared(component):
+    """True while the component uses the storage of the base instance."""
+    return type(component) in _shared_classes.values()
+
+
+class NamespaceScenarios(object):
+
+    def __init__(self, model, filename, cache=False):
+        self.model = model
+        if cache:
+            from DatCache import load_dat
+            self.portal = load_dat(filename, model)
+        else:
+            self.portal = pyo.DataPortal(model=model, filename=filename)
+        self.namespaces = [ns for ns in self.portal._data if ns is not None]
+        self._base_data = self.portal._data.get(None, {})
+        self.base = model.create_instance(self.portal)
+
+    def data(self, namespace):
+        # {component name: data} of the components the namespace gives data for
+        if namespace is not None and namespace not in self.portal._data:
+            raise IOError("Cannot access undefined namespace: '%s'" % namespace)
+        return self.portal._data[namespace]
+
+    def _uses(self, component):
+        # names of the model Sets of the index set and of the domain
+        sets = [component.index_set()]
+        domain = getattr(component, 'domain', None)
+        if domain is not None:
+            sets.append(domain)
+        for s in sets:
+            for sub in s.subsets(expand_all_set_operators=True):
+                if sub.parent_block() is self.base:
+                    yield sub.local_name
+
+    def _from_data(self, component):
+        # built from the data of the file alone (a rule could read any component declared before it)
+        if component.ctype is pyo.Param:
+            return _constant(component._rule) and component._validate is None
+        if component.ctype is pyo.Set:
+            return (component._filter is None and component._validate is None
+                    and (component.local_name in self._base_data or _constant(component._init_values)))
+        return False
+
+    def changed(self, namespace):
+        """Names of the Sets and Params of the namespace that differ from the base instance."""
+        overrides = self.data(namespace)
+        changed = set()
+        for name, component in self.base.component_map().items():
+            if component.ctype not in (pyo.Set, pyo.RangeSet, pyo.Param):
+                continue
+            if (name in overrides or any(used in changed for used in self._uses(component))
+                    or (changed and not self._from_data(component))):
+                changed.add(name)
+        return changed
+
+    def _share(self, component, base):
+        # the constructed (empty) component takes the storage of the base instance
+        if component.ctype is pyo.Set:
+            component._values = base._values
+            component._dimen = base._dimen
+            if isinstance(component, OrderedSetData):
+                component._ordered_values = base._ordered_values
+        else:
+            component._data = base._data
+        component.__class__ = _shared_class(type(component), component.ctype)
+
+    def _sharable(self, component):
+        base = self.base.component(component.local_name)
+        if component.ctype is pyo.Set:
+            return (not base.is_indexed() and isinstance(base, FiniteSetData)
+                    and type(base._values) in (dict, set))
+        if component.ctype is pyo.Param:
+            return base.is_indexed() and not base.mutable and type(base._data) is dict
+        return False
+
+    def create_instance(self, namespace, name=None):
+        """The instance of model.create_instance(filename, namespace=namespace), sharing the unchanged data."""
+        overrides = self.data(namespace)
+        changed = self.changed(namespace)
+        instance = self.model.clone()
+        instance._name = self.model.local_name if name is None else name
+        if instance._rule is not None:
+            instance._rule(instance, next(iter(self.model.index_set())))
+        for component_name, component in instance.component_map().items():
+            if component.ctype is Model:
+                continue
+            if component_name in self.portal._default and component.ctype is not pyo.Set:
+                component.set_default(self.portal._default[component_name])
+            if component_name not in changed and self._sharable(component):
+                component.construct({None: []} if component.ctype is pyo.Set else {})
+                self._share(component, self.base.component(component_name))
+                continue
+            data = overrides[component_name] if component_name in overrides else self._base_data.get(component_name)
+            component.construct(data)
+        instance._constructed = True
+        instance.__class__ = pyo.ConcreteModel
+        return instance
+
+    def instances(self, namespaces=None):
+        # (namespace, instance) one at a time: an instance is freed when the caller drops it
+        for namespace in self.namespaces if namespaces is None else namespaces:
+            yield namespace, self.create_instance(namespace)
+
+
+if __name__ == '__main__':
+    # python ScenarioNamespaces.py [scenarios] [products]
+    # a production model with one big table use[P, R] and one namespace per scenario (new availabilities, every
+    # 10th scenario also new costs, every 100th a new product list Q), loaded one namespace at a time with
+    # create_instance(filename, namespace=...) and with NamespaceScenarios
+    import os
+    import shutil
+    import tempfile
+    import time
+    import tracemalloc
+
+    import numpy as np
+
+    scenarios = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    products = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    resources = 20
+
+    model = pyo.AbstractModel()
+    model.P = pyo.Set()
+    model.R = pyo.Set()
+    model.Q = pyo.Set(within=model.P)
+    model.cost = pyo.Param(model.P)
+    model.use = pyo.Param(model.P, model.R, default=0)
+    model.avail = pyo.Param(model.R)
+    model.bonus = pyo.Param(model.Q, default=1)
+    model.x = pyo.Var(model.P, domain=pyo.NonNegativeReals)
+    model.profit = pyo.Objective(rule=lambda m: sum(m.cost[p] * m.x[p] for p in m.P)
+                                 + sum(m.bonus[q] * m.x[q] for q in m.Q), sense=pyo.maximize)
+    model.capacity = pyo.Constraint(model.R, rule=lambda m, r: sum(m.use[p, r] * m.x[p] for p in m.P) <= m.avail[r])
+
+    rng = np.random.default_rng(0)
+    P = ['p%d' % i for i in range(products)]
+    R = ['r%d' % i for i in range(resources)]
+    tmp = tempfile.mkdtemp()
+    filename = os.path.join(tmp, 'scenarios.dat')
+    with open(filename, 'w') as f:
+        f.write("set P := %s ;\nset R := %s ;\nset Q := %s ;\n" % (' '.join(P), ' '.join(R), ' '.join(P[:10])))
+        f.write("param cost := %s ;\n" % ' '.join('%s %d' % (p, c) for p, c in zip(P, rng.integers(1, 50, products))))
+        f.write("param use :=\n%s ;\n" % '\n'.join('%s %s %d' % (p, r, rng.integers(1, 9))
+                                                   for p in P for r in R if rng.random() < 0.5))
+        f.write("param avail := %s ;\n" % ' '.join('%s %d' % (r, 100 * products) for r in R))
+        for k in range(scenarios):
+            f.write("namespace s%d {\n" % k)
+            f.write("param avail := %s ;\n" % ' '.join('%s %d' % (r, a) for r, a in
+                                                        zip(R, rng.integers(50 * products, 150 * products, resources))))
+            if k % 10 == 0:
+                f.write("param cost := %s ;\n" % ' '.join('%s %d' % (p, c) for p, c in
+                                                           zip(P, rng.integers(1, 50, products))))
+            if k % 100 == 0:
+                f.write("set Q := %s ;\n" % ' '.join(P[k % products:k % products + 20]))
+            f.write("}\n")
+    print("%s: %.1f MB, %d namespaces, %d products x %d resources"
+          % (filename, os.path.getsize(filename) / 2 ** 20, scenarios, products, resources))
+
+    def lp(instance):
+        name = os.path.join(tmp, 'check.lp')
+        instance.write(name, io_options={'symbolic_solver_labels': True})
+        with open(name) as f:
+            return f.read()
+
+    # create_instance per namespace: too slow to do them all, a few and the time per namespace
+    sample = min(3, scenarios)
+    start = time.perf_counter()
+    reference = {'s%d' % k: model.create_instance(filename, namespace='s%d' % k) for k in range(sample)}
+    per_namespace = (time.perf_counter() - start) / sample
+
+    start = time.perf_counter()
+    loader = NamespaceScenarios(model, filename)
+    parse = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in loader.instances():
+        pass
+    build = (time.perf_counter() - start) / scenarios
+
+    # memory of 50 instances alive at once
+    kept = loader.namespaces[:50]
+    tracemalloc.start()
+    copies = [model.create_instance(loader.portal, namespaces=[ns]) for ns in kept]
+    copy_memory = tracemalloc.get_traced_memory()[0] / len(kept)
+    del copies
+    tracemalloc.stop()
+    tracemalloc.start()
+    shared = [loader.create_instance(ns) for ns in kept]
+    shared_memory = tracemalloc.get_traced_memory()[0] / len(kept)
+    del shared
+    tracemalloc.stop()
+
+    same = all(lp(loader.create_instance(ns)) == lp(instance) for ns, instance in reference.items())
+    instance = loader.create_instance('s0')
+    print("changed in s0: %s, shared: %s" % (sorted(loader.changed('s0')),
+                                             sorted(c.local_name for c in instance.component_objects()
+                                                    if is_shared(c))))
+    print("create_instance per namespace: %8.3f s each, %8.1f s for all (extrapolated)"
+          % (per_namespace, per_namespace * scenarios))
+    print("NamespaceScenarios:            %8.3f s each, %8.1f s for all (one parse: %.1f s)"
+          % (build, parse + build * scenarios, parse))
+    print("memory per instance:           %8.2f MB separate copies, %.2f MB sharing the base data"
+          % (copy_memory / 2 ** 20, shared_memory / 2 ** 20))
+    print("same LP files as create_instance:", same)
+    shutil.rmtree(tmp)
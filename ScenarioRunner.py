@@ -0,0 +1,144 @@
+# Scenario batch runner: one instance, many datasets that only change mutable Params.
+#
+# Exercise1.py declares c, b and d with mutable=True, but a script that solves many datasets still calls
+# create_instance(DATA) for every one of them. When only the numbers change (not the sets), the instance can be built
+# ONCE and then, for every scenario:
+#   1. the mutable Params are updated in place (param.store_values)
+#   2. the instance is re-solved
+# The scenarios are spread over a process pool, every worker builds its own warm instance once (pool initializer),
+# and the results are yielded as soon as each scenario finishes (imap_unordered).
+#
+# A scenario is (key, data) where data has the same shape as the data dict of create_instance, without the None
+# namespace and with mutable Params only:
+#   ('high demand', {'c': {1: 6, 2: 3}, 'd': {5: -1}})
+# Params that a scenario does not mention keep the values of the template instance.
+#
+# Usage:
+#   for key, status, obj, out in run_scenarios(build_instance, scenarios, solver='glpk', processes=8):
+#       print(key, status, obj)
+#
+# build_instance must be a function defined at module level (the workers import it, it cannot be a lambda).
+
+import multiprocessing
+import sys
+
+import pyomo.environ as pyo
+
+# per-process state (set by the pool initializer)
+_instance = None
+_opt = None
+_base = {}          # original values of the Params changed by the previous scenario: {name: {index: value}}
+_collect = None
+
+
+def _init_worker(build, solver, collect):
+    global _instance, _opt, _base, _collect
+    _instance = build()
+    _opt = pyo.SolverFactory(solver)
+    _base = {}
+    _collect = collect
+
+
+def _restore():
+    # put back the template values of everything the previous scenario changed
+    for name, values in _base.items():
+        _instance.component(name).store_values(values)
+    _base.clear()
+
+
+def apply_scenario(instance, data, base=None):
+    """Write the scenario values into the mutable Params of instance (saving the old values in base, if given)."""
+    for name, values in data.items():
+        param = instance.component(name)
+        if param is None or param.ctype is not pyo.Param:
+            raise ValueError("scenario data for '%s': only mutable Params can change between scenarios" % name)
+        if not param.is_indexed():
+            values = values[None] if isinstance(values, dict) else values
+            if base is not None:
+                base.setdefault(name, pyo.value(param))
+            param.set_value(values)
+            continue
+        if base is not None:
+            old = base.setdefault(name, {})
+            for index in values:
+                if index not in old:
+                    old[index] = pyo.value(param[index])
+        param.store_values(values)
+
+
+def _run_one(scenario):
+    key, data = scenario
+    _restore()
+    try:
+        apply_scenario(_instance, data, _base)
+        results = _opt.solve(_instance, load_solutions=False)
+    except Exception as e:
+        return key, 'error: %s' % e, None, None
+    status = results.solver.termination_condition
+    if status != pyo.TerminationCondition.optimal:
+        return key, str(status), None, None
+    _instance.solutions.load_from(results)
+    obj = pyo.value(next(_instance.component_data_objects(pyo.Objective, active=True)))
+    return key, str(status), obj, _collect(_instance) if _collect is not None else None
+
+
+def run_scenarios(build, scenarios, solver='glpk', processes=None, collect=None, chunksize=1):
+    """Solve every (key, data) scenario on a warm instance, yield (key, status, objective, collect(instance)).
+
+    processes: number of workers (None = number of CPUs, 0 = run everything in this process).
+    collect: optional module-level function instance -> picklable result (e.g. the variable values).
+    The results are yielded in completion order, not in the order of the scenarios.
+    """
+    if processes == 0:
+        _init_worker(build, solver, collect)
+        for scenario in scenarios:
+            yield _run_one(scenario)
+        return
+    with multiprocessing.Pool(processes, initializer=_init_worker, initargs=(build, solver, collect)) as pool:
+        yield from pool.imap_unordered(_run_one, scenarios, chunksize)
+
+
+# ----------------------------------------------------------------------------------------------------------------
+# Example: the problem of Exercise1.py with mutable right-hand sides c, coefficients b and senses d.
+# Every row j is multiplied by its sign d[j] (1 for <=, -1 for >=) so all rows are written as <=
+
+def build_exercise():
+    model = pyo.AbstractModel()
+    model.I = pyo.RangeSet(3)
+    model.J = pyo.RangeSet(5)
+    model.x = pyo.Var(model.I)
+    model.c = pyo.Param(model.J, mutable=True)
+    model.b = pyo.Param(model.J, model.I, mutable=True, default=0)
+    model.d = pyo.Param(model.J, mutable=True)
+
+    def Obj(model):
+        return model.x[1] + 2*model.x[2] - 3*model.x[3]
+
+    model.OBJ = pyo.Objective(rule=Obj, sense=pyo.maximize)
+
+    def Constr(model, j):
+        return model.d[j] * sum(model.b[j, i] * model.x[i] for i in model.I) <= model.d[j] * model.c[j]
+
+    model.con = pyo.Constraint(model.J, rule=Constr)
+
+    DATA = {None: {
+        'c': {1: 5, 2: 3, 3: 7, 4: 10, 5: 4},
+        'b': {(1, 1): 2, (1, 2): 1, (2, 1): 1, (2, 2): -3, (2, 3): 1, (3, 1): 1, (3, 2): 2, (3, 3): 2,
+              (4, 1): 3, (4, 2): -1, (4, 3): -1, (5, 1): 1, (5, 2): 1, (5, 3): 1},
+        'd': {1: 1, 2: -1, 3: 1, 4: 1, 5: -1},
+    }}
+    return model.create_instance(DATA)
+
+
+def x_values(instance):
+    return [instance.x[i].value for i in instance.I]
+
+
+if __name__ == '__main__':
+    solver = sys.argv[1] if len(sys.argv) > 1 else 'glpk'
+    # what-if on the right-hand side a of the first row (2x + y <= a)
+    scenarios = [('a = %d' % a, {'c': {1: a}}) for a in range(5, 15)]
+    print("\n\n")
+    for key, status, obj, x in run_scenarios(build_exercise, scenarios, solver=solver, processes=4, collect=x_values):
+        print("%-8s %-10s %s %s" % (key, status, obj, x))
+    print("\n\n")
@@ -0,0 +1,211 @@
+# The whole solution of a model as numpy arrays (one array per Var / Constraint component), without loading it
+# into the model first.
+#
+# The "ACCESSING STUFF" section of Pyomo_notes.py prints the variables one at a time:
+#   for v in instance.component_data_objects(pyo.Var, active=True): print(v, pyo.value(v))
+# With millions of variables the solution is first loaded into every VarData (instance.solutions.load_from) and
+# then read back with one value() call per variable, and that takes longer than the solve.
+# Here the solve is done with load_solutions=False: the solver plugin has already parsed its solution file into
+# results.solution (plain dicts keyed by the labels of the problem file: x1, x2, c_l_x4_, ...), and the symbol map
+# of the solve turns each label into a position in the index of its component. So:
+#
+#   sol = solve(pyo.SolverFactory('glpk'), instance)          or   sol = extract(instance, results)
+#   sol.status, sol.termination, sol.objective, sol.time      SOLUTION STATUS, OBJECTIVE VALUE, SOLVER TIME
+#   sol.value['x']      values of x, in the order of instance.x (sol.index['x'] is that order, fixed
+#                       variables have their fixed value)
+#   sol.rc['x']         reduced costs      (nan when the solver does not report them)
+#   sol.dual['con']     duals              (nan when the solver does not report them)
+#   sol.slack['con']    slacks: distance of the row from its closest bound, >= 0 when satisfied
+#   sol.frame('x')      the same as a pandas DataFrame indexed like the component (if pandas is installed)
+#   sol.load(instance)  load the values into the model after all (same as the load_solutions=True default)
+#
+# The slacks are computed from the values and the coefficient matrix (standard form compiler) in one product,
+# since most solvers (glpk too) do not write them in the solution file. slacks=False skips them.
+
+import time
+
+import numpy as np
+
+import pyomo.environ as pyo
+from pyomo.common.dependencies import pandas as pd, pandas_available
+from pyomo.opt.base.solvers import OptSolver
+from pyomo.repn.plugins.standard_form import LinearStandardFormCompiler
+
+
+def layout(instance, ctype):
+    # {component name: list of indices} and {id(component data): (component name, position)}
+    index, where = {}, {}
+    for comp in instance.component_objects(ctype, active=True, descend_into=True):
+        name = comp.name
+        index[name] = list(comp.keys())
+        for k, data in enumerate(comp.values()):
+            where[id(data)] = (name, k)
+    return index, where
+
+
+def _scatter(entries, key, symbols, index, where):
+    # {label: {key: number}} of the results -> {component name: array in index order}
+    arrays = {name: np.full(len(keys), np.nan) for name, keys in index.items()}
+    names, positions, values = [], [], []
+    for label, info in entries.items():
+        number = info.get(key)
+        data = symbols.get(label)
+        if number is None or data is None:
+            continue
+        target = where.get(id(data))
+        if target is not None:
+            names.append(target[0])
+            positions.append(target[1])
+            values.append(number)
+    names, positions, values = np.array(names, dtype=object), np.array(positions, dtype=np.int64), np.array(values)
+    for name in set(names.tolist()):
+        mask = names == name
+        arrays[name][positions[mask]] = values[mask]
+    return arrays
+
+
+def _fill_fixed(instance, values, where):
+    # fixed variables are not in the problem the solver sees, so not in its solution: their value is the fixed one
+    for data in instance.component_data_objects(pyo.Var, active=True, descend_into=True):
+        if data.fixed and data.value is not None:
+            name, k = where[id(data)]
+            values[name][k] = data.value
+
+
+class Solution(object):
+
+    def __init__(self, status, termination, objective, time, message=None):
+        self.status = status                # results.solver.status        (ok, warning, error, aborted)
+        self.termination = termination      # termination condition (optimal, infeasible, unbounded, ...)
+        self.objective = objective
+        self.time = time                    # solver time reported by the solver, else the wall time of the call
+        self.message = message
+        self.lower_bound = self.upper_bound = None      # bounds of the objective reported by the solver
+        self.gap = None
+        self.index = {}                     # component name -> list of indices (the order of the arrays)
+        self.value, self.rc = {}, {}        # Var components
+        self.dual, self.slack = {}, {}      # Constraint components
+
+    def __repr__(self):
+        return "Solution(%s, objective=%s, time=%s)" % (self.termination, self.objective, self.time)
+
+    def frame(self, name):
+        # DataFrame of one component: value / rc for a Var, dual / slack for a Constraint
+        if not pandas_available:
+            raise ImportError("Solution.frame() needs pandas (the arrays are in .value, .rc, .dual, .slack)")
+        keys = self.index[name]
+        if keys and isinstance(keys[0], tuple):
+            idx = pd.MultiIndex.from_tuples(keys)
+        else:
+            idx = pd.Index(keys)
+        if name in self.value:
+            columns = {'value': self.value[name], 'rc': self.rc[name]}
+        else:
+            columns = {'dual': self.dual[name], 'slack': self.slack.get(name, np.full(len(keys), np.nan))}
+        return pd.DataFrame(columns, index=idx)
+
+    def load(self, instance):
+        # values into the Var components (no validation, like load_from)
+        for name, values in self.value.items():
+            var = instance.find_component(name)
+            for data, v in zip(var.values(), values.tolist()):
+                if v == v:                  # not nan
+                    data.set_value(v, skip_validation=True)
+
+
+def _slacks(instance, values, con_index):
+    # slack of every active linear constraint:  min(ub - body, body - lb)
+    repn = LinearStandardFormCompiler().write(instance, mixed_form=True, set_sense=None)
+    _, where = layout(instance, pyo.Var)
+    x = np.zeros(len(repn.columns))
+    for k, var in enumerate(repn.columns):
+        name, pos = where[id(var)]
+        x[k] = values[name][pos]
+    activity = repn.A @ x
+    bound = np.array([row.bound_type for row in repn.rows])
+    # <= rows: rhs - Ax, >= rows: Ax - rhs, == rows: -|Ax - rhs|
+    row_slack = np.where(bound == 0, -np.abs(activity - repn.rhs), np.where(bound > 0, 1, -1) * (repn.rhs - activity))
+    _, con_where = layout(instance, pyo.Constraint)
+    names, positions = zip(*[con_where[id(row.constraint)] for row in repn.rows]) if repn.rows else ((), ())
+    names, positions = np.array(names, dtype=object), np.array(positions, dtype=np.int64)
+    slacks = {}
+    for name, keys in con_index.items():
+        array = np.full(len(keys), np.inf)
+        mask = names == name
+        np.minimum.at(array, positions[mask], row_slack[mask])     # ranged rows: the closest bound
+        array[np.isinf(array)] = np.nan
+        slacks[name] = array
+    return slacks
+
+
+def extract(instance, results, slacks=True, elapsed=None):
+    # a Solution from the results of  opt.solve(instance, load_solutions=False)
+    solver = results.solver
+    reported = None
+    for attr in ('time', 'wallclock_time', 'user_time'):
+        value = getattr(solver, attr, None)
+        if isinstance(value, (int, float)) and value >= 0:
+            reported = float(value)
+            break
+    sol = Solution(solver.status, solver.termination_condition, None,
+                   reported if reported is not None else elapsed, getattr(solver, 'message', None))
+    var_index, var_where = layout(instance, pyo.Var)
+    con_index, con_where = layout(instance, pyo.Constraint)
+    sol.index.update(var_index)
+    sol.index.update(con_index)
+
+    if len(results.solution) == 0 or results._smap is None:
+        # no solution in the file (infeasible, error, ...): all nan
+        for name, keys in var_index.items():
+            sol.value[name] = sol.rc[name] = np.full(len(keys), np.nan)
+        for name, keys in con_index.items():
+            sol.dual[name] = sol.slack[name] = np.full(len(keys), np.nan)
+        return sol
+
+    soln = results.solution(0)
+    symbols = results._smap.bySymbol
+    for info in soln.objective.values():
+        sol.objective = info.get('Value')
+        break
+    if sol.objective is None:
+        sol.objective = results.problem.upper_bound
+    for attr in ('lower_bound', 'upper_bound'):
+        bound = getattr(results.problem, attr, None)
+        if isinstance(bound, (int, float)) and abs(bound) != float('inf'):
+            setattr(sol, attr, float(bound))
+    if isinstance(getattr(soln, 'gap', None), (int, float)):
+        sol.gap = float(soln.gap)
+    sol.value = _scatter(soln.variable, 'Value', symbols, var_index, var_where)
+    _fill_fixed(instance, sol.value, var_where)
+    sol.rc = _scatter(soln.variable, 'Rc', symbols, var_index, var_where)
+    sol.dual = _scatter(soln.constraint, 'Dual', symbols, con_index, con_where)
+    if slacks:
+        sol.slack = _slacks(instance, sol.value, con_index)
+    return sol
+
+
+def solve(opt, instance, slacks=True, **kwds):
+    # opt.solve() that asks for duals and reduced costs and returns a Solution instead of loading the model
+    if isinstance(opt, OptSolver):
+        # the shell solvers only read the suffixes they are asked for (NumpySolver reports the duals anyway)
+        kwds.setdefault('suffixes', ['dual', 'rc'])
+    start = time.perf_counter()
+    results = opt.solve(instance, load_solutions=False, **kwds)
+    return extract(instance, results, slacks, elapsed=time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    # abstract1.py with abstract1.dat
+    import sys
+    import runpy
+    import LazyPyomo
+
+    model = runpy.run_path('abstract1.py')['model']
+    instance = model.create_instance('abstract1.dat')
+    sol = solve(LazyPyomo.SolverFactory(sys.argv[1] if len(sys.argv) > 1 else 'glpk'), instance)
+    print(sol)
+    for name in sol.index:
+        arrays = (sol.value[name], sol.rc[name]) if name in sol.value else (sol.dual[name], sol.slack[name])
+        print(name, sol.index[name], *arrays)
+    if pandas_available:
+        print(sol.frame('x'))
@@ -0,0 +1,152 @@
+# Enumeration of the k best distinct solutions over a vector of Binary variables
+# (a reusable version of the exclusion-cut loop in ExampleIterativeModels.py).
+#
+# ExampleIterativeModels.py builds the cut with "expr += instance.x[j]" over every variable and then re-solves from
+# scratch. Here:
+#   - every solution found is stored as a bitset (np.packbits -> bytes, 1 bit per variable) in a python set,
+#     so checking if a solution was already seen is O(1) and 1e6 solutions of 1000 variables take ~125 MB
+#   - the cut  sum_{x_j=0} x_j + sum_{x_j=1} (1 - x_j) >= 1  is written as ONE LinearExpression
+#     (constant = number of ones, coefficient +1 / -1 for every variable), no growing expression tree
+#   - by default the solves use the persistent HiGHS session of PersistentIterativeModels.py, so every cut is a
+#     single added row and the model is never rewritten
+#   - batch mode (batch > 1) takes several solutions per solve from the solver's solution pool and adds all their
+#     cuts at once. Only gurobi_persistent exposes a pool (PoolSearchMode=2 keeps the `batch` best solutions),
+#     with the other solvers batch is ignored and one solution is taken per solve.
+#
+# Example:
+#   solutions = enumerate_solutions(instance, instance.x, k=10)
+#   for obj, bits in solutions:
+#       print(obj, bits)          bits is a bool array aligned with the variables (in index order)
+
+import numpy as np
+
+import pyomo.environ as pyo
+from pyomo.contrib import appsi
+from pyomo.core.expr.numeric_expr import LinearExpression
+from pyomo.solvers.plugins.solvers.gurobi_persistent import GurobiPersistent
+
+from PersistentIterativeModels import persistent_session
+
+
+def _var_list(vars):
+    # an indexed Var (e.g. instance.x) or any iterable of scalar variables
+    if hasattr(vars, 'is_indexed') and vars.is_indexed():
+        return list(vars.values())
+    if hasattr(vars, 'is_indexed'):
+        return [vars]
+    return list(vars)
+
+
+def _exclusion_cut(xs, bits):
+    # sum_{bits=0} x_j + sum_{bits=1} (1 - x_j) >= 1   ->   n_ones + sum(coef_j * x_j) >= 1
+    coefs = np.where(bits, -1.0, 1.0).tolist()
+    return LinearExpression(constant=int(bits.sum()), linear_coefs=coefs, linear_vars=xs) >= 1
+
+
+def _pool_solutions(opt, xs, batch):
+    # the (up to) `batch` best solutions from the gurobi solution pool, best first
+    solutions = []
+    for i in range(min(batch, opt.get_model_attr('SolCount'))):
+        opt.set_gurobi_param('SolutionNumber', i)
+        values = np.fromiter((opt.get_var_attr(x, 'Xn') for x in xs), float, len(xs))
+        solutions.append((opt.get_model_attr('PoolObjVal'), values > 0.5))
+    return solutions
+
+
+def enumerate_solutions(instance, vars, k, solver=None, batch=1, keep_cuts=False):
+    """Return the k best distinct assignments of the binary `vars` as a list of (objective, bits).
+
+    solver: None for the persistent HiGHS session, a SolverFactory name or a solver object.
+    batch: solutions taken per solve (only used with gurobi_persistent, see the notes above).
+    keep_cuts: leave the exclusion cuts on the instance (as the ConstraintList `_enumeration_cuts`), a later call
+    adds its cuts to the same list and so continues after the solutions already found.
+    """
+    xs = _var_list(vars)
+    obj = next(instance.component_data_objects(pyo.Objective, active=True))
+
+    cuts = instance.component('_enumeration_cuts')
+    if cuts is None:
+        cuts = pyo.ConstraintList()
+        instance.add_component('_enumeration_cuts', cuts)
+    added = []          # the cuts of this call
+    in_solver = []      # the ones sent to a gurobi_persistent model
+
+    in_process = solver is None
+    if in_process:
+        opt = persistent_session(instance)
+        opt.config.load_solution = False    # else an infeasible solve raises instead of ending the enumeration
+    elif isinstance(solver, str):
+        opt = pyo.SolverFactory(solver)
+    else:
+        opt = solver
+    use_pool = batch > 1 and isinstance(opt, GurobiPersistent)
+    if isinstance(opt, GurobiPersistent):
+        opt.set_instance(instance)
+        if use_pool:
+            opt.set_gurobi_param('PoolSearchMode', 2)
+            opt.set_gurobi_param('PoolSolutions', batch)
+
+    seen = set()        # bitsets of the solutions already found
+    solutions = []
+    try:
+        while len(solutions) < k:
+            # solve
+            if in_process:
+                results = opt.solve(instance)
+                optimal = results.termination_condition == appsi.base.TerminationCondition.optimal
+                if optimal:
+                    results.solution_loader.load_vars()
+            else:
+                results = opt.solve(instance, load_solutions=False)
+                optimal = results.solver.termination_condition == pyo.TerminationCondition.optimal
+                if optimal and not use_pool:
+                    instance.solutions.load_from(results)
+            if not optimal:
+                break       # infeasible: no more distinct solutions
+
+            if use_pool:
+                found = _pool_solutions(opt, xs, batch)
+            else:
+                values = np.fromiter((x.value for x in xs), float, len(xs))
+                found = [(pyo.value(obj), values > 0.5)]
+
+            # store the new solutions and add their exclusion cuts
+            new = []
+            for value, bits in found[:k - len(solutions)]:
+                key = np.packbits(bits).tobytes()
+                if key in seen:
+                    continue
+                seen.add(key)
+                solutions.append((value, bits))
+                new.append(cuts.add(_exclusion_cut(xs, bits)))
+                added.append(new[-1])
+            if not new:
+                break       # the solver returned only excluded solutions (numerical trouble), stop here
+            if in_process:
+                opt.add_constraints(new)
+            elif isinstance(opt, GurobiPersistent):
+                for con in new:
+                    opt.add_constraint(con)
+                    in_solver.append(con)
+    finally:
+        if not keep_cuts:
+            # the caller's solver object outlives the call: take the cuts out of its model too
+            for con in in_solver:
+                opt.remove_constraint(con)
+            for con in added:
+                del cuts[con.index()]
+            if not len(cuts):
+                instance.del_component(cuts)
+    return solutions
+
+
+if __name__ == '__main__':
+    # the example of ExampleIterativeModels.py: 4 binary variables, minimize their sum
+    model = pyo.ConcreteModel()
+    model.x = pyo.Var(pyo.RangeSet(4), within=pyo.Binary)
+    model.o = pyo.Objective(expr=pyo.summation(model.x))
+
+    print("\n\n")
+    for obj, bits in enumerate_solutions(model, model.x, k=16):
+        print(obj, bits.astype(int))
+    print("\n\n")
@@ -0,0 +1,283 @@
+# A cache in front of SolverFactory(...).solve: an instance that was already solved is not solved again.
+#
+# Running abstract1.py with the same abstract1.dat, or tryforpyomo.py again, solves exactly the same problem every
+# time. With the cache:
+#
+#   cache = SolveCache('.solve_cache', max_bytes=100 * 2**20, max_age=7 * 24 * 3600)
+#   opt = cache.wrap(pyo.SolverFactory('glpk'))        same object as before, but solve() goes through the cache
+#   results = opt.solve(instance)                      hit: the stored solution is loaded into the instance
+#   results = opt.solve(instance, load_solutions=False)    hit: the stored solution is in results, for
+#   instance.solutions.load_from(results)                  load_from() as with a real solve
+#   print(cache.stats)                                 hits, misses, stores, evictions, solver time saved
+#
+# The key of an instance is the sha256 of its LP file written with symbolic labels (the canonical form of the
+# structure AND the data: same names, same coefficients, same bounds, same domains) plus the solver name, its
+# options and the solve() keywords that change the answer. The LP text is hashed while it is written, it is never
+# kept in memory. Writing it costs about as much as the "write" phase of a glpk solve (see BenchmarkSuite.py),
+# so the cache pays off as soon as the solve itself is slower than writing the problem.
+#
+# On disk there is one small JSON file per solved instance (status, objective, solver time, variable values by
+# LP label, and the duals when the model has a 'dual' Suffix). The modification time of a file is when it was
+# stored and is never changed, every hit refreshes its access time. An entry is too old when it was stored more
+# than max_age seconds ago (get() ignores it, and it is removed at the next store), and after every store the
+# least recently used files are removed until the store is under max_bytes.
+
+import hashlib
+import json
+import os
+import time
+
+import pyomo.environ as pyo
+from pyomo.core.expr.symbol_map import SymbolMap
+from pyomo.opt import Solution, SolutionStatus, SolverResults, SolverStatus, TerminationCondition
+from pyomo.repn.plugins.lp_writer import LPWriter
+
+CACHE_VERSION = 1
+
+# solve() keywords that do not change the solution
+_ignored = ('tee', 'load_solutions', 'keepfiles', 'symbolic_solver_labels', 'report_timing', 'logfile',
+            'solnfile', 'timelimit_warning')
+
+
+class _HashStream(object):
+    # file-like object for the LP writer that only updates a hash
+    def __init__(self):
+        self.hash = hashlib.sha256()
+        self.header = True
+
+    def write(self, text):
+        if self.header:
+            # the first line is the comment with the model name, which does not change the problem
+            self.header = False
+            text = text.split('\n', 1)[1] if text.startswith('\\*') and '\n' in text else text
+        self.hash.update(text.encode())
+
+
+def fingerprint(instance, solver_name='', options=None):
+    # (sha256 hex digest, {LP label: component}) of the instance as the solver would see it
+    stream = _HashStream()
+    info = LPWriter().write(instance, stream, symbolic_solver_labels=True)
+    stream.hash.update(json.dumps([CACHE_VERSION, solver_name, options or {}], sort_keys=True, default=str).encode())
+    return stream.hash.hexdigest(), info.symbol_map.bySymbol
+
+
+class SolveCache(object):
+
+    def __init__(self, directory='.solve_cache', max_bytes=100 * 2 ** 20, max_age=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'saved_time': 0.0}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+    # ------------------------------------------------------------------------------------------------------------
+    # store
+
+    def get(self, key, need_duals=False):
+        path = self._path(key)
+        try:
+            stored = os.stat(path).st_mtime
+            with open(path) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self._too_old(stored, time.time()):
+            return None
+        if need_duals and entry['values'] is not None and entry['duals'] is None:
+            return None
+        try:
+            # most recently used: the access time, the modification time stays the time it was stored
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+        except OSError:
+            pass
+        return entry
+
+    def _too_old(self, stored, now):
+        # the age of an entry is the time since it was stored (the modification time of its file)
+        return self.max_age is not None and now - stored > self.max_age
+
+    def put(self, key, entry):
+        path = self._path(key)
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)           # readers never see a half written file
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.stats['stores'] += 1
+        self.evict()
+
+    def entries(self):
+        # (last used, stored, size, path) of every entry, least recently used first
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_atime, st.st_mtime, st.st_size, path))
+        return sorted(files)
+
+    def evict(self):
+        files = self.entries()
+        total = sum(size for _, _, size, _ in files)
+        now = time.time()
+        for _, stored, size, path in files:
+            if not self._too_old(stored, now) and (self.max_bytes is None or total <= self.max_bytes):
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.stats['evictions'] += 1
+
+    def clear(self):
+        for _, _, _, path in self.entries():
+            os.remove(path)
+
+    # ------------------------------------------------------------------------------------------------------------
+    # solve
+
+    def solve(self, opt, instance, *args, **kwds):
+        # opt.solve(instance, ...) through the cache
+        options = dict(opt.options) if hasattr(opt, 'options') else {}
+        options.update((k, v) for k, v in kwds.items() if k not in _ignored)
+        key, symbols = fingerprint(instance, getattr(opt, 'name', type(opt).__name__), options)
+        dual = instance.component('dual')
+        need_duals = isinstance(dual, pyo.Suffix) and dual.import_enabled()
+        load = kwds.get('load_solutions', True)
+
+        entry = self.get(key, need_duals)
+        if entry is not None:
+            self.stats['hits'] += 1
+            self.stats['saved_time'] += entry['time'] or 0.0
+            results = _results(entry)
+            if entry['values'] is not None:
+                if load:
+                    _load(entry, symbols, dual if need_duals else None)
+                else:
+                    # load_solutions=False: the caller loads it with instance.solutions.load_from(results)
+                    _solution(results, entry, symbols)
+            return results
+
+        self.stats['misses'] += 1
+        start = time.perf_counter()
+        results = opt.solve(instance, *args, **kwds)
+        elapsed = time.perf_counter() - start
+        solver = results.solver
+        entry = {
+            'created': time.time(),
+            'solver': getattr(opt, 'name', type(opt).__name__),
+            'status': str(solver.status),
+            'termination': str(solver.termination_condition),
+            'time': elapsed,
+            'objective': None,
+            'values': None,
+            'duals': None,
+        }
+        if load and solver.termination_condition in (TerminationCondition.optimal,
+                                                     TerminationCondition.locallyOptimal):
+            # the solution is in the instance now: read it back through the labels of the fingerprint
+            values, duals = {}, {}
+            for label, obj in symbols.items():
+                if obj.ctype is pyo.Var:
+                    values[label] = obj.value
+                elif obj.ctype is pyo.Objective:
+                    entry['objective'] = pyo.value(obj)
+                elif need_duals and obj.ctype is pyo.Constraint and obj in dual:
+                    duals[label] = dual[obj]
+            entry['values'] = values
+            entry['duals'] = duals if need_duals else None
+        if entry['values'] is not None or solver.termination_condition in (
+                TerminationCondition.infeasible, TerminationCondition.unbounded,
+                TerminationCondition.infeasibleOrUnbounded):
+            self.put(key, entry)
+        return results
+
+    def wrap(self, opt):
+        # make opt.solve go through the cache (the solver object is otherwise unchanged)
+        solve = opt.solve
+
+        class _Solver(object):
+            # keeps the original solve() for the misses
+            def __init__(self):
+                self.name = getattr(opt, 'name', type(opt).__name__)
+                self.options = getattr(opt, 'options', {})
+
+            def solve(self, *args, **kwds):
+                return solve(*args, **kwds)
+
+        inner = _Solver()
+        opt.solve = lambda instance, *args, **kwds: self.solve(inner, instance, *args, **kwds)
+        return opt
+
+
+def _load(entry, symbols, dual=None):
+    for label, value in entry['values'].items():
+        var = symbols.get(label)
+        if var is not None and not var.fixed:
+            var.set_value(value, skip_validation=True)
+    if dual is not None:
+        for label, value in entry['duals'].items():
+            con = symbols.get(label)
+            if con is not None:
+                dual[con] = value
+
+
+def _solution(results, entry, symbols):
+    # the solution block of a cache hit, by LP label, with the symbol map that load_from() needs to find the components
+    soln = Solution()
+    soln.status = SolutionStatus.optimal
+    smap = SymbolMap()
+    for label, obj in symbols.items():
+        if obj.ctype is pyo.Var and label in entry['values']:
+            soln.variable[label] = {'Value': entry['values'][label]}
+        elif obj.ctype is pyo.Objective and entry['objective'] is not None:
+            soln.objective[label] = {'Value': entry['objective']}
+        elif obj.ctype is pyo.Constraint and entry['duals'] and label in entry['duals']:
+            soln.constraint[label] = {'Dual': entry['duals'][label]}
+        else:
+            continue
+        smap.addSymbol(obj, label)
+    results.solution.insert(soln)
+    results._smap = smap
+
+
+def _results(entry):
+    # SolverResults of a cache hit (what opt.solve would have returned, the solution block only with
+    # load_solutions=False)
+    results = SolverResults()
+    results.solver.name = entry['solver']
+    results.solver.status = SolverStatus(entry['status'])
+    results.solver.termination_condition = TerminationCondition(entry['termination'])
+    results.solver.message = 'loaded from the solve cache'
+    results.solver.time = entry['time']
+    if entry['objective'] is not None:
+        results.problem.lower_bound = results.problem.upper_bound = entry['objective']
+    return results
+
+
+if __name__ == '__main__':
+    # abstract1.py with abstract1.dat solved twice: the second solve is a cache hit
+    import sys
+    import runpy
+    import LazyPyomo
+
+    model = runpy.run_path('abstract1.py')['model']
+    cache = SolveCache()
+    opt = cache.wrap(LazyPyomo.SolverFactory(sys.argv[1] if len(sys.argv) > 1 else 'glpk'))
+    for run in range(2):
+        instance = model.create_instance('abstract1.dat')
+        start = time.perf_counter()
+        results = opt.solve(instance)
+        print("run %d: %s in %.4f s, x = %s" % (run, results.solver.termination_condition,
+                                                time.perf_counter() - start, [pyo.value(v) for v in instance.x.values()]))
+    print(cache.stats)
@@ -0,0 +1,496 @@
+# A resident "pyomo solve": warm worker processes that already imported Pyomo, its plugins and the model files.
+#
+# pyomo solve --solver=glpk abstract1.py abstract1.dat starts a new interpreter, imports pyomo.environ (and with it
+# every solver, writer and data plugin), imports abstract1.py, and only then reads abstract1.dat and calls glpsol.
+# For the small abstract models of these notes almost all of a run is that startup. Here it is paid once:
+#
+#   python SolveDaemon.py serve --workers 4 --preload abstract1.py       start the daemon (Ctrl-C or "stop" ends it)
+#   python SolveDaemon.py solve --solver=glpk abstract1.py abstract1.dat     same as pyomo solve, through the daemon
+#   python SolveDaemon.py status                                            workers, jobs, cached model files
+#   python SolveDaemon.py stop
+#
+# The client side of this file only imports the standard library (pyomo is imported by the workers, never at the
+# top of the file), so "solve" costs one interpreter startup plus a round trip on a Unix socket. It accepts the
+# usual pyomo solve options (--solver, --solver-options, --namespace, --timelimit, --stream-solver, --summary,
+# --save-results, --show-results, --json, -q), prints the same lines and writes the same results.yml:
+# the worker does what pyomo solve does (create_instance, solve, instance.solutions.store_to(results),
+# results.write). From python the same job is  response = solve('abstract1.py', ['abstract1.dat'], 'glpk').
+#
+# Every worker is a separate process that runs one job at a time:
+#   - a model file is imported once per worker (like pyomo solve: its __name__ is not '__main__') and imported
+#     again when the file changes (modification time). Modules that the model file imports (SparseRows.py, ...)
+#     stay in the worker: restart the daemon after changing them
+#   - a job runs in the working directory of the client, so relative paths in the .dat files work as before
+#   - what the job prints (the model file, the solver with --stream-solver, Pyomo warnings) goes back to the client
+#   - a job that takes longer than its timeout kills its worker: a new warm worker takes its place
+# The socket is only readable and writable by the user that started the daemon: a job runs any model file.
+
+import json
+import os
+import socket
+import sys
+import time
+
+DEFAULT_SOCKET = os.environ.get('PYOMO_SOLVE_SOCKET') or os.path.join(
+    os.environ.get('XDG_RUNTIME_DIR') or '/tmp', 'pyomo-solve-%d.sock' % os.getuid())
+
+
+# ---------------------------------------------------------------- client (standard library only)
+
+def request(message, path=None, timeout=None):
+    """Send one message to the daemon and return its answer (both are dicts)."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(path or DEFAULT_SOCKET)
+        sock.sendall(json.dumps(message).encode() + b'\n')
+        with sock.makefile('rb') as stream:
+            line = stream.readline()
+    finally:
+        sock.close()
+    if not line:
+        raise ConnectionError("The solve daemon closed the connection without an answer")
+    return json.loads(line)
+
+
+def solve(model, data=(), solver='glpk', options=None, options_string=None, namespaces=None, timelimit=None,
+          tee=False, summary=False, results_format='yaml', timeout=None, path=None):
+    """pyomo solve <model> <data...> on the daemon.
+
+    The answer has the results file text ('results'), the solution summary printed by pyomo solve ('solutions',
+    'gap', 'status', 'value'), what the job printed ('output'), the time of every phase ('times') and, when the
+    job failed, the traceback ('error').
+    """
+    return request({'command': 'solve',
+                    'model': os.path.abspath(model),
+                    'data': [os.path.abspath(filename) for filename in data],
+                    'cwd': os.getcwd(),
+                    'solver': solver,
+                    'options': options or {},
+                    'options_string': options_string,
+                    'namespaces': namespaces,
+                    'timelimit': timelimit,
+                    'tee': tee,
+                    'summary': summary,
+                    'format': results_format,
+                    'timeout': timeout}, path=path)
+
+
+def _solve_command(args):
+    # python SolveDaemon.py solve [pyomo solve options] model.py [data.dat ...]
+    import argparse
+    parser = argparse.ArgumentParser(prog='SolveDaemon.py solve', description='pyomo solve through the daemon')
+    parser.add_argument('model')
+    parser.add_argument('data', nargs='*')
+    parser.add_argument('--solver', default='glpk')
+    parser.add_argument('--solver-options', dest='options_string', default=None,
+                        help='solver options as one string: "mipgap=0.01 tmlim=10"')
+    parser.add_argument('--namespace', '--ns', dest='namespaces', action='append', default=None)
+    parser.add_argument('--timelimit', type=float, default=None, help='solver time limit (seconds)')
+    parser.add_argument('--timeout', type=float, default=None, help='kill the job after this many seconds')
+    parser.add_argument('--stream-solver', '--stream-output', dest='tee', action='store_true')
+    parser.add_argument('--summary', action='store_true')
+    parser.add_argument('--save-results', default=None)
+    parser.add_argument('--show-results', action='store_true')
+    parser.add_argument('--json', action='store_true', help='results in JSON format')
+    parser.add_argument('-q', '--quiet', action='store_true')
+    parser.add_argument('--socket', default=None)
+    options = parser.parse_args(args)
+
+    start = time.time()
+    results_format = 'json' if options.json else 'yaml'
+    try:
+        response = solve(options.model, options.data, options.solver, options_string=options.options_string,
+                         namespaces=options.namespaces, timelimit=options.timelimit, tee=options.tee,
+                         summary=options.summary, results_format=results_format, timeout=options.timeout,
+                         path=options.socket)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sys.stderr.write("No solve daemon on %s: start it with  python SolveDaemon.py serve\n"
+                         % (options.socket or DEFAULT_SOCKET))
+        return 2
+    sys.stdout.write(response.get('output', ''))
+    if 'error' in response:
+        sys.stderr.write(response['error'])
+        return 1
+
+    # the lines of pyomo solve, with the times of the daemon
+    sent = response['times']['sent'] - start
+    steps = [('Setting up Pyomo environment', 0.0), ('Applying Pyomo preprocessing actions', 0.0),
+             ('Creating model', sent + response['times']['model']),
+             ('Applying solver', sent + response['times']['create']),
+             ('Processing results', sent + response['times']['solve'])]
+    if not options.quiet:
+        for step, at in steps:
+            print('[%8.2f] %s' % (at, step))
+    if options.show_results:
+        print('')
+        sys.stdout.write(response['results'])
+        print('')
+    else:
+        filename = options.save_results or ('results.json' if options.json else 'results.yml')
+        with open(filename, 'w') as f:
+            f.write(response['results'])
+        if not options.quiet:
+            print("    Number of solutions: %d" % response['solutions'])
+            if response['solutions']:
+                print("    Solution Information")
+                print("      Gap: %s" % response['gap'])
+                print("      Status: %s" % response['status'])
+                if response['value'] is not None:
+                    print("      Function Value: %s" % response['value'])
+            print("    Solver results file: " + filename)
+    if options.summary:
+        print("")
+        print("==========================================================")
+        print("Solution Summary")
+        print("==========================================================")
+        sys.stdout.write(response['display'])
+    if not options.quiet:
+        print('[%8.2f] Applying Pyomo postprocessing actions' % (time.time() - start))
+        print('[%8.2f] Pyomo Finished' % (time.time() - start))
+    return 0
+
+
+# ---------------------------------------------------------------- worker processes
+
+_models = {}     # model file -> (modification time, module namespace)
+_solvers = {}    # solver name -> solver object
+
+
+def _model(filename):
+    # the Model object of a model file, or the one made by its pyomo_create_model (the rules of pyomo solve)
+    import runpy
+    from pyomo.core.base.PyomoModel import Model
+
+    mtime = os.stat(filename).st_mtime_ns
+    cached = _models.get(filename)
+    if cached is None or cached[0] != mtime:
+        directory = os.path.dirname(filename)
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+        name = os.path.splitext(os.path.basename(filename))[0]
+        cached = _models[filename] = (mtime, runpy.run_path(filename, run_name=name))
+    namespace = cached[1]
+    models = {id(obj): obj for obj in namespace.values() if isinstance(obj, Model)}
+    if len(models) > 1:
+        raise ValueError("Multiple models defined in file '%s'!" % filename)
+    if models:
+        return next(iter(models.values()))
+    if 'pyomo_create_model' in namespace:
+        from pyomo.common.collections import Bunch
+        return namespace['pyomo_create_model'](options=Bunch(), model_options=Bunch())
+    raise ValueError("A model is not defined and the 'pyomo_create_model' is not provided in module %s"
+                     % filename)
+
+
+def _solver(name):
+    import pyomo.environ as pyo
+    if name not in _solvers:
+        opt = pyo.SolverFactory(name)
+        if opt is None or type(opt).__name__ == 'UnknownSolver':
+            raise ValueError("Problem constructing solver `%s`" % name)
+        _solvers[name] = opt
+    return _solvers[name]
+
+
+def _instance(model, data, namespaces):
+    # model.create_instance as in pyomo solve: several data files must all be .dat files
+    import pyomo.environ as pyo
+    if model.is_constructed():
+        return model.clone()      # a ConcreteModel: every job solves its own copy
+    if len(data) > 1:
+        portal = pyo.DataPortal()
+        for filename in data:
+            if not filename.endswith('.dat'):
+                raise ValueError('When specifying multiple data files, they must all be *.dat files.  '
+                                 'File specified: %s' % filename)
+            portal.load(filename=filename, model=model)
+        return model.create_instance(portal, namespaces=namespaces)
+    return model.create_instance(data[0] if data else None, namespaces=namespaces)
+
+
+def _run_job(job):
+    import io
+    import traceback
+    from pyomo.common.tee import capture_output
+
+    start = time.time()
+    times = {'sent': start}
+    response = {'pid': os.getpid(), 'times': times}
+    output = io.StringIO()
+    try:
+        os.chdir(job['cwd'])
+        with capture_output(output):
+            model = _model(job['model'])
+            times['model'] = time.time() - start
+            instance = _instance(model, job['data'], job['namespaces'])
+            times['create'] = time.time() - start
+            keywords = {'tee': job['tee'], 'options': job['options']}
+            if job['options_string']:
+                keywords['options_string'] = job['options_string']
+            if job['timelimit']:
+                keywords['timelimit'] = job['timelimit']
+            results = _solver(job['solver']).solve(instance, **keywords)
+            times['solve'] = time.time() - start
+            instance.solutions.store_to(results)
+            text = io.StringIO()
+            results.write(ostream=text, format=job['format'])
+            response['results'] = text.getvalue()
+            response['solutions'] = len(results.solution)
+            if len(results.solution):
+                solution = results.solution[0]
+                response['gap'] = str(solution.gap)
+                response['status'] = str(solution.status)
+                objectives = list(solution.objective.values())
+                response['value'] = objectives[0]['Value'] if len(objectives) == 1 else None
+            if job['summary']:
+                text = io.StringIO()
+                if len(results.solution) and len(results.solution[0].variable):
+                    instance.display(ostream=text)
+                else:
+                    text.write("No solutions reported by solver.\n")
+                response['display'] = text.getvalue()
+            times['results'] = time.time() - start
+    except Exception:
+        response['error'] = traceback.format_exc()
+    response['output'] = output.getvalue()
+    return response
+
+
+def _worker_main(conn, preload, solvers):
+    # warm up (pyomo, the solver plugins, the model files), then one job at a time until None
+    start = time.time()
+    import pyomo.environ  # noqa: F401 (registers all the plugins)
+    errors = []
+    for filename in preload:
+        try:
+            _model(filename)
+        except Exception as e:
+            errors.append('%s: %s' % (filename, e))
+    for name in solvers:
+        _solver(name).available(exception_flag=False)
+    conn.send({'pid': os.getpid(), 'warmup': time.time() - start, 'errors': errors})
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        conn.send(_run_job(job))
+
+
+class _Worker(object):
+
+    def __init__(self, context, preload, solvers):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, preload, solvers), daemon=True)
+        self.process.start()
+        child.close()
+        self.ready = self.conn.recv()
+        self.jobs = 0
+
+    def run(self, job, timeout):
+        # the answer of the worker, None when it did not answer in time (the worker is then killed)
+        self.conn.send(job)
+        if not self.conn.poll(timeout):
+            self.kill()
+            return None
+        self.jobs += 1
+        return self.conn.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+# ---------------------------------------------------------------- daemon
+
+class SolveDaemon(object):
+    """Unix socket server with `workers` warm worker processes."""
+
+    def __init__(self, path=None, workers=2, preload=(), solvers=('glpk',), timeout=None):
+        import multiprocessing
+        import queue
+        self.path = path or DEFAULT_SOCKET
+        self.preload = [os.path.abspath(filename) for filename in preload]
+        self.solvers = list(solvers)
+        self.timeout = timeout
+        self.context = multiprocessing.get_context('spawn')   # workers do not inherit the server threads
+        self.started = time.time()
+        self.stats = {'jobs': 0, 'errors': 0, 'timeouts': 0, 'restarts': 0}
+        self.idle = queue.Queue()
+        self.workers = []
+        for _ in range(workers):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = _Worker(self.context, self.preload, self.solvers)
+        for error in worker.ready['errors']:
+            sys.stderr.write("preload failed in worker %d: %s\n" % (worker.ready['pid'], error))
+        self.workers.append(worker)
+        self.idle.put(worker)
+
+    def run_job(self, job):
+        timeout = job.get('timeout') or self.timeout
+        worker = self.idle.get()
+        try:
+            response = worker.run(job, timeout)
+        except (EOFError, OSError):
+            response = None
+            worker.kill()
+        if response is None:
+            # killed (timeout) or dead (crash): a new warm worker takes its place
+            self.workers.remove(worker)
+            killed = worker.process.exitcode == -9
+            self.stats['timeouts' if killed else 'restarts'] += 1
+            self._add_worker()
+            return {'error': 'The job did not finish in %s seconds, its worker was restarted\n' % timeout
+                    if killed else 'The worker of the job died (exit code %s), it was restarted\n'
+                    % worker.process.exitcode, 'output': ''}
+        self.idle.put(worker)
+        self.stats['jobs'] += 1
+        self.stats['errors'] += 'error' in response
+        return response
+
+    def status(self):
+        return dict(self.stats, pid=os.getpid(), socket=self.path, uptime=time.time() - self.started,
+                    preload=self.preload,
+                    workers=[{'pid': w.ready['pid'], 'warmup': w.ready['warmup'], 'jobs': w.jobs}
+                             for w in self.workers])
+
+    def serve_forever(self):
+        import socketserver
+        import threading
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                message = json.loads(self.rfile.readline())
+                command = message.get('command', 'solve')
+                if command == 'solve':
+                    answer = daemon.run_job(message)
+                elif command == 'status':
+                    answer = daemon.status()
+                elif command == 'stop':
+                    answer = {'stopped': os.getpid()}
+                    threading.Thread(target=self.server.shutdown).start()
+                else:
+                    answer = {'error': 'Unknown command %r\n' % command}
+                self.wfile.write(json.dumps(answer).encode() + b'\n')
+
+        class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+            daemon_threads = True
+
+        if os.path.exists(self.path):
+            try:
+                request({'command': 'status'}, self.path, timeout=1)
+                raise RuntimeError("A solve daemon is already running on %s" % self.path)
+            except (ConnectionRefusedError, FileNotFoundError, socket.timeout):
+                os.remove(self.path)     # left by a daemon that was killed
+        umask = os.umask(0o177)
+        try:
+            server = Server(self.path, Handler)
+        finally:
+            os.umask(umask)
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            os.remove(self.path)
+            for worker in self.workers:
+                worker.conn.send(None)
+                worker.process.join(5)
+
+
+def _serve_command(args):
+    import argparse
+    parser = argparse.ArgumentParser(prog='SolveDaemon.py serve')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--preload', action='append', default=[], help='model file to import in every worker')
+    parser.add_argument('--solver', dest='solvers', action='append', default=None,
+                        help='solver plugin to load in every worker (default glpk)')
+    parser.add_argument('--timeout', type=float, default=None, help='default time limit of a job (seconds)')
+    parser.add_argument('--socket', default=None)
+    options = parser.parse_args(args)
+    start = time.time()
+    daemon = SolveDaemon(options.socket, options.workers, options.preload, options.solvers or ['glpk'],
+                         options.timeout)
+    print("solve daemon %d on %s: %d workers ready in %.2f s"
+          % (os.getpid(), daemon.path, len(daemon.workers), time.time() - start))
+    sys.stdout.flush()
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def _benchmark(args):
+    # python SolveDaemon.py bench [runs] [model.py data.dat]: pyomo solve against the daemon, one process per run
+    import subprocess
+    import tempfile
+
+    runs = int(args[0]) if args else 10
+    here = os.path.dirname(os.path.abspath(__file__))
+    model, data = (args[1], args[2]) if len(args) > 2 else (os.path.join(here, 'abstract1.py'),
+                                                             os.path.join(here, 'abstract1.dat'))
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'daemon.sock')
+    server = subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', '--workers', '2',
+                               '--socket', path, '--preload', model], stdout=subprocess.PIPE, text=True)
+    print(server.stdout.readline().strip())
+
+    def timed(command):
+        best = float('inf')
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=tmp, check=True, stdout=subprocess.DEVNULL)
+            best = min(best, time.perf_counter() - start)
+        with open(os.path.join(tmp, 'results.yml')) as f:
+            return best, f.read()
+
+    try:
+        cold, cold_results = timed(['pyomo', 'solve', '--solver=glpk', model, data])
+        warm, warm_results = timed([sys.executable, os.path.abspath(__file__), 'solve', '--socket', path,
+                                    '--solver=glpk', model, data])
+        round_trips = []
+        in_solver = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            response = solve(model, [data], 'glpk', path=path)
+            round_trips.append(time.perf_counter() - start)
+            if 'error' in response:
+                raise RuntimeError(response['error'])
+            in_solver.append(response['times']['solve'] - response['times']['create'])
+    finally:
+        request({'command': 'stop'}, path)
+        server.wait()
+
+    def stable(text):
+        # the solver time and the name of the temporary files change from run to run
+        return [line for line in text.splitlines() if not line.strip().startswith(('Time:', 'Name:'))]
+
+    print("pyomo solve (new process):            %7.1f ms" % (1000 * cold))
+    print("SolveDaemon.py solve (new process):   %7.1f ms" % (1000 * warm))
+    print("solve() on the daemon (one process):  %7.1f ms" % (1000 * min(round_trips)))
+    print("  of which in opt.solve (write, solver, read): %.1f ms" % (1000 * min(in_solver)))
+    print("same results.yml:", stable(cold_results) == stable(warm_results))
+    return 0
+
+
+if __name__ == '__main__':
+    command, arguments = (sys.argv[1], sys.argv[2:]) if len(sys.argv) > 1 else ('bench', [])
+    if command == 'solve':
+        sys.exit(_solve_command(arguments))
+    elif command == 'serve':
+        sys.exit(_serve_command(arguments))
+    elif command in ('status', 'stop'):
+        socket_path = arguments[0] if arguments else None
+        print(json.dumps(request({'command': command}, socket_path), indent=2))
+    elif command == 'bench':
+        sys.exit(_benchmark(arguments))
+    else:
+        sys.exit("usage: python SolveDaemon.py serve|solve|status|stop|bench ...")
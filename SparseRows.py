@@ -0,0 +1,45 @@
+# Sparsity-aware construction of rows like  sum(m.a[i,j] * m.x[j] for j in m.J) >= m.b[i]
+#
+# The ax_constraint_rule of abstract1.py / Pyomo_notes.py loops over the whole set J for every row i, so building the
+# constraints costs |I|*|J| even when a is given sparsely (param a with default=0 and only the nonzeros in the .dat).
+# Here the stored entries of the 2-D Param are grouped by row ONCE (when the Param has been loaded) and every
+# row only iterates its own nonzeros, so the construction costs O(nnz).
+#
+# Usage (abstract1.py):
+#   model.a = pyo.Param(model.I, model.J, default=0)
+#   model.a_rows = pyo.BuildAction(rule=lambda m: row_index(m.a))      built right after a is loaded
+#
+#   def ax_constraint_rule(m, i):
+#       return sparse_sum(m.a, m.x, i) >= m.b[i]
+#
+# Only the entries stored in the Param are used, so the default of the Param must be 0 (or None).
+
+import weakref
+
+from pyomo.core.expr.numeric_expr import LinearExpression
+
+_row_indexes = weakref.WeakKeyDictionary()      # Param -> {row: (columns, coefficients)}
+
+
+def row_index(param):
+    """Group the stored (nonzero) entries of a 2-D Param by row: {row: (columns, coefficients)}, built once."""
+    rows = _row_indexes.get(param)
+    if rows is None:
+        if param.default() not in (0, None):
+            raise ValueError("Param %s has default %s, the rows of a sparse Param need default=0"
+                             % (param.name, param.default()))
+        rows = {}
+        for (i, j), value in param.sparse_items():
+            entry = rows.get(i)
+            if entry is None:
+                entry = rows[i] = ([], [])
+            entry[0].append(j)
+            entry[1].append(value)      # the ParamData itself for a mutable Param
+        _row_indexes[param] = rows
+    return rows
+
+
+def sparse_sum(param, var, i):
+    """sum(param[i,j] * var[j]) over the stored entries of row i only, as a single LinearExpression."""
+    cols, coefs = row_index(param).get(i, ((), ()))
+    return LinearExpression(linear_coefs=list(coefs), linear_vars=[var[j] for j in cols])
@@ -0,0 +1,274 @@
+# Streaming loader for big parameter tables (TAB / CSV / JSON lines), the "load Y.tab : [A] Y;" of Pyomo_notes.py
+# for files with hundreds of millions of rows.
+#
+# The DataPortal reads the whole table into python dicts first, and then the Set and the Param are built from them,
+# so the same data is in memory two or three times. Here the file is read in chunks of chunk_bytes:
+#   - every chunk is split into tokens and each column is converted at once with numpy (int64, float64 or str)
+#   - the index Set and the Param consume the rows chunk by chunk while they are constructed (the Set reads the
+#     index columns in a first pass over the file, the Param reads index + value columns in a second pass),
+#     so only one chunk is ever held besides the components themselves
+#   - memory_limit is the memory the loader may use for one chunk (the chunk size is derived from it), and with
+#     max_rss the load stops with a MemoryError before reading the next chunk if the process is over that size
+#   - progress=True prints rows / MB / percentage while reading (or pass a function that receives a dict)
+#
+# Usage, like  load Y.tab : [A] Y;  (the first line of a .tab / .csv file has the column names):
+#   portal = StreamPortal(model)
+#   portal.load('Y.tab', param='Y', index='A', progress=True)
+#   portal.load('big.csv', param='cost', index='ARCS', memory_limit=256 * 2**20)
+#   instance = model.create_instance(portal.data())
+#
+# JSON files are read as JSON lines (one row per line, [index..., value] or {"A": ..., "Y": ...}), since a single
+# JSON document cannot be read in pieces without a streaming JSON parser.
+# CSV fields are split on the delimiter only (no quoted fields with delimiters inside).
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import pyomo.environ as pyo
+
+BYTES_PER_TEXT_BYTE = 20        # rough memory of the tokens + numpy columns of one byte of text
+DEFAULT_CHUNK = 16 * 2 ** 20    # bytes of text per chunk when there is no memory_limit
+
+
+def _rss():
+    # resident memory of this process in bytes (None where /proc is not available)
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _typed(column):
+    # column of strings -> int64, float64 or str array
+    for dtype in (np.int64, np.float64):
+        try:
+            return column.astype(dtype)
+        except ValueError:
+            pass
+    return column
+
+
+def _print_progress(info):
+    total = info['total_bytes']
+    pct = ' %5.1f%%' % (100.0 * info['bytes'] / total) if total else ''
+    sys.stderr.write('\r%s [%s]: %d rows, %.1f MB%s, %.1f s' % (
+        info['file'], info['pass'], info['rows'], info['bytes'] / 2 ** 20, pct, info['elapsed']))
+    if info['done']:
+        sys.stderr.write('\n')
+    sys.stderr.flush()
+
+
+class Table(object):
+    # one table file, read chunk by chunk as typed columns
+
+    def __init__(self, filename, format=None, delimiter=None, chunk_bytes=None, memory_limit=None, max_rss=None,
+                 progress=None):
+        self.filename = filename
+        self.format = format or os.path.splitext(filename)[1].lstrip('.').lower()
+        if self.format not in ('tab', 'csv', 'json', 'jsonl', 'txt'):
+            raise ValueError("unsupported table format %r (tab, csv, json lines)" % self.format)
+        self.delimiter = delimiter if delimiter is not None else (',' if self.format == 'csv' else None)
+        if chunk_bytes is None:
+            chunk_bytes = DEFAULT_CHUNK if memory_limit is None else max(memory_limit // BYTES_PER_TEXT_BYTE, 4096)
+        self.chunk_bytes = chunk_bytes
+        self.max_rss = max_rss
+        self.progress = _print_progress if progress is True else progress
+        self.header = None                  # column names (JSON lines: the keys of the first object, if any)
+        self.rows = None                    # number of rows, known after the first full pass
+        self._header_line = self.format in ('tab', 'csv', 'txt')
+        if self._header_line:
+            with open(filename) as f:
+                self.header = self._split(f.readline())
+
+    def _split(self, text):
+        if self.delimiter is not None:
+            text = text.replace(self.delimiter, ' ')
+        return text.replace('"', ' ').split()
+
+    def _blocks(self, label):
+        # text blocks of about chunk_bytes that end at a line end
+        total = os.path.getsize(self.filename)
+        start, read = time.perf_counter(), 0
+        with open(self.filename) as f:
+            if self._header_line:
+                read += len(f.readline())
+            while True:
+                if self.max_rss is not None:
+                    rss = _rss()
+                    if rss is not None and rss > self.max_rss:
+                        raise MemoryError("%s: process uses %.0f MB, over max_rss=%.0f MB after %.1f MB of the file"
+                                          % (self.filename, rss / 2 ** 20, self.max_rss / 2 ** 20, read / 2 ** 20))
+                block = f.read(self.chunk_bytes)
+                if not block:
+                    break
+                if not block.endswith('\n'):
+                    block += f.readline()
+                read += len(block)
+                yield block, read
+                if self.progress is not None:
+                    self._report(label, read, total, start, False)
+        if self.progress is not None:
+            self._report(label, read, total, start, True)
+
+    def _report(self, label, read, total, start, done):
+        self.progress({'file': self.filename, 'pass': label, 'rows': self._seen, 'bytes': read,
+                       'total_bytes': total, 'elapsed': time.perf_counter() - start, 'done': done})
+
+    def chunks(self, columns=None, label='read'):
+        # lists of typed column arrays, one list per chunk (columns: names or positions, default all)
+        self._seen = 0
+        for block, _ in self._blocks(label):
+            if self.format in ('json', 'jsonl'):
+                cols = self._json_columns(block)
+            else:
+                tokens = np.array(self._split(block))
+                if not len(tokens):
+                    continue
+                width = len(self.header)
+                if len(tokens) % width:
+                    raise ValueError("%s: rows with a number of fields different from the header %s"
+                                     % (self.filename, self.header))
+                table = tokens.reshape(-1, width)
+                cols = [table[:, k] for k in range(width)]
+            if columns is not None:
+                cols = [cols[self.position(c)] for c in columns]
+            cols = [_typed(c) if c.dtype.kind == 'U' else c for c in cols]
+            self._seen += len(cols[0])
+            yield cols
+        self.rows = self._seen
+
+    def count(self):
+        # number of rows (a pass over the file if no pass has been completed yet)
+        if self.rows is None:
+            for _ in self.chunks([0], 'count'):
+                pass
+        return self.rows
+
+    def _json_columns(self, block):
+        rows = json.loads('[' + ','.join(line for line in block.splitlines() if line.strip()) + ']')
+        if rows and isinstance(rows[0], dict):
+            if self.header is None:
+                self.header = list(rows[0])
+            rows = [[row[name] for name in self.header] for row in rows]
+        if not rows:
+            return [np.array([]) for _ in self.header or [0]]
+        # columns keep the python types of the JSON file (numbers stay numbers)
+        return [np.array(col, dtype=object if isinstance(col[0], str) else None) for col in zip(*rows)]
+
+    def position(self, column):
+        if isinstance(column, int):
+            return column
+        if self.header is None or column not in self.header:
+            raise KeyError("%s: no column %r (columns: %s)" % (self.filename, column, self.header))
+        return self.header.index(column)
+
+
+def _rows(columns):
+    # python tuples (or single values) of one chunk
+    values = [c.tolist() for c in columns]
+    return values[0] if len(values) == 1 else list(zip(*values))
+
+
+class _StreamSet(object):
+    # members of the index Set: the index columns of the table, chunk by chunk
+    def __init__(self, table, columns):
+        self._table, self._columns = table, columns
+
+    def __iter__(self):
+        for cols in self._table.chunks(self._columns, 'set'):
+            yield from _rows(cols)
+
+    def __length_hint__(self):
+        # no __len__: Set construction with dimen > 1 runs tuple(members), which would call it before iterating and
+        # cost a pass over the file just to count the rows. The hint is the count of an earlier pass, else none
+        return self._table.rows or 0
+
+
+class _StreamParam(object):
+    # index -> value for Param.construct(), which only iterates over items()
+    def __init__(self, table, index_columns, value_column):
+        self._table, self._index, self._value = table, index_columns, value_column
+
+    def items(self):
+        for cols in self._table.chunks(self._index + [self._value], 'param'):
+            yield from zip(_rows(cols[:-1]), cols[-1].tolist())
+
+    def keys(self):
+        return (k for k, _ in self.items())
+
+    def __iter__(self):
+        return self.keys()
+
+    def __len__(self):
+        return self._table.count()
+
+    def __getitem__(self, key):
+        raise KeyError("the streamed data of a Param is only read once, while the Param is constructed")
+
+
+class StreamPortal(object):
+    # collects the streamed tables for create_instance(), like a DataPortal
+
+    def __init__(self, model=None):
+        self.model = model
+        self._data = {}
+
+    def load(self, filename, param=None, index=None, select=None, format=None, **options):
+        # param: name of the Param (and of its value column, else the last column)
+        # index: name of the index Set to fill with the index columns (None: the Set is not loaded)
+        # select: column names to use, index columns first and value column last (default: all the columns)
+        # set only (param=None): like "load C.tab format=set : C;", every row is a member of `index`
+        table = Table(filename, format=format, **options)
+        if select is not None:
+            names = list(select)
+        elif table.header is not None:
+            names = list(table.header)
+        else:
+            # JSON lines: the keys of the objects, or the positions in the lists
+            first = next(table.chunks())
+            names = list(table.header) if table.header is not None else list(range(len(first)))
+        if param is None:
+            if index is None:
+                raise ValueError("load() needs a param, an index set or both")
+            self._data[index] = {None: _StreamSet(table, names)}
+            return self
+        value = param if param in names else names[-1]
+        index_columns = [c for c in names if c != value]
+        self._data[param] = _StreamParam(table, index_columns, value)
+        if index is not None:
+            self._data[index] = {None: _StreamSet(table, index_columns)}
+        return self
+
+    def data(self, namespace=None):
+        # the DataPortal for create_instance
+        return pyo.DataPortal(data_dict={namespace: dict(self._data)}, model=self.model)
+
+
+if __name__ == '__main__':
+    # writes a Y.tab with `rows` rows (default 10^6) and loads it into  Set A, Param Y[A]
+    import tempfile
+
+    rows = int(float(sys.argv[1])) if len(sys.argv) > 1 else 10 ** 6
+    model = pyo.AbstractModel()
+    model.A = pyo.Set(dimen=2)
+    model.Y = pyo.Param(model.A)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'Y.tab')
+        rng = np.random.default_rng(0)
+        with open(filename, 'w') as f:
+            f.write("I J Y\n")
+            for start in range(0, rows, 10 ** 6):
+                n = min(10 ** 6, rows - start)
+                i = np.arange(start, start + n)
+                np.savetxt(f, np.column_stack([i, i % 7, rng.random(n)]), fmt=['%d', '%d', '%.6f'], delimiter='\t')
+        start = time.perf_counter()
+        portal = StreamPortal(model).load(filename, param='Y', index='A', memory_limit=64 * 2 ** 20, progress=True)
+        instance = model.create_instance(portal.data())
+        print("%d members in A, %d values in Y in %.1f s, max RSS %.0f MB"
+              % (len(instance.A), len(instance.Y), time.perf_counter() - start, (_rss() or 0) / 2 ** 20))
@@ -1,4 +1,5 @@
 import pyomo.environ as pyo
+from SparseRows import row_index, sparse_sum
 
 model = pyo.AbstractModel()
 
@@ -8,7 +9,8 @@ model.n = pyo.Param(within=pyo.NonNegativeIntegers)
 model.I = pyo.RangeSet(1, model.m)
 model.J = pyo.RangeSet(1, model.n)
 
-model.a = pyo.Param(model.I, model.J)
+model.a = pyo.Param(model.I, model.J, default=0)   # only the nonzeros are given in abstract1.dat
+model.a_rows = pyo.BuildAction(rule=lambda m: row_index(m.a))   # rows of a, grouped once after a is loaded
 model.b = pyo.Param(model.I)
 model.c = pyo.Param(model.J)
 
@@ -22,7 +24,8 @@ model.OBJ = pyo.Objective(rule=obj_expression)
 
 def ax_constraint_rule(m, i):
     # return the expression for the constraint for i
-    return sum(m.a[i,j] * m.x[j] for j in m.J) >= m.b[i]
+    # (only over the nonzeros of row i, not over the whole set J: see SparseRows.py)
+    return sparse_sum(m.a, m.x, i) >= m.b[i]
 
 # the next line creates one constraint for each member of the set model.I
 model.AxbConstraint = pyo.Constraint(model.I, rule=ax_constraint_rule)
\ No newline at end of file